@@ -1,8 +1,48 @@
+from pytest_helm_templates.async_helm_runner import AsyncHelmRunner
+from pytest_helm_templates.chart_cache import ChartCache
+from pytest_helm_templates.diff import Change, ManifestKey, RenderDiff, diff_renders
+from pytest_helm_templates.documents import RawDocument, document_matcher
+from pytest_helm_templates.frozen import FrozenDict, FrozenList, freeze, thaw
 from pytest_helm_templates.helm_runner import HelmRunner
-from pytest_helm_templates.types import DependencyListItem
+from pytest_helm_templates.instrumentation import Instrumentation
+from pytest_helm_templates.lazy_manifest_set import DocumentRecord, LazyManifestSet
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.matrix import RenderMatrix
+from pytest_helm_templates.query import Query
+from pytest_helm_templates.render_cache import RenderCache
+from pytest_helm_templates.snapshot import HelmSnapshot
+from pytest_helm_templates.types import (
+    BatchResult,
+    DependencyListItem,
+    HelmEvent,
+    MatrixCase,
+)
 
 
 __all__ = [
+    "AsyncHelmRunner",
+    "BatchResult",
+    "Change",
+    "ChartCache",
     "DependencyListItem",
+    "DocumentRecord",
+    "FrozenDict",
+    "FrozenList",
+    "HelmEvent",
     "HelmRunner",
+    "HelmSnapshot",
+    "Instrumentation",
+    "LazyManifestSet",
+    "ManifestKey",
+    "ManifestSet",
+    "MatrixCase",
+    "Query",
+    "RawDocument",
+    "RenderCache",
+    "RenderDiff",
+    "RenderMatrix",
+    "diff_renders",
+    "document_matcher",
+    "freeze",
+    "thaw",
 ]
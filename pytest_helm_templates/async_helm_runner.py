@@ -0,0 +1,340 @@
+import asyncio
+import weakref
+from dataclasses import replace
+from typing import Any, Dict, List, MutableMapping, Optional, Tuple, Union
+
+from pytest_helm_templates.base_helm_runner import (
+    COMPUTED_VALUES_RELEASE_NAME,
+    BaseHelmRunner,
+)
+from pytest_helm_templates.chart_cache import ChartCache
+from pytest_helm_templates.commands import ShowValuesCommand
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.native_values import (
+    HELM_ENGINE,
+    NATIVE_ENGINE,
+    VERIFY_ENGINE,
+)
+from pytest_helm_templates.shadow_chart import ADHOC_TEMPLATE_PATH, shadow_chart
+from pytest_helm_templates.types import DependencyListItem, TemplateOptions
+
+
+class AsyncHelmRunner(BaseHelmRunner):
+    def __init__(
+        self,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        computed_values_engine: str = HELM_ENGINE,
+        chart_cache: Optional[ChartCache] = None,
+        helm_binary: str = "helm",
+        max_concurrency: Optional[int] = None,
+        shadow_charts: bool = False,
+    ) -> None:
+        """
+        Like HelmRunner, but helm is run in asyncio subprocesses so that many
+        renders can overlap. max_concurrency limits how many helm processes
+        the runner will run at the same time. Cancelling a call kills the helm
+        process it is waiting on. Results are not memoized or cached. See
+        HelmRunner for chart_cache and shadow_charts. Charts are pulled into
+        the chart cache on the default executor.
+        """
+        super().__init__(
+            chart_cache=chart_cache,
+            computed_values_engine=computed_values_engine,
+            cwd=cwd,
+            env=env,
+            helm_binary=helm_binary,
+            shadow_charts=shadow_charts,
+        )
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency must be at least 1, got {max_concurrency}"
+            )
+        self.max_concurrency = max_concurrency
+        self._process_slots: MutableMapping[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+
+    async def values(
+        self,
+        chart: str,
+        repo: Optional[str] = None,
+        version: Optional[str] = None,
+    ) -> Dict:
+        """
+        Collect the values of the given chart.
+        """
+        cached_chart_path = await self._async_cached_chart_path(chart, repo, version)
+        helm_arguments = (
+            ShowValuesCommand.helm_arguments(chart=cached_chart_path)
+            if cached_chart_path is not None
+            else ShowValuesCommand.helm_arguments(
+                chart=chart,
+                repo=repo,
+                version=version,
+            )
+        )
+
+        values_output = await self._run(helm_arguments=helm_arguments)
+        return self._parse_values(values_output)
+
+    async def adhoc_template(
+        self,
+        chart: str,
+        content: str,
+        name: str,
+        api_versions: Optional[List[str]] = None,
+        dry_run: Optional[str] = None,
+        include_crds: Optional[bool] = None,
+        is_upgrade: Optional[bool] = None,
+        kube_version: Optional[str] = None,
+        namespace: Optional[str] = None,
+        repo: Optional[str] = None,
+        skip_tests: Optional[bool] = None,
+        values: Optional[List[Union[Dict[str, Any], str]]] = None,
+        version: Optional[str] = None,
+    ) -> Dict:
+        """
+        Like template, but renders a single adhoc template populated with the
+        given content.
+        """
+        chart_path = self._local_chart_path(chart, description="Adhoc templates")
+        options = TemplateOptions(
+            api_versions=api_versions,
+            chart=chart,
+            dry_run=dry_run,
+            include_crds=include_crds,
+            is_upgrade=is_upgrade,
+            kube_version=kube_version,
+            name=name,
+            namespace=namespace,
+            repo=repo,
+            skip_tests=skip_tests,
+            values=values,
+            version=version,
+        )
+
+        if self.shadow_charts:
+            with shadow_chart(chart_path, content) as shadow_chart_path:
+                manifests = await self._template(
+                    replace(
+                        options,
+                        chart=str(shadow_chart_path),
+                        show_only=[ADHOC_TEMPLATE_PATH],
+                    )
+                )
+                return manifests[0]
+
+        with self._adhoc_template_file(chart_path, content) as template_path:
+            manifests = await self._template(
+                replace(options, show_only=[template_path])
+            )
+            return manifests[0]
+
+    async def computed_values(
+        self,
+        chart: str,
+        values: Optional[List[Union[Dict[str, Any], str]]] = None,
+    ) -> Dict:
+        """
+        Collect the whole tree of values from the given chart and its
+        dependencies. Like HelmRunner.computed_values, this depends on having a
+        local chart to inject an adhoc template into.
+        """
+        chart_path = self._local_chart_path(chart, description="Computed values")
+        if self.computed_values_engine == NATIVE_ENGINE:
+            return self._native_computed_values(chart_path, values)
+
+        values_output = await self.adhoc_template(
+            chart=chart,
+            content="{{ toYaml .Values }}",
+            name=COMPUTED_VALUES_RELEASE_NAME,
+            values=values,
+        )
+        computed_values = self._parse_computed_values(values_output)
+        if self.computed_values_engine == VERIFY_ENGINE:
+            self._verify_computed_values(
+                chart=chart,
+                helm_values=computed_values,
+                native_values=self._native_computed_values(chart_path, values),
+            )
+        return computed_values
+
+    async def dependency_build(self, chart: str) -> None:
+        await self._run(["helm", "dependency", "build", chart])
+
+    async def dependency_list(self, chart: str) -> List[DependencyListItem]:
+        dependency_list_output = await self._run(["helm", "dependency", "list", chart])
+        return self._parse_dependency_list(dependency_list_output)
+
+    async def dependency_update(self, chart: str) -> None:
+        await self._run(["helm", "dependency", "update", chart])
+
+    async def dependency_update_if_missing(self, chart: str) -> None:
+        """
+        Like dependency_update, but only triggers dependency_update if any of
+        the dependencies are not ok. For local charts this is decided from the
+        chart's Chart.yaml, Chart.lock and `charts/` directory without running
+        helm, and the verdict is reused until any of them change.
+        """
+        dependencies_satisfied = self._dependencies_satisfied(chart)
+        if dependencies_satisfied is None:
+            dependency_list = await self.dependency_list(chart=chart)
+            dependencies_satisfied = all(item.is_ok for item in dependency_list)
+        if dependencies_satisfied:
+            return
+        await self.dependency_update(chart=chart)
+
+    async def notes(
+        self,
+        chart: str,
+        name: str,
+        api_versions: Optional[List[str]] = None,
+        dry_run: Optional[str] = None,
+        is_upgrade: Optional[bool] = None,
+        kube_version: Optional[str] = None,
+        namespace: Optional[str] = None,
+        repo: Optional[str] = None,
+        values: Optional[List[Union[Dict[str, Any], str]]] = None,
+        version: Optional[str] = None,
+    ) -> str:
+        """
+        Render the NOTES.txt of the given local chart. See HelmRunner.notes.
+        """
+        chart_path = self._local_chart_path(chart, description="Notes")
+
+        notes_result = await self.adhoc_template(
+            api_versions=api_versions,
+            chart=chart,
+            content=self._notes_content(chart_path),
+            dry_run=dry_run,
+            include_crds=False,
+            is_upgrade=is_upgrade,
+            kube_version=kube_version,
+            name=name,
+            namespace=namespace,
+            repo=repo,
+            skip_tests=True,
+            values=values,
+            version=version,
+        )
+        return self._parse_notes(notes_result)
+
+    async def template(
+        self,
+        chart: str,
+        name: str,
+        api_versions: Optional[List[str]] = None,
+        dry_run: Optional[str] = None,
+        include_crds: Optional[bool] = None,
+        is_upgrade: Optional[bool] = None,
+        kube_version: Optional[str] = None,
+        namespace: Optional[str] = None,
+        repo: Optional[str] = None,
+        show_only: Optional[List[str]] = None,
+        skip_tests: Optional[bool] = None,
+        values: Optional[List[Union[Dict[str, Any], str]]] = None,
+        version: Optional[str] = None,
+    ) -> ManifestSet:
+        """
+        Render the given chart with `helm template`. See HelmRunner.template.
+        """
+        return await self._template(
+            TemplateOptions(
+                api_versions=api_versions,
+                chart=chart,
+                dry_run=dry_run,
+                include_crds=include_crds,
+                is_upgrade=is_upgrade,
+                kube_version=kube_version,
+                name=name,
+                namespace=namespace,
+                repo=repo,
+                show_only=show_only,
+                skip_tests=skip_tests,
+                values=values,
+                version=version,
+            )
+        )
+
+    async def _async_cached_chart_path(
+        self,
+        chart: str,
+        repo: Optional[str],
+        version: Optional[str],
+    ) -> Optional[str]:
+        if self.chart_cache is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._cached_chart_path, chart, repo, version
+        )
+
+    async def _template(self, options: TemplateOptions) -> ManifestSet:
+        cached_chart_path = await self._async_cached_chart_path(
+            options.chart, options.repo, options.version
+        )
+        if cached_chart_path is not None:
+            options = replace(options, chart=cached_chart_path, repo=None, version=None)
+        helm_arguments, stdin = self._template_helm_invocation(options)
+        templates_yaml = await self._run(helm_arguments, stdin=stdin)
+        sourced_manifests = self._parse_template_output(templates_yaml)
+        return ManifestSet(
+            manifests=[manifest for _, manifest in sourced_manifests],
+            sources=[source for source, _ in sourced_manifests],
+        )
+
+    async def _run(
+        self,
+        helm_arguments: List[str],
+        stdin: Optional[str] = None,
+    ) -> str:
+        helm_arguments = self._helm_command(helm_arguments)
+
+        if not self.max_concurrency:
+            stdout, stderr, return_code = await self._communicate(helm_arguments, stdin)
+        else:
+            # A semaphore can only be used by the event loop it was first used
+            # on, so every loop the runner is used on, e.g. by consecutive
+            # asyncio.run calls, gets a semaphore of its own.
+            loop = asyncio.get_running_loop()
+            process_slots = self._process_slots.get(loop)
+            if process_slots is None:
+                process_slots = asyncio.Semaphore(self.max_concurrency)
+                self._process_slots[loop] = process_slots
+            async with process_slots:
+                stdout, stderr, return_code = await self._communicate(
+                    helm_arguments, stdin
+                )
+
+        if return_code > 0:
+            raise self._helm_command_error(
+                helm_arguments=helm_arguments,
+                return_code=return_code,
+                stderr=stderr,
+            )
+
+        return stdout.decode("utf-8")
+
+    async def _communicate(
+        self,
+        helm_arguments: List[str],
+        stdin: Optional[str] = None,
+    ) -> Tuple[bytes, bytes, int]:
+        process = await asyncio.create_subprocess_exec(
+            *helm_arguments,
+            cwd=self.cwd,
+            env=self.env,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await process.communicate(
+                stdin.encode("utf-8") if stdin is not None else None
+            )
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        return stdout, stderr, await process.wait()
@@ -0,0 +1,323 @@
+import difflib
+import textwrap
+import threading
+from contextlib import contextmanager
+from os import path
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.chart_cache import ChartCache
+from pytest_helm_templates.commands import TemplateCommand
+from pytest_helm_templates.dependency_status import (
+    dependency_state_digest,
+    dependency_statuses,
+)
+from pytest_helm_templates.documents import split_documents
+from pytest_helm_templates.fingerprint import chart_fingerprint, file_fingerprint
+from pytest_helm_templates.native_values import (
+    COMPUTED_VALUES_ENGINES,
+    HELM_ENGINE,
+    NativeChart,
+    compute_values,
+    load_chart,
+)
+from pytest_helm_templates.types import (
+    DependencyListItem,
+    SourcedManifests,
+    TemplateOptions,
+)
+from pytest_helm_templates.values_transport import values_transport
+
+
+COMPUTED_VALUES_RELEASE_NAME = "computed-values"
+
+
+class BaseHelmRunner:
+    """
+    The argument building and output parsing shared by HelmRunner and
+    AsyncHelmRunner. Subclasses are responsible for running helm.
+    """
+
+    def __init__(
+        self,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        computed_values_engine: str = HELM_ENGINE,
+        chart_cache: Optional[ChartCache] = None,
+        helm_binary: str = "helm",
+        shadow_charts: bool = False,
+    ) -> None:
+        if computed_values_engine not in COMPUTED_VALUES_ENGINES:
+            raise ValueError(
+                "Unsupported computed values engine"
+                f" `{computed_values_engine}`. Expected one of"
+                f" {list(COMPUTED_VALUES_ENGINES)}"
+            )
+        self.chart_cache = chart_cache
+        self.computed_values_engine = computed_values_engine
+        self.cwd = cwd
+        self.env = env
+        self.helm_binary = helm_binary
+        self.shadow_charts = shadow_charts
+        # Maps local chart paths to the digest of their dependency state and
+        # whether their dependencies were satisfied in that state.
+        self._dependency_verdicts: Dict[str, Tuple[str, bool]] = {}
+        self._dependency_verdicts_lock = threading.Lock()
+        # Maps local chart paths to the digest of the chart and the chart as
+        # loaded for computing values natively.
+        self._native_charts: Dict[str, Tuple[str, NativeChart]] = {}
+        self._native_charts_lock = threading.Lock()
+
+    @contextmanager
+    def _adhoc_template_file(self, chart_path: Path, content: str) -> Iterator[str]:
+        """
+        Write the given content to a temporary template in the given chart,
+        yielding the path of the template relative to the chart.
+        """
+        templates_dir_path = chart_path.joinpath("templates")
+
+        with NamedTemporaryFile(
+            dir=templates_dir_path,
+            encoding="utf-8",
+            mode="w",
+        ) as temp_file:
+            temp_file_name = path.basename(temp_file.name)
+            temp_file.write(content)
+            temp_file.flush()
+            yield f"templates/{temp_file_name}"
+
+    def _cached_chart_path(
+        self,
+        chart: str,
+        repo: Optional[str],
+        version: Optional[str],
+    ) -> Optional[str]:
+        """
+        The path of the given remote chart in the chart cache, pulling it on
+        first use, or None if there is no chart cache or the chart isn't a
+        pinned chart from an HTTP repository.
+        """
+        if self.chart_cache is None or not repo or not version:
+            return None
+        return self.chart_cache.chart_path(chart=chart, repo=repo, version=version)
+
+    def _chart_digest(self, chart_path: Path) -> str:
+        """
+        Compute a digest of the given local chart directory or archive.
+        """
+        if path.isdir(chart_path):
+            return chart_fingerprint(str(chart_path))
+        return file_fingerprint(str(chart_path))
+
+    def _chart_path(self, chart: str) -> Path:
+        return Path(chart) if not self.cwd else Path(self.cwd).joinpath(chart)
+
+    def _dependencies_satisfied(self, chart: str) -> Optional[bool]:
+        """
+        Decide whether the dependencies of the given chart are satisfied
+        without running helm. The verdict is cached until the chart's
+        dependency declarations, lock file or `charts/` directory change.
+        Returns None when the chart isn't a local chart directory.
+        """
+        chart_path = self._chart_path(chart)
+        if not path.isdir(chart_path):
+            return None
+        chart_key = path.abspath(chart_path)
+        state_digest = dependency_state_digest(chart_key)
+        with self._dependency_verdicts_lock:
+            verdict = self._dependency_verdicts.get(chart_key)
+        if verdict is not None and verdict[0] == state_digest:
+            return verdict[1]
+
+        dependency_list = dependency_statuses(chart_key)
+        if dependency_list is None:
+            return None
+        satisfied = all(item.is_ok for item in dependency_list)
+        with self._dependency_verdicts_lock:
+            self._dependency_verdicts[chart_key] = (state_digest, satisfied)
+        return satisfied
+
+    def _helm_command(self, helm_arguments: List[str]) -> List[str]:
+        if helm_arguments[0] == "helm":
+            return [self.helm_binary, *helm_arguments[1:]]
+        return helm_arguments
+
+    def _helm_command_error(
+        self,
+        helm_arguments: List[str],
+        return_code: int,
+        stderr: bytes,
+    ) -> RuntimeError:
+        return RuntimeError(
+            f"helm command failed with return code {return_code}:"
+            f"exec {helm_arguments}\n{stderr.decode('utf-8')}"
+        )
+
+    def _local_chart_path(self, chart: str, description: str) -> Path:
+        chart_path = self._chart_path(chart)
+        if not path.exists(chart_path):
+            raise ValueError(
+                f"{description} can only be rendered for local charts. Could"
+                f" not find local chart `{chart}` ({str(chart_path)})"
+            )
+        return chart_path
+
+    def _native_chart(
+        self,
+        chart_path: Path,
+        chart_digest: Optional[str] = None,
+    ) -> NativeChart:
+        """
+        Load the given local chart for computing values natively. Loaded
+        charts are kept until the digest of their files changes.
+        """
+        chart_key = path.abspath(chart_path)
+        if chart_digest is None:
+            chart_digest = self._chart_digest(chart_path)
+        with self._native_charts_lock:
+            loaded_chart = self._native_charts.get(chart_key)
+        if loaded_chart is not None and loaded_chart[0] == chart_digest:
+            return loaded_chart[1]
+
+        chart = load_chart(chart_key)
+        with self._native_charts_lock:
+            self._native_charts[chart_key] = (chart_digest, chart)
+        return chart
+
+    def _native_computed_values(
+        self,
+        chart_path: Path,
+        values: Optional[List[Union[Dict[str, Any], str]]],
+        chart_digest: Optional[str] = None,
+    ) -> Dict:
+        return compute_values(
+            chart=self._native_chart(chart_path, chart_digest),
+            chart_path=str(chart_path),
+            cwd=self.cwd,
+            values=values,
+        )
+
+    def _notes_content(self, chart_path: Path) -> str:
+        """
+        Build the content of an adhoc template that embeds the chart's
+        NOTES.txt in a YAML document.
+        """
+        templates_dir_path = chart_path.joinpath("templates")
+        notes_path = templates_dir_path.joinpath("NOTES.txt")
+        if not path.exists(notes_path):
+            raise ValueError(f"Unable to find notes template at `{notes_path}`")
+
+        with open(notes_path, encoding="utf-8", mode="r") as notes_file:
+            notes_template = notes_file.read()
+        indented_notes_template = textwrap.indent(notes_template, "  ")
+        return f"---\nNOTES.txt: |\n{indented_notes_template}"
+
+    def _parse_computed_values(self, values_output: Any) -> Dict:
+        if not isinstance(values_output, Dict):
+            raise ValueError(
+                "Unexpected computed values. Expected dict, got"
+                f" {type(values_output)}: {values_output}"
+            )
+        return values_output
+
+    def _parse_dependency_list(
+        self,
+        dependency_list_output: str,
+    ) -> List[DependencyListItem]:
+        rows = [row for row in dependency_list_output.split("\n") if row][1:]
+        rows_fields = [row.split("\t") for row in rows]
+        records = [
+            [field.strip() for field in row_fields] for row_fields in rows_fields
+        ]
+        return [
+            DependencyListItem(
+                name=record[0],
+                repository=record[2],
+                status=record[3],
+                version=record[1],
+            )
+            for record in records
+        ]
+
+    def _parse_notes(self, notes_result: Dict) -> str:
+        notes_output = notes_result["NOTES.txt"]
+        if not isinstance(notes_output, str):
+            raise ValueError(
+                "Unexpected notes template output. Expected string, got"
+                " {type(notes_output)}: {notes_output}"
+            )
+        return notes_output
+
+    def _parse_template_output(self, templates_yaml: str) -> SourcedManifests:
+        return [
+            (document.source, yaml_backend.safe_load(document.content))
+            for document in split_documents(templates_yaml)
+        ]
+
+    def _parse_values(self, values_output: str) -> Dict:
+        values = yaml_backend.safe_load(values_output)
+        if not isinstance(values, Dict):
+            raise ValueError(
+                "Unexpected values. Expected dict, got" f" {type(values)}: {values}"
+            )
+        return values
+
+    def _verify_computed_values(
+        self,
+        chart: str,
+        native_values: Dict,
+        helm_values: Dict,
+    ) -> None:
+        if native_values == helm_values:
+            return
+        diff = difflib.unified_diff(
+            yaml_backend.safe_dump(helm_values).splitlines(),
+            yaml_backend.safe_dump(native_values).splitlines(),
+            fromfile="helm",
+            lineterm="",
+            tofile="native",
+        )
+        raise RuntimeError(
+            f"Natively computed values for chart `{chart}` differ from the values"
+            " computed by helm:\n" + "\n".join(diff)
+        )
+
+    def _template_helm_invocation(
+        self,
+        options: TemplateOptions,
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Build the helm arguments for rendering the given template options,
+        along with the values YAML to write to helm's stdin, if any.
+        """
+        values, stdin = values_transport(options.values or [])
+        helm_arguments = self._template_helm_arguments(
+            options=options,
+            chart=str(self._chart_path(options.chart)),
+            values=values,
+        )
+        return helm_arguments, stdin
+
+    def _template_helm_arguments(
+        self,
+        options: TemplateOptions,
+        chart: str,
+        values: Optional[List[str]],
+    ) -> List[str]:
+        return TemplateCommand.helm_arguments(
+            api_versions=options.api_versions,
+            chart=chart,
+            dry_run=options.dry_run,
+            include_crds=options.include_crds,
+            is_upgrade=options.is_upgrade,
+            kube_version=options.kube_version,
+            namespace=options.namespace,
+            name=options.name,
+            repo=options.repo,
+            show_only=options.show_only,
+            skip_tests=options.skip_tests,
+            values=values,
+            version=options.version,
+        )
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import posixpath
+import shutil
+import tarfile
+import threading
+import urllib.request
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import Any, Dict, Optional, Set
+from urllib.error import URLError
+from urllib.parse import urljoin, urlparse
+
+import yaml
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.fingerprint import file_fingerprint, object_fingerprint
+
+
+class ChartCache:
+    """
+    A persistent cache of charts pulled from HTTP chart repositories. A given
+    version of a chart never changes, so the first render of a pinned remote
+    chart downloads its archive, checks it against the digest published in
+    the repository's index and unpacks it, and every later render uses the
+    unpacked chart without any network round-trip or archive extraction.
+    Charts that can't be pulled this way, e.g. from OCI registries, named
+    repositories or with version ranges, are left to helm.
+    """
+
+    ARCHIVE_NAME = "chart.tgz"
+    DIGEST_NAME = "digest"
+
+    def __init__(self, cache_dir: str, timeout: float = 30.0) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.timeout = timeout
+        self._indexes: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._verified: Set[str] = set()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def chart_path(self, chart: str, repo: str, version: str) -> Optional[str]:
+        """
+        Return the path of the unpacked chart for the given chart, repository
+        and version, pulling it on first use. Returns None when the chart
+        can't be pulled from the repository's index, in which case helm should
+        be left to resolve it.
+        """
+        if urlparse(repo).scheme not in ("http", "https"):
+            return None
+
+        entry_path = self.cache_dir.joinpath(
+            object_fingerprint(
+                {"chart": chart, "repo": repo.rstrip("/"), "version": version}
+            )
+        )
+        unpacked_chart_path = self._verified_chart_path(entry_path)
+        if unpacked_chart_path is not None:
+            return unpacked_chart_path
+
+        chart_entry = self._chart_entry(chart, repo, version)
+        if chart_entry is None or not chart_entry.get("urls"):
+            return None
+        self._pull(
+            archive_url=urljoin(repo.rstrip("/") + "/", chart_entry["urls"][0]),
+            digest=chart_entry.get("digest"),
+            entry_path=entry_path,
+        )
+        return self._verified_chart_path(entry_path)
+
+    def clear(self) -> None:
+        """
+        Remove every chart from the cache.
+        """
+        with self._lock:
+            self._indexes.clear()
+            self._verified.clear()
+        for entry_path in self.cache_dir.iterdir():
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+    def _chart_entry(
+        self,
+        chart: str,
+        repo: str,
+        version: str,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find the entry of the given chart version in the repository's index.
+        Indexes are only downloaded once per cache.
+        """
+        with self._lock:
+            if repo not in self._indexes:
+                self._indexes[repo] = self._download_index(repo)
+            index = self._indexes[repo]
+        if index is None:
+            return None
+        for chart_entry in (index.get("entries") or {}).get(chart) or []:
+            if str(chart_entry.get("version")) == version:
+                return dict(chart_entry)
+        return None
+
+    def _download(self, url: str) -> bytes:
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            content: bytes = response.read()
+            return content
+
+    def _download_index(self, repo: str) -> Optional[Dict[str, Any]]:
+        try:
+            index = yaml_backend.safe_load(
+                self._download(repo.rstrip("/") + "/index.yaml")
+            )
+        except (OSError, URLError, yaml.YAMLError):
+            return None
+        return index if isinstance(index, dict) else None
+
+    def _pull(
+        self,
+        archive_url: str,
+        digest: Optional[str],
+        entry_path: Path,
+    ) -> None:
+        """
+        Download, verify and unpack the given archive into a temporary
+        directory that is then moved into place, so that a partially pulled
+        chart is never used. When several callers pull the same chart at once,
+        the first one to finish wins.
+        """
+        archive = self._download(archive_url)
+        archive_digest = hashlib.sha256(archive).hexdigest()
+        if digest and digest.lower() != archive_digest:
+            raise RuntimeError(
+                f"Digest of chart archive {archive_url} ({archive_digest}) does not"
+                f" match the digest in the repository index ({digest})"
+            )
+
+        temp_path = Path(mkdtemp(dir=self.cache_dir, prefix=".pull-"))
+        try:
+            temp_path.joinpath(self.ARCHIVE_NAME).write_bytes(archive)
+            _unpack(temp_path.joinpath(self.ARCHIVE_NAME), temp_path.joinpath("chart"))
+            temp_path.joinpath(self.DIGEST_NAME).write_text(archive_digest)
+            try:
+                os.replace(temp_path, entry_path)
+            except OSError:
+                if not entry_path.is_dir():
+                    raise
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    def _verified_chart_path(self, entry_path: Path) -> Optional[str]:
+        """
+        Return the path of the unpacked chart in the given entry, if there is
+        one. The archive of an entry is checked against its recorded digest
+        the first time the entry is used by this cache, and entries that fail
+        the check are removed so that they are pulled again.
+        """
+        unpacked_path = entry_path.joinpath("chart")
+        if not unpacked_path.is_dir():
+            return None
+        with self._lock:
+            verified = str(entry_path) in self._verified
+        if not verified:
+            try:
+                verified = (
+                    file_fingerprint(str(entry_path.joinpath(self.ARCHIVE_NAME)))
+                    == entry_path.joinpath(self.DIGEST_NAME).read_text().strip()
+                )
+            except OSError:
+                verified = False
+            if not verified:
+                shutil.rmtree(entry_path, ignore_errors=True)
+                return None
+            with self._lock:
+                self._verified.add(str(entry_path))
+
+        chart_paths = [
+            chart_path for chart_path in unpacked_path.iterdir() if chart_path.is_dir()
+        ]
+        return str(chart_paths[0]) if len(chart_paths) == 1 else None
+
+
+def _unpack(archive_path: Path, destination_path: Path) -> None:
+    """
+    Unpack the regular files and directories of the given chart archive,
+    refusing any member that would land outside of the destination.
+    """
+    with tarfile.open(archive_path, mode="r:gz") as tar:
+        for member in tar.getmembers():
+            member_path = posixpath.normpath(member.name)
+            if member_path.startswith(("/", "../")) or member_path == "..":
+                raise RuntimeError(
+                    f"Chart archive {archive_path} contains an unsafe path"
+                    f" `{member.name}`"
+                )
+            target_path = destination_path.joinpath(*member_path.split("/"))
+            if member.isdir():
+                target_path.mkdir(parents=True, exist_ok=True)
+                continue
+            if not member.isfile():
+                continue
+            member_file = tar.extractfile(member)
+            if member_file is None:
+                continue
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            with member_file, open(target_path, mode="wb") as target_file:
+                shutil.copyfileobj(member_file, target_file)
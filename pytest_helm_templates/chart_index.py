@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, List, Optional, Union
+
+from pytest_helm_templates.fingerprint import chart_fingerprint, file_fingerprint
+
+
+# [modified time in nanoseconds, size in bytes, digest]
+IndexEntry = List[Union[int, str]]
+
+
+class ChartIndex:
+    """
+    A persistent index of the modification time, size and digest of every file
+    in the charts that have been fingerprinted. Files whose modification time
+    and size haven't changed since they were indexed aren't read again, so
+    fingerprinting an unchanged chart only costs a stat per file. This lets a
+    new session, e.g. a rerun by pytest-watcher, tell which charts changed and
+    reuse cached renders of the rest.
+    """
+
+    FORMAT_VERSION = 1
+    # Files modified this recently may still change within the resolution of
+    # their modification time, so their digests aren't trusted.
+    RACY_WINDOW = 2.0
+
+    def __init__(self, index_path: str) -> None:
+        self.index_path = Path(index_path)
+        self._charts: Optional[Dict[str, Dict[str, IndexEntry]]] = None
+        self._lock = threading.Lock()
+
+    def fingerprint(self, chart_path: str) -> str:
+        """
+        Like chart_fingerprint, but reusing the indexed digests of unchanged
+        files.
+        """
+        chart_path = os.path.abspath(chart_path)
+        with self._lock:
+            charts = self._load()
+            entries = charts.get(chart_path, {})
+            updated_entries: Dict[str, IndexEntry] = {}
+
+            def file_digest(file_path: str) -> str:
+                stat = os.stat(file_path)
+                relative_path = os.path.relpath(file_path, chart_path)
+                entry = entries.get(relative_path)
+                if entry is not None and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+                    updated_entries[relative_path] = entry
+                    return str(entry[2])
+
+                digest = file_fingerprint(file_path)
+                if time.time() - stat.st_mtime > self.RACY_WINDOW:
+                    updated_entries[relative_path] = [
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                        digest,
+                    ]
+                return digest
+
+            fingerprint = chart_fingerprint(chart_path, file_digest=file_digest)
+            if updated_entries != entries:
+                charts[chart_path] = updated_entries
+                self._save(charts)
+            return fingerprint
+
+    def _load(self) -> Dict[str, Dict[str, IndexEntry]]:
+        if self._charts is not None:
+            return self._charts
+
+        charts: Dict[str, Dict[str, IndexEntry]] = {}
+        try:
+            with open(self.index_path, encoding="utf-8", mode="r") as index_file:
+                index = json.load(index_file)
+            if index.get("format_version") == self.FORMAT_VERSION:
+                charts = index["charts"]
+        except (AttributeError, KeyError, OSError, ValueError):
+            pass
+        self._charts = charts
+        return charts
+
+    def _save(self, charts: Dict[str, Dict[str, IndexEntry]]) -> None:
+        # Charts are indexed by absolute path, so drop the entries of charts
+        # that have since been moved or removed to keep the index from growing
+        # without bound, e.g. with charts copied to temporary directories.
+        for indexed_chart_path in [path for path in charts if not os.path.isdir(path)]:
+            del charts[indexed_chart_path]
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            delete=False,
+            dir=self.index_path.parent,
+            encoding="utf-8",
+            mode="w",
+            suffix=".tmp",
+        ) as temp_file:
+            json.dump(
+                {"charts": charts, "format_version": self.FORMAT_VERSION},
+                temp_file,
+            )
+        os.replace(temp_file.name, self.index_path)
@@ -0,0 +1,189 @@
+import glob
+import hashlib
+import os
+import tarfile
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.semver import parse_version, version_matches
+from pytest_helm_templates.types import DependencyListItem
+
+
+# The files, relative to a chart, that determine whether its dependencies are
+# satisfied.
+DEPENDENCY_FILE_NAMES = (
+    "Chart.lock",
+    "Chart.yaml",
+    "requirements.lock",
+    "requirements.yaml",
+)
+OK_STATUS = "ok"
+
+
+def dependency_state_digest(chart_path: str) -> str:
+    """
+    Compute a digest of the modification time and size of the given chart's
+    dependency declarations, its lock file and every entry in its `charts/`
+    directory. This only costs a few stat calls and changes whenever a
+    dependency is added, updated or removed.
+    """
+    digest = hashlib.sha256()
+    charts_path = os.path.join(chart_path, "charts")
+    paths = [os.path.join(chart_path, file_name) for file_name in DEPENDENCY_FILE_NAMES]
+    if os.path.isdir(charts_path):
+        for entry_name in sorted(os.listdir(charts_path)):
+            entry_path = os.path.join(charts_path, entry_name)
+            paths.append(entry_path)
+            paths.append(os.path.join(entry_path, "Chart.yaml"))
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        digest.update(os.path.relpath(file_path, chart_path).encode("utf-8"))
+        digest.update(f"\0{stat.st_mtime_ns}\0{stat.st_size}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def dependency_statuses(chart_path: str) -> Optional[List[DependencyListItem]]:
+    """
+    Determine the status of each dependency of the given local chart the way
+    `helm dependency list` does, by comparing the dependencies declared by the
+    chart against the archives and directories in its `charts/` directory.
+    Dependencies locked to a version in Chart.lock are only ok when that exact
+    version is present. Unlike helm, satisfied unpacked dependencies are
+    reported as ok. Returns None when the chart can't be read.
+    """
+    metadata = _read_yaml(os.path.join(chart_path, "Chart.yaml"))
+    if metadata is None:
+        return None
+    requirements = metadata.get("dependencies")
+    lock = _read_yaml(os.path.join(chart_path, "Chart.lock"))
+    if metadata.get("apiVersion", "v1") == "v1":
+        requirements = (
+            _read_yaml(os.path.join(chart_path, "requirements.yaml")) or {}
+        ).get("dependencies", requirements)
+        lock = _read_yaml(os.path.join(chart_path, "requirements.lock")) or lock
+
+    locked_versions: Dict[str, Set[str]] = {}
+    for locked_dependency in (lock or {}).get("dependencies") or []:
+        locked_versions.setdefault(str(locked_dependency.get("name")), set()).add(
+            str(locked_dependency.get("version"))
+        )
+
+    subchart_versions = _subchart_versions(os.path.join(chart_path, "charts"))
+    dependency_list = []
+    for requirement in requirements or []:
+        name = str(requirement.get("name", ""))
+        version = str(requirement.get("version", ""))
+        status, found_version = _dependency_status(
+            chart_path, name, version, subchart_versions
+        )
+        locked = locked_versions.get(name)
+        if status == OK_STATUS and locked and found_version not in locked:
+            status = "wrong version"
+        dependency_list.append(
+            DependencyListItem(
+                name=name,
+                repository=str(requirement.get("repository", "")),
+                status=status,
+                version=version,
+            )
+        )
+    return dependency_list
+
+
+def _archive_paths(chart_path: str, name: str) -> List[str]:
+    archive_paths = glob.glob(
+        os.path.join(glob.escape(chart_path), "charts", f"{glob.escape(name)}-*.tgz")
+    )
+    if len(archive_paths) <= 1:
+        return archive_paths
+
+    # Like helm, only consider archives whose names end in a strict version.
+    versioned_archive_paths = []
+    for archive_path in archive_paths:
+        maybe_version = os.path.basename(archive_path)[len(name) + 1 : -len(".tgz")]
+        if maybe_version.count(".") < 2 or maybe_version.startswith("v"):
+            continue
+        try:
+            parse_version(maybe_version)
+        except ValueError:
+            continue
+        versioned_archive_paths.append(archive_path)
+    return versioned_archive_paths
+
+
+def _archive_metadata(archive_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with tarfile.open(archive_path, mode="r:gz") as tar:
+            for member in tar.getmembers():
+                # Archives hold the chart in a directory named after it.
+                if member.isfile() and member.name.count("/") == 1:
+                    if member.name.endswith("/Chart.yaml"):
+                        chart_file = tar.extractfile(member)
+                        if chart_file is not None:
+                            return yaml_backend.safe_load(chart_file.read()) or {}
+    except (OSError, tarfile.TarError, yaml.YAMLError):
+        return None
+    return None
+
+
+def _dependency_status(
+    chart_path: str,
+    name: str,
+    version: str,
+    subchart_versions: Dict[str, str],
+) -> Tuple[str, Optional[str]]:
+    """
+    Return the status of the given dependency along with the version of the
+    chart that was found for it, if any.
+    """
+    archive_paths = _archive_paths(chart_path, name)
+    if len(archive_paths) > 1:
+        return "too many matches", None
+    if archive_paths:
+        metadata = _archive_metadata(archive_paths[0])
+        if metadata is None:
+            return "corrupt", None
+        if metadata.get("name") != name:
+            return "misnamed", None
+        found_version = str(metadata.get("version", ""))
+        return _version_status(version, found_version), found_version
+
+    if name not in subchart_versions:
+        return "missing", None
+    found_version = subchart_versions[name]
+    return _version_status(version, found_version), found_version
+
+
+def _read_yaml(file_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(file_path, encoding="utf-8", mode="r") as file:
+            return yaml_backend.safe_load(file.read()) or {}
+    except (OSError, yaml.YAMLError):
+        return None
+
+
+def _subchart_versions(charts_path: str) -> Dict[str, str]:
+    if not os.path.isdir(charts_path):
+        return {}
+    subchart_versions = {}
+    for entry_name in sorted(os.listdir(charts_path)):
+        if entry_name[:1] in ("_", "."):
+            continue
+        metadata = _read_yaml(os.path.join(charts_path, entry_name, "Chart.yaml"))
+        if metadata is not None and metadata.get("name"):
+            subchart_versions[str(metadata["name"])] = str(metadata.get("version", ""))
+    return subchart_versions
+
+
+def _version_status(constraint: str, version: str) -> str:
+    if version == constraint:
+        return OK_STATUS
+    try:
+        return OK_STATUS if version_matches(constraint, version) else "wrong version"
+    except ValueError:
+        return "invalid version"
@@ -0,0 +1,223 @@
+import re
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from pytest_helm_templates.manifest_set import Manifest
+
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+
+# Keys that can be written as a dotted step of a Query path.
+PLAIN_KEY_PATTERN = re.compile(r"[^.\[\]\"'*]+")
+
+_OPERATION_SYMBOLS = {ADDED: "+", CHANGED: "~", REMOVED: "-"}
+
+
+class ManifestKey(NamedTuple):
+    """
+    The identity of a manifest across renders.
+    """
+
+    api_version: Any
+    kind: Any
+    namespace: Any
+    name: Any
+
+    @classmethod
+    def of(cls, manifest: Any) -> "ManifestKey":
+        if not isinstance(manifest, dict):
+            return cls(None, None, None, None)
+        metadata = manifest.get("metadata")
+        if not isinstance(metadata, dict):
+            metadata = {}
+        return cls(
+            api_version=manifest.get("apiVersion"),
+            kind=manifest.get("kind"),
+            name=metadata.get("name"),
+            namespace=metadata.get("namespace"),
+        )
+
+    def __str__(self) -> str:
+        name = f"{self.namespace}/{self.name}" if self.namespace else f"{self.name}"
+        return f"{self.api_version}/{self.kind} {name}"
+
+
+class Change(NamedTuple):
+    """
+    A difference between two renders. path is a Query path into the manifest,
+    or empty when the whole manifest was added or removed. old is None for
+    additions and new is None for removals.
+    """
+
+    key: ManifestKey
+    operation: str
+    path: str
+    old: Any
+    new: Any
+
+    def __str__(self) -> str:
+        symbol = _OPERATION_SYMBOLS[self.operation]
+        if not self.path:
+            return f"{symbol} {self.key}"
+        if self.operation == ADDED:
+            return f"{symbol} {self.key}: {self.path}: {self.new!r}"
+        if self.operation == REMOVED:
+            return f"{symbol} {self.key}: {self.path}: {self.old!r}"
+        return f"{symbol} {self.key}: {self.path}: {self.old!r} -> {self.new!r}"
+
+
+class RenderDiff(Sequence[Change]):
+    """
+    The changes between two renders, in the order of the manifests of the old
+    render followed by the manifests only found in the new one. A diff is
+    falsy when the renders are the same.
+    """
+
+    def __init__(self, changes: List[Change]) -> None:
+        self._changes = changes
+
+    @property
+    def added(self) -> List[ManifestKey]:
+        """
+        The manifests only found in the new render.
+        """
+        return [
+            change.key
+            for change in self._changes
+            if change.operation == ADDED and not change.path
+        ]
+
+    @property
+    def changed(self) -> List[ManifestKey]:
+        """
+        The manifests found in both renders whose content changed.
+        """
+        keys: Dict[ManifestKey, None] = {}
+        for change in self._changes:
+            if change.path:
+                keys.setdefault(change.key)
+        return list(keys)
+
+    @property
+    def removed(self) -> List[ManifestKey]:
+        """
+        The manifests only found in the old render.
+        """
+        return [
+            change.key
+            for change in self._changes
+            if change.operation == REMOVED and not change.path
+        ]
+
+    def filter(
+        self,
+        api_version: Optional[str] = None,
+        kind: Optional[str] = None,
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+    ) -> "RenderDiff":
+        """
+        Select the changes to the manifests matching all of the given
+        criteria.
+        """
+        criteria = ManifestKey(
+            api_version=api_version,
+            kind=kind,
+            name=name,
+            namespace=namespace,
+        )
+        return RenderDiff(
+            [
+                change
+                for change in self._changes
+                if all(
+                    expected is None or expected == actual
+                    for expected, actual in zip(criteria, change.key)
+                )
+            ]
+        )
+
+    def __getitem__(self, index: Any) -> Any:
+        return self._changes[index]
+
+    def __iter__(self) -> Iterator[Change]:
+        return iter(self._changes)
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def __str__(self) -> str:
+        return "\n".join(str(change) for change in self._changes)
+
+
+def diff_renders(old: Sequence[Manifest], new: Sequence[Manifest]) -> RenderDiff:
+    """
+    Compare two renders, e.g. of two versions of a chart or of a chart with
+    different values. Manifests are matched by apiVersion, kind, namespace and
+    name, in order when a render has several manifests with the same
+    identity, and matched manifests are compared key by key and item by item.
+    Values are compared with ==, so e.g. 1 and 1.0 are the same.
+    """
+    new_by_key: Dict[ManifestKey, List[Any]] = {}
+    for manifest in new:
+        new_by_key.setdefault(ManifestKey.of(manifest), []).append(manifest)
+
+    changes: List[Change] = []
+    for manifest in old:
+        key = ManifestKey.of(manifest)
+        matches = new_by_key.get(key)
+        if not matches:
+            changes.append(Change(key, REMOVED, "", manifest, None))
+            continue
+        _diff(key, manifest, matches.pop(0), "", changes)
+
+    for manifest in new:
+        key = ManifestKey.of(manifest)
+        matches = new_by_key.get(key)
+        if matches and matches[0] is manifest:
+            changes.append(Change(key, ADDED, "", None, manifest))
+            matches.pop(0)
+    return RenderDiff(changes)
+
+
+def _diff(
+    key: ManifestKey, old: Any, new: Any, path: str, changes: List[Change]
+) -> None:
+    # Equal subtrees are skipped as a whole by the comparison of dicts and
+    # lists, which runs in C and stops at the first difference, and shared
+    # subtrees, e.g. of frozen renders, aren't compared at all.
+    if old is new or old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for item_key, old_value in old.items():
+            item_path = _key_path(path, item_key)
+            if item_key in new:
+                _diff(key, old_value, new[item_key], item_path, changes)
+            else:
+                changes.append(Change(key, REMOVED, item_path, old_value, None))
+        for item_key, new_value in new.items():
+            if item_key not in old:
+                changes.append(
+                    Change(key, ADDED, _key_path(path, item_key), None, new_value)
+                )
+    elif isinstance(old, list) and isinstance(new, list):
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            _diff(key, old_item, new_item, f"{path}[{index}]", changes)
+        for index in range(len(new), len(old)):
+            changes.append(Change(key, REMOVED, f"{path}[{index}]", old[index], None))
+        for index in range(len(old), len(new)):
+            changes.append(Change(key, ADDED, f"{path}[{index}]", None, new[index]))
+    else:
+        changes.append(Change(key, CHANGED, path, old, new))
+
+
+def _key_path(path: str, key: Any) -> str:
+    """
+    Extend the given path with a key. Keys that aren't strings are quoted as
+    their str(), which is how Query finds them.
+    """
+    if isinstance(key, str) and PLAIN_KEY_PATTERN.fullmatch(key):
+        return f"{path}.{key}" if path else key
+    quote = "'" if '"' in str(key) else '"'
+    return f"{path}[{quote}{key}{quote}]"
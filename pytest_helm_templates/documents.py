@@ -0,0 +1,264 @@
+import itertools
+import mmap
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+import yaml
+
+from pytest_helm_templates import yaml_backend
+
+
+DOCUMENT_SEPARATOR_PATTERN = re.compile(r"^---(?:[ \t].*)?$", re.MULTILINE)
+DOCUMENT_SEPARATOR_BYTES_PATTERN = re.compile(rb"^---(?:[ \t].*)?$", re.MULTILINE)
+SOURCE_PATTERN = re.compile(r"^# Source: (.+?)[ \t]*$", re.MULTILINE)
+
+# Marks a value that can't be determined without parsing the whole document.
+UNKNOWN = object()
+
+
+@dataclass(frozen=True)
+class RawDocument:
+    """
+    A single, unparsed YAML document from the output of `helm template`.
+    """
+
+    content: str
+    source: Optional[str]
+
+    @property
+    def template_path(self) -> Optional[str]:
+        """
+        The path of the template that produced the document relative to the
+        chart, e.g. `templates/service.yaml`. This is the form of path that
+        helm matches `--show-only` arguments against.
+        """
+        return source_template_path(self.source) if self.source else None
+
+    @cached_property
+    def kind(self) -> Any:
+        """
+        The kind of the document. The kind is sniffed from the raw content
+        when possible, otherwise the document is parsed.
+        """
+        kind = sniff_kind(self.content)
+        if kind is not UNKNOWN:
+            return kind
+        return self.manifest.get("kind") if isinstance(self.manifest, dict) else None
+
+    @cached_property
+    def manifest(self) -> Any:
+        """
+        The parsed document. The document is parsed on first access.
+        """
+        return yaml_backend.safe_load(self.content)
+
+    @cached_property
+    def name(self) -> Any:
+        """
+        The metadata.name of the document. The name is sniffed from the raw
+        content when possible, otherwise the document is parsed.
+        """
+        name = sniff_name(self.content)
+        if name is not UNKNOWN:
+            return name
+        if not isinstance(self.manifest, dict):
+            return None
+        metadata = self.manifest.get("metadata")
+        return metadata.get("name") if isinstance(metadata, dict) else None
+
+
+def document_matcher(
+    kind: Optional[str] = None,
+    name: Optional[str] = None,
+    source: Optional[str] = None,
+) -> Callable[[RawDocument], bool]:
+    """
+    Build a predicate selecting the raw documents with the given kind,
+    metadata.name and source. source may be the full `# Source:` path or a
+    template path pattern like those given to `--show-only`. Documents are
+    only parsed when their kind or name can't be sniffed from their content.
+    """
+
+    def matches(document: RawDocument) -> bool:
+        if source is not None and source != document.source:
+            template_path = document.template_path
+            if template_path is None or not template_path_matches(
+                source, template_path
+            ):
+                return False
+        if kind is not None and kind != document.kind:
+            return False
+        if name is not None and name != document.name:
+            return False
+        return True
+
+    return matches
+
+
+def source_template_path(source: str) -> Optional[str]:
+    """
+    Strip the chart name from the given `# Source:` path, e.g.
+    `my-chart/templates/service.yaml` becomes `templates/service.yaml`.
+    """
+    _, _, template_path = source.partition("/")
+    return template_path or None
+
+
+def document_spans(output: Union[bytes, mmap.mmap]) -> List[Tuple[int, int]]:
+    """
+    Like split_documents, but for the encoded output of `helm template`,
+    which may be memory-mapped. Returns the start and end offset of each
+    document so that the output never has to be decoded as a whole.
+    """
+    spans = []
+    start = 0
+    for separator_match in DOCUMENT_SEPARATOR_BYTES_PATTERN.finditer(output):
+        spans.append((start, separator_match.start()))
+        start = separator_match.end()
+    spans.append((start, len(output)))
+
+    leading_start, leading_end = spans[0]
+    leading_chunk = output[leading_start:leading_end].decode("utf-8")
+    if not any(
+        line.strip() and not line.lstrip().startswith("#")
+        for line in leading_chunk.splitlines()
+    ):
+        spans = spans[1:]
+    return spans
+
+
+def split_documents(output: str) -> List[RawDocument]:
+    """
+    Split the output of `helm template` into its YAML documents without
+    parsing them. Each document yields the same value from yaml.safe_load as
+    the corresponding document from yaml.safe_load_all of the whole output.
+    """
+    chunks = DOCUMENT_SEPARATOR_PATTERN.split(output)
+    leading_chunk = chunks[0]
+    if not any(
+        line.strip() and not line.lstrip().startswith("#")
+        for line in leading_chunk.splitlines()
+    ):
+        chunks = chunks[1:]
+
+    documents = []
+    for chunk in chunks:
+        source_match = SOURCE_PATTERN.search(chunk)
+        documents.append(
+            RawDocument(
+                content=chunk,
+                source=source_match.group(1) if source_match else None,
+            )
+        )
+    return documents
+
+
+def template_path_matches(pattern: str, template_path: str) -> bool:
+    """
+    Determine whether the given template path matches the given
+    `--show-only` pattern following the glob rules helm uses, where wildcards
+    don't match path separators.
+    """
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        character = pattern[index]
+        class_end = pattern.find("]", index + 1) if character == "[" else -1
+        if character == "*":
+            regex += "[^/]*"
+        elif character == "?":
+            regex += "[^/]"
+        elif class_end != -1:
+            character_class = pattern[index + 1 : class_end]
+            negated = character_class.startswith("^")
+            character_class = character_class[1:] if negated else character_class
+            regex += "[^" if negated else "["
+            regex += character_class.replace("\\", "\\\\")
+            regex += "]"
+            index = class_end
+        else:
+            regex += re.escape(character)
+        index += 1
+    return re.fullmatch(regex, template_path) is not None
+
+
+def sniff_kind(content: str) -> Any:
+    """
+    The kind of the given raw document, sniffed without parsing it, or UNKNOWN
+    if it can't be sniffed.
+    """
+    return _sniff_scalar(content.splitlines(), key="kind", indent=0)
+
+
+def sniff_name(content: str) -> Any:
+    """
+    The metadata.name of the given raw document, sniffed without parsing it,
+    or UNKNOWN if it can't be sniffed.
+    """
+    return _sniff_metadata_name(content.splitlines())
+
+
+def _indentation(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _is_content_line(line: str) -> bool:
+    stripped_line = line.strip()
+    return bool(stripped_line) and not stripped_line.startswith("#")
+
+
+def _sniff_metadata_name(lines: List[str]) -> Any:
+    for index, line in enumerate(lines):
+        if not line.startswith("metadata:"):
+            continue
+        if _is_content_line(line[len("metadata:") :]):
+            return UNKNOWN
+
+        metadata_lines = []
+        for metadata_line in lines[index + 1 :]:
+            if _is_content_line(metadata_line) and _indentation(metadata_line) == 0:
+                break
+            metadata_lines.append(metadata_line)
+        content_lines = [line for line in metadata_lines if _is_content_line(line)]
+        if not content_lines:
+            return None
+        if any(line.lstrip().startswith("<<") for line in content_lines):
+            return UNKNOWN
+        return _sniff_scalar(
+            metadata_lines,
+            key="name",
+            indent=_indentation(content_lines[0]),
+        )
+    return None
+
+
+def _sniff_scalar(lines: List[str], key: str, indent: int) -> Any:
+    """
+    Find the scalar value of the given key among the lines at the given
+    indentation without parsing the whole document. Returns UNKNOWN when the
+    value can't be determined reliably from a single line.
+    """
+    prefix = f"{' ' * indent}{key}:"
+    for index, line in enumerate(lines):
+        if indent == 0 and _is_content_line(line) and line[0] in "{[?-":
+            return UNKNOWN
+        if not line.startswith(prefix):
+            continue
+
+        value = line[len(prefix) :]
+        if not value.strip() or value.strip()[0] in "|>&*!{[":
+            return UNKNOWN
+        for next_line in itertools.islice(lines, index + 1, None):
+            if _is_content_line(next_line):
+                if _indentation(next_line) > indent:
+                    return UNKNOWN
+                break
+
+        try:
+            parsed_line = yaml_backend.safe_load(f"{key}:{value}")
+        except yaml.YAMLError:
+            return UNKNOWN
+        return parsed_line[key]
+    return None
@@ -0,0 +1,49 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Optional
+
+
+def chart_fingerprint(
+    chart_path: str,
+    file_digest: Optional[Callable[[str], str]] = None,
+) -> str:
+    """
+    Compute a digest of every file in the given chart directory, including any
+    subcharts under `charts/`. Paths are hashed relative to the chart so the
+    digest is stable regardless of where the chart lives on disk. file_digest
+    computes the digest of each file and defaults to file_fingerprint.
+    """
+    digest_file = file_digest or file_fingerprint
+
+    digest = hashlib.sha256()
+    for dir_path, dir_names, file_names in os.walk(chart_path, followlinks=True):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            file_path = os.path.join(dir_path, file_name)
+            relative_path = os.path.relpath(file_path, chart_path)
+            digest.update(relative_path.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(digest_file(file_path).encode("utf-8"))
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_fingerprint(file_path: str) -> str:
+    """
+    Compute a digest of the contents of the given file.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, mode="rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_fingerprint(obj: Any) -> str:
+    """
+    Compute a digest of a JSON-like object such that equal objects always
+    produce the same digest regardless of key order.
+    """
+    serialized = json.dumps(obj, default=str, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
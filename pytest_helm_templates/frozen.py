@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, NoReturn, Tuple
+
+
+class FrozenDict(Dict[str, Any]):
+    """
+    A dict that can't be modified, so that one parsed render can be shared by
+    every consumer without copying. It compares, serializes and passes
+    isinstance checks like a dict. Call thaw() for a mutable copy.
+    """
+
+    __slots__ = ()
+
+    def thaw(self) -> Dict[str, Any]:
+        """
+        A mutable deep copy of this dict.
+        """
+        return {key: thaw(value) for key, value in self.items()}
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError(
+            f"{type(self).__name__} is immutable, use thaw() to get a mutable copy"
+        )
+
+    __delitem__ = _immutable
+    __ior__ = _immutable  # type: ignore[assignment]
+    __setitem__ = _immutable
+    clear = _immutable
+    pop = _immutable  # type: ignore[assignment]
+    popitem = _immutable
+    setdefault = _immutable  # type: ignore[assignment]
+    update = _immutable  # type: ignore[assignment]
+
+    def __copy__(self) -> "FrozenDict":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenDict":
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(List[Any]):
+    """
+    A list that can't be modified. See FrozenDict.
+    """
+
+    __slots__ = ()
+
+    def thaw(self) -> List[Any]:
+        """
+        A mutable deep copy of this list.
+        """
+        return [thaw(value) for value in self]
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError(
+            f"{type(self).__name__} is immutable, use thaw() to get a mutable copy"
+        )
+
+    __delitem__ = _immutable
+    __iadd__ = _immutable
+    __imul__ = _immutable
+    __setitem__ = _immutable  # type: ignore[assignment]
+    append = _immutable
+    clear = _immutable
+    extend = _immutable
+    insert = _immutable
+    pop = _immutable
+    remove = _immutable
+    reverse = _immutable
+    sort = _immutable  # type: ignore[assignment]
+
+    def __copy__(self) -> "FrozenList":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenList":
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively convert the dicts and lists in the given value to FrozenDicts
+    and FrozenLists, and the sets YAML parses from `!!set` to frozensets.
+    Values that are already frozen are returned as they are, as are scalars,
+    which YAML only ever parses to immutable types.
+    """
+    if isinstance(value, (FrozenDict, FrozenList, frozenset)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    Recursively copy the dicts, lists and sets, frozen or not, in the given
+    value into plain mutable dicts, lists and sets. Unlike copy.deepcopy, this
+    only walks containers, which makes it much cheaper for parsed YAML.
+    """
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    if isinstance(value, (frozenset, set)):
+        return set(value)
+    return value
@@ -1,25 +1,130 @@
+import copy
+import os
 import subprocess
-import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import replace
 from os import path
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import IO, Any, Dict, List, Optional, Tuple, Union
-from uuid import uuid4
+from tempfile import TemporaryFile
+from typing import (
+    IO,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    TypeVar,
+    Union,
+)
 
-import yaml
+from pytest_helm_templates.base_helm_runner import (
+    COMPUTED_VALUES_RELEASE_NAME,
+    BaseHelmRunner,
+)
+from pytest_helm_templates.chart_cache import ChartCache
+from pytest_helm_templates.chart_index import ChartIndex
+from pytest_helm_templates.commands import ShowValuesCommand
+from pytest_helm_templates.documents import (
+    RawDocument,
+    source_template_path,
+    split_documents,
+    template_path_matches,
+)
+from pytest_helm_templates.fingerprint import file_fingerprint, object_fingerprint
+from pytest_helm_templates.frozen import freeze
+from pytest_helm_templates.instrumentation import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    DECODE_PHASE,
+    HELM_PHASE,
+    MEMO_HITS,
+    PARSE_PHASE,
+    RENDER_PHASE,
+    Instrumentation,
+)
+from pytest_helm_templates.lazy_manifest_set import LazyManifestSet
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.native_values import (
+    HELM_ENGINE,
+    NATIVE_ENGINE,
+    VERIFY_ENGINE,
+)
+from pytest_helm_templates.render_cache import RenderCache
+from pytest_helm_templates.shadow_chart import ADHOC_TEMPLATE_PATH, shadow_chart
+from pytest_helm_templates.types import (
+    BatchResult,
+    DependencyListItem,
+    SourcedManifests,
+    TemplateOptions,
+)
 
-from pytest_helm_templates.commands import ShowValuesCommand, TemplateCommand
-from pytest_helm_templates.types import DependencyListItem
 
+T = TypeVar("T")
 
-class HelmRunner:
+
+class HelmRunner(BaseHelmRunner):
     def __init__(
         self,
         cwd: Optional[str] = None,
         env: Optional[Dict[str, str]] = None,
+        computed_values_engine: str = HELM_ENGINE,
+        chart_cache: Optional[ChartCache] = None,
+        chart_index: Optional[ChartIndex] = None,
+        frozen_results: bool = False,
+        helm_binary: str = "helm",
+        instrumentation: Optional[Instrumentation] = None,
+        max_workers: Optional[int] = None,
+        memoize: bool = False,
+        render_cache: Optional[RenderCache] = None,
+        shadow_charts: bool = False,
+        slice_show_only: bool = False,
     ) -> None:
-        self.cwd = cwd
-        self.env = env
+        """
+        chart_cache, when given, is used to pull pinned charts from HTTP
+        repositories once and render them from disk from then on.
+        chart_index, when given, is used to fingerprint local charts without
+        reading files that haven't changed since they were last indexed.
+        instrumentation, when given, receives the timed phases of every helm
+        call along with cache hit and miss counts.
+        When memoize is True, rendered output and chart values are kept in
+        memory for the life of the runner and identical renders are only
+        performed once. Memoized results are deep copied for every caller
+        unless frozen_results is True, in which case they are frozen once and
+        every caller shares the same FrozenDicts and FrozenLists. max_workers
+        limits how many helm processes the runner will run at the same time.
+        When shadow_charts is True, adhoc templates, computed values and notes
+        are rendered against a shadow chart without the chart's other
+        templates. When slice_show_only is True, template calls with show_only are
+        answered from a single full render of the chart instead of rendering
+        the chart again for every show_only request.
+        """
+        super().__init__(
+            chart_cache=chart_cache,
+            computed_values_engine=computed_values_engine,
+            cwd=cwd,
+            env=env,
+            helm_binary=helm_binary,
+            shadow_charts=shadow_charts,
+        )
+        self.chart_index = chart_index
+        self.frozen_results = frozen_results
+        self.instrumentation = instrumentation
+        self.max_workers = max_workers
+        self.memoize = memoize
+        self.render_cache = render_cache
+        self.slice_show_only = slice_show_only
+        self._helm_version: Optional[str] = None
+        self._memo: Dict[str, Any] = {}
+        self._source_indexes: Dict[str, Dict[str, List[int]]] = {}
+        self._process_slots: ContextManager[Any] = nullcontext()
+        if max_workers:
+            self._process_slots = threading.BoundedSemaphore(max_workers)
 
     def values(
         self,
@@ -28,20 +133,37 @@ class HelmRunner:
         version: Optional[str] = None,
     ) -> Dict:
         """
-        Collect the values of the given chart.
+        Collect the values of the given chart. Like renders, the values of
+        local charts and pinned remote charts are memoized and cached.
         """
-        helm_arguments = ShowValuesCommand.helm_arguments(
-            chart=chart,
-            repo=repo,
-            version=version,
-        )
 
-        values_output = self._run(helm_arguments=helm_arguments)
-        values = yaml.safe_load(values_output)
-        if not isinstance(values, Dict):
-            raise ValueError(
-                "Unexpected values. Expected dict, got" f" {type(values)}: {values}"
+        def show_values() -> Dict:
+            cached_chart_path = self._cached_chart_path(chart, repo, version)
+            helm_arguments = (
+                ShowValuesCommand.helm_arguments(chart=cached_chart_path)
+                if cached_chart_path is not None
+                else ShowValuesCommand.helm_arguments(
+                    chart=chart,
+                    repo=repo,
+                    version=version,
+                )
             )
+            values_output = self._run(helm_arguments=helm_arguments)
+            return self._parse_values(values_output)
+
+        cache_key = (
+            self._values_cache_key(chart=chart, repo=repo, version=version)
+            if self.memoize or self.render_cache is not None
+            else None
+        )
+        values: Dict = self._cached(
+            cache_key,
+            show_values,
+            memoize=self.memoize,
+            share=freeze if self.frozen_results else None,
+        )
+        if self.memoize and cache_key is not None and not self.frozen_results:
+            values = copy.deepcopy(values)
         return values
 
     def adhoc_template(
@@ -64,40 +186,43 @@ class HelmRunner:
         Like template, but renders a single adhoc template populated with the
         given content.
         """
-        chart_path = Path(chart) if not self.cwd else Path(self.cwd).joinpath(chart)
-        if not path.exists(chart_path):
-            raise ValueError(
-                "Adhoc templates can only be rendered for local charts. Could"
-                f" not find local chart `{chart}` ({str(chart_path)})"
-            )
+        chart_path = self._local_chart_path(chart, description="Adhoc templates")
+        options = TemplateOptions(
+            api_versions=api_versions,
+            chart=chart,
+            dry_run=dry_run,
+            include_crds=include_crds,
+            is_upgrade=is_upgrade,
+            kube_version=kube_version,
+            name=name,
+            namespace=namespace,
+            repo=repo,
+            skip_tests=skip_tests,
+            values=values,
+            version=version,
+        )
 
-        templates_dir_path = chart_path.joinpath("templates")
-
-        with NamedTemporaryFile(
-            dir=templates_dir_path,
-            encoding="utf-8",
-            mode="w",
-        ) as temp_file:
-            temp_file_name = path.basename(temp_file.name)
-            temp_file.write(content)
-            temp_file.flush()
-            manifests = self.template(
-                api_versions=api_versions,
-                chart=chart,
-                dry_run=dry_run,
-                include_crds=include_crds,
-                is_upgrade=is_upgrade,
-                kube_version=kube_version,
-                name=name,
-                namespace=namespace,
-                repo=repo,
-                show_only=[f"templates/{temp_file_name}"],
-                skip_tests=skip_tests,
-                values=values,
-                version=version,
+        if self.shadow_charts:
+            return self._shadow_adhoc_template(chart_path, content, options)
+
+        with self._adhoc_template_file(chart_path, content) as template_path:
+            # The temporary template makes every adhoc render unique, so there
+            # is nothing to gain from caching it.
+            manifests = self._template(
+                options=replace(options, show_only=[template_path]),
+                cacheable=False,
             )
             return manifests[0]
 
+    def computed_values_batch(
+        self,
+        requests: Iterable[Mapping[str, Any]],
+    ) -> List[BatchResult[Dict]]:
+        """
+        Like template_batch, but for computed_values.
+        """
+        return self._batch(self.computed_values, requests)
+
     def computed_values(
         self,
         chart: str,
@@ -109,49 +234,35 @@ class HelmRunner:
         a local chart to inject an adhoc template into. There are ways to work
         around that, but an adhoc template seems simpler and less error prone.
         """
-        chart_path = Path(chart) if not self.cwd else Path(self.cwd).joinpath(chart)
-        if not path.exists(chart_path):
-            # We could instead take COMPUTED VALUES from `helm install [name]
-            # [chart] --dry-run --debug -f <your_values_file>`, but for now
-            # I've taken the easy way out.
-            # https://github.com/helm/helm/issues/6772
-            raise ValueError(
-                "Computed values can only be rendered for local charts. Could"
-                f" not find local chart `{chart}` ({str(chart_path)})"
-            )
+        # We could instead take COMPUTED VALUES from `helm install [name]
+        # [chart] --dry-run --debug -f <your_values_file>`, but for now
+        # I've taken the easy way out.
+        # https://github.com/helm/helm/issues/6772
+        chart_path = self._local_chart_path(chart, description="Computed values")
+        if self.computed_values_engine == NATIVE_ENGINE:
+            return self._memoized_native_computed_values(chart, chart_path, values)
 
         values_output = self.adhoc_template(
             chart=chart,
             content="{{ toYaml .Values }}",
-            name=str(uuid4()),
+            name=COMPUTED_VALUES_RELEASE_NAME,
             values=values,
         )
-        if not isinstance(values_output, Dict):
-            raise ValueError(
-                "Unexpected computed values. Expected dict, got"
-                f" {type(values_output)}: {values_output}"
+        computed_values = self._parse_computed_values(values_output)
+        if self.computed_values_engine == VERIFY_ENGINE:
+            self._verify_computed_values(
+                chart=chart,
+                helm_values=computed_values,
+                native_values=self._native_computed_values(chart_path, values),
             )
-        return values_output
+        return computed_values
 
     def dependency_build(self, chart: str) -> None:
         self._run(["helm", "dependency", "build", chart])
 
     def dependency_list(self, chart: str) -> List[DependencyListItem]:
         dependency_list_output = self._run(["helm", "dependency", "list", chart])
-        rows = [row for row in dependency_list_output.split("\n") if row][1:]
-        rows_fields = [row.split("\t") for row in rows]
-        records = [
-            [field.strip() for field in row_fields] for row_fields in rows_fields
-        ]
-        return [
-            DependencyListItem(
-                name=record[0],
-                repository=record[2],
-                status=record[3],
-                version=record[1],
-            )
-            for record in records
-        ]
+        return self._parse_dependency_list(dependency_list_output)
 
     def dependency_update(self, chart: str) -> None:
         self._run(["helm", "dependency", "update", chart])
@@ -159,10 +270,15 @@ class HelmRunner:
     def dependency_update_if_missing(self, chart: str) -> None:
         """
         Like dependency_update, but only triggers dependency_update if any of
-        the dependencies are not ok.
+        the dependencies are not ok. For local charts this is decided from the
+        chart's Chart.yaml, Chart.lock and `charts/` directory without running
+        helm, and the verdict is reused until any of them change.
         """
-        dependency_list = self.dependency_list(chart=chart)
-        if not dependency_list or all(item.is_ok for item in dependency_list):
+        dependencies_satisfied = self._dependencies_satisfied(chart)
+        if dependencies_satisfied is None:
+            dependency_list = self.dependency_list(chart=chart)
+            dependencies_satisfied = all(item.is_ok for item in dependency_list)
+        if dependencies_satisfied:
             return
         self.dependency_update(chart=chart)
 
@@ -187,26 +303,12 @@ class HelmRunner:
 
         Related helm issue: https://github.com/helm/helm/issues/6901
         """
-        chart_path = Path(chart) if not self.cwd else Path(self.cwd).joinpath(chart)
-        if not path.exists(chart_path):
-            raise ValueError(
-                "Notes can only be rendered for local charts. Could not find local"
-                f" chart `{chart}` ({str(chart_path)})"
-            )
-
-        templates_dir_path = chart_path.joinpath("templates")
-        notes_path = templates_dir_path.joinpath("NOTES.txt")
-        if not path.exists(notes_path):
-            raise ValueError(f"Unable to find notes template at `{notes_path}`")
-
-        with open(notes_path, encoding="utf-8", mode="r") as notes_file:
-            notes_template = notes_file.read()
-        indented_notes_template = textwrap.indent(notes_template, "  ")
+        chart_path = self._local_chart_path(chart, description="Notes")
 
         notes_result = self.adhoc_template(
             api_versions=api_versions,
             chart=chart,
-            content=f"---\nNOTES.txt: |\n{indented_notes_template}",
+            content=self._notes_content(chart_path),
             dry_run=dry_run,
             include_crds=False,
             is_upgrade=is_upgrade,
@@ -218,13 +320,7 @@ class HelmRunner:
             values=values,
             version=version,
         )
-        notes_output = notes_result["NOTES.txt"]
-        if not isinstance(notes_output, str):
-            raise ValueError(
-                "Unexpected notes template output. Expected string, got"
-                " {type(notes_output)}: {notes_output}"
-            )
-        return notes_output
+        return self._parse_notes(notes_result)
 
     def template(
         self,
@@ -241,62 +337,646 @@ class HelmRunner:
         skip_tests: Optional[bool] = None,
         values: Optional[List[Union[Dict[str, Any], str]]] = None,
         version: Optional[str] = None,
-    ) -> List[Dict]:
-        chart_path = Path(chart) if not self.cwd else Path(self.cwd).joinpath(chart)
-
-        _values = []
-        temp_files: List[IO] = []
-        try:
-            if values:
-                for values_instance in values:
-                    if isinstance(values_instance, str):
-                        _values.append(values_instance)
-                    else:
-                        temp_file_path, temp_file = self._reify_values(values_instance)
-                        _values.append(temp_file_path)
-                        temp_files.append(temp_file)
-            helm_arguments = TemplateCommand.helm_arguments(
+    ) -> ManifestSet:
+        """
+        Render the given chart with `helm template`. The rendered manifests are
+        returned as a ManifestSet, a list that can also be queried by kind,
+        name, namespace, labels and source template.
+        """
+        options = TemplateOptions(
+            api_versions=api_versions,
+            chart=chart,
+            dry_run=dry_run,
+            include_crds=include_crds,
+            is_upgrade=is_upgrade,
+            kube_version=kube_version,
+            name=name,
+            namespace=namespace,
+            repo=repo,
+            show_only=show_only,
+            skip_tests=skip_tests,
+            values=values,
+            version=version,
+        )
+        return self._template(options=options)
+
+    def template_batch(
+        self,
+        requests: Iterable[Mapping[str, Any]],
+    ) -> List[BatchResult[ManifestSet]]:
+        """
+        Render many charts at the same time on a thread pool sized by
+        max_workers, or the number of cores if max_workers isn't set. Each
+        request holds the keyword arguments of a template call. Results are
+        returned in the order of the requests, and a request that fails is
+        reported in its result instead of aborting the batch.
+        """
+        return self._batch(self.template, requests)
+
+    def template_fingerprint(
+        self,
+        chart: str,
+        name: str,
+        api_versions: Optional[List[str]] = None,
+        dry_run: Optional[str] = None,
+        include_crds: Optional[bool] = None,
+        is_upgrade: Optional[bool] = None,
+        kube_version: Optional[str] = None,
+        namespace: Optional[str] = None,
+        repo: Optional[str] = None,
+        show_only: Optional[List[str]] = None,
+        skip_tests: Optional[bool] = None,
+        values: Optional[List[Union[Dict[str, Any], str]]] = None,
+        version: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        A digest of everything the output of the given template call depends
+        on: the chart's files, the values, the arguments and the helm version.
+        None is returned when the output can't be reliably identified, e.g.
+        for an unpinned remote chart.
+        """
+        return self._template_cache_key(
+            TemplateOptions(
                 api_versions=api_versions,
-                chart=str(chart_path),
+                chart=chart,
                 dry_run=dry_run,
                 include_crds=include_crds,
                 is_upgrade=is_upgrade,
                 kube_version=kube_version,
-                namespace=namespace,
                 name=name,
+                namespace=namespace,
                 repo=repo,
                 show_only=show_only,
                 skip_tests=skip_tests,
-                values=_values,
+                values=values,
                 version=version,
             )
-            templates_yaml = self._run(helm_arguments)
-        finally:
-            for temp_file in temp_files:
-                temp_file.close()
+        )
 
-        return list(yaml.safe_load_all(templates_yaml))
+    def template_lazy(
+        self,
+        chart: str,
+        name: str,
+        api_versions: Optional[List[str]] = None,
+        dry_run: Optional[str] = None,
+        include_crds: Optional[bool] = None,
+        is_upgrade: Optional[bool] = None,
+        kube_version: Optional[str] = None,
+        namespace: Optional[str] = None,
+        repo: Optional[str] = None,
+        show_only: Optional[List[str]] = None,
+        skip_tests: Optional[bool] = None,
+        values: Optional[List[Union[Dict[str, Any], str]]] = None,
+        version: Optional[str] = None,
+    ) -> LazyManifestSet:
+        """
+        Like template, but helm writes its output straight to a temporary
+        file that is memory-mapped and indexed instead of parsed, and each
+        manifest is only parsed when it is accessed. This bounds the memory
+        used by renders of charts with large CRDs that tests rarely look at.
+        Lazy renders are never cached.
+        """
+        options = TemplateOptions(
+            api_versions=api_versions,
+            chart=chart,
+            dry_run=dry_run,
+            include_crds=include_crds,
+            is_upgrade=is_upgrade,
+            kube_version=kube_version,
+            name=name,
+            namespace=namespace,
+            repo=repo,
+            show_only=show_only,
+            skip_tests=skip_tests,
+            values=values,
+            version=version,
+        )
+        helm_arguments, stdin = self._template_helm_invocation(
+            self._with_cached_chart(options)
+        )
+        with TemporaryFile() as output_file:
+            self._run_to_file(helm_arguments, output_file=output_file, stdin=stdin)
+            with self._measure(PARSE_PHASE, chart=chart):
+                return LazyManifestSet.from_file(output_file)
 
-    def _reify_values(self, values: Dict) -> Tuple[str, IO]:
-        temp_file = NamedTemporaryFile(delete=False, mode="w")
-        temp_file.write(yaml.safe_dump(values))
-        temp_file.flush()
-        return temp_file.name, temp_file
+    def template_stream(
+        self,
+        chart: str,
+        name: str,
+        api_versions: Optional[List[str]] = None,
+        dry_run: Optional[str] = None,
+        include_crds: Optional[bool] = None,
+        is_upgrade: Optional[bool] = None,
+        kube_version: Optional[str] = None,
+        namespace: Optional[str] = None,
+        repo: Optional[str] = None,
+        select: Optional[Callable[[RawDocument], bool]] = None,
+        show_only: Optional[List[str]] = None,
+        skip_tests: Optional[bool] = None,
+        values: Optional[List[Union[Dict[str, Any], str]]] = None,
+        version: Optional[str] = None,
+    ) -> Iterator[Any]:
+        """
+        Like template, but the output is split into raw documents without
+        parsing and a generator is returned that only parses the documents
+        accepted by select as they are consumed. See document_matcher for
+        building a select predicate that sniffs the kind and name of a
+        document without parsing it. Streamed renders are never cached.
+        """
+        options = TemplateOptions(
+            api_versions=api_versions,
+            chart=chart,
+            dry_run=dry_run,
+            include_crds=include_crds,
+            is_upgrade=is_upgrade,
+            kube_version=kube_version,
+            name=name,
+            namespace=namespace,
+            repo=repo,
+            show_only=show_only,
+            skip_tests=skip_tests,
+            values=values,
+            version=version,
+        )
+        documents = split_documents(self._template_output(options))
+        return (
+            document.manifest
+            for document in documents
+            if select is None or select(document)
+        )
+
+    def values_batch(
+        self,
+        requests: Iterable[Mapping[str, Any]],
+    ) -> List[BatchResult[Dict]]:
+        """
+        Like template_batch, but for values.
+        """
+        return self._batch(self.values, requests)
+
+    def helm_version(self) -> str:
+        """
+        The version of the helm binary used by this runner. The version is
+        only collected once per runner.
+        """
+        if self._helm_version is None:
+            self._helm_version = self._run(["helm", "version", "--short"]).strip()
+        return self._helm_version
+
+    def _batch(
+        self,
+        method: Callable[..., T],
+        requests: Iterable[Mapping[str, Any]],
+    ) -> List[BatchResult[T]]:
+        """
+        Call the given method with each request on a thread pool of its own,
+        which is shut down before returning. The pool has at most max_workers
+        threads, or one per core, and never more than there are requests.
+        Threads spend most of their time waiting on helm. When max_workers is
+        set, it also limits the helm processes of every batch and call running
+        on the runner at the same time. Identical requests in a batch are only
+        rendered once with a render cache, whose lock makes them wait for the
+        first render. Memoizing alone doesn't stop them rendering concurrently.
+        """
+
+        def call(request: Mapping[str, Any]) -> BatchResult[T]:
+            try:
+                return BatchResult(value=method(**request))
+            except Exception as error:
+                return BatchResult(error=error)
+
+        requests = list(requests)
+        if not requests:
+            return []
+
+        max_workers = min(len(requests), self.max_workers or os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(call, requests))
+
+    def _cached(
+        self,
+        cache_key: Optional[str],
+        render: Callable[[], T],
+        memoize: bool,
+        share: Optional[Callable[[T], T]] = None,
+    ) -> T:
+        """
+        Return the memoized or cached result for the given key, calling render
+        to produce and store the result if there isn't one yet. Memoized
+        results are shared, so they are passed through share before they are
+        memoized, or callers must copy them before handing them out.
+        """
+        if cache_key is None:
+            return render()
+
+        if memoize and cache_key in self._memo:
+            self._count(MEMO_HITS)
+            memoized_result: T = self._memo[cache_key]
+            return memoized_result
+
+        result: Optional[T] = None
+        if self.render_cache is not None:
+            result = self.render_cache.get(cache_key)
+            if result is None:
+                # Only one process renders a given key at a time. Anyone
+                # waiting on the lock picks up the stored result instead of
+                # rendering it again.
+                with self.render_cache.lock(cache_key):
+                    result = self.render_cache.get(cache_key)
+                    if result is None:
+                        self._count(CACHE_MISSES)
+                        result = render()
+                        self.render_cache.put(cache_key, result)
+                    else:
+                        self._count(CACHE_HITS)
+            else:
+                self._count(CACHE_HITS)
+        else:
+            self._count(CACHE_MISSES)
+            result = render()
+
+        if memoize:
+            if share is not None:
+                result = share(result)
+            self._memo[cache_key] = result
+        return result
+
+    def _chart_digest(self, chart_path: Path) -> str:
+        if self.chart_index is not None and path.isdir(chart_path):
+            return self.chart_index.fingerprint(str(chart_path))
+        return super()._chart_digest(chart_path)
+
+    def _chart_key(
+        self,
+        chart: str,
+        repo: Optional[str],
+        version: Optional[str],
+    ) -> Optional[List[str]]:
+        """
+        Identify the content of the given chart, by digest for a local chart
+        and by name for a pinned remote chart, whose content never changes.
+        Returns None for unpinned remote charts.
+        """
+        chart_path = self._chart_path(chart)
+        if not repo and path.isdir(chart_path):
+            return ["local", self._chart_digest(chart_path)]
+        if version:
+            return ["remote", chart]
+        return None
+
+    def _count(self, counter: str) -> None:
+        if self.instrumentation is not None:
+            self.instrumentation.count(counter)
+
+    def _freeze_documents(self, documents: SourcedManifests) -> SourcedManifests:
+        return [(source, freeze(manifest)) for source, manifest in documents]
+
+    def _memoized_native_computed_values(
+        self,
+        chart: str,
+        chart_path: Path,
+        values: Optional[List[Union[Dict[str, Any], str]]],
+    ) -> Dict:
+        """
+        Compute values natively, memoizing and caching them like renders. The
+        key only depends on the chart's files and the given values, as helm
+        isn't involved.
+        """
+        chart_key: Optional[List[str]] = None
+        cache_key: Optional[str] = None
+        if self.memoize or self.render_cache is not None:
+            chart_key = self._chart_key(chart, None, None)
+            values_key = self._values_key(values)
+            if chart_key is not None and values_key is not None:
+                cache_key = object_fingerprint(
+                    {
+                        "chart": chart_key,
+                        "engine": NATIVE_ENGINE,
+                        "values": values_key,
+                    }
+                )
+        computed_values: Dict = self._cached(
+            cache_key,
+            lambda: self._native_computed_values(
+                chart_path, values, chart_key[1] if chart_key is not None else None
+            ),
+            memoize=self.memoize,
+            share=freeze if self.frozen_results else None,
+        )
+        if self.memoize and cache_key is not None and not self.frozen_results:
+            computed_values = copy.deepcopy(computed_values)
+        return computed_values
+
+    def _measure(
+        self,
+        phase: str,
+        chart: Optional[str] = None,
+        helm_arguments: Optional[List[str]] = None,
+        output_size: Optional[int] = None,
+    ) -> ContextManager[None]:
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.measure(
+            phase,
+            chart=chart,
+            helm_arguments=helm_arguments,
+            output_size=output_size,
+        )
 
-    def _run(self, helm_arguments: List[str]) -> str:
-        completed_process = subprocess.run(
+    def _render_template(self, options: TemplateOptions) -> SourcedManifests:
+        helm_arguments = (
+            self._template_helm_arguments(
+                options=options,
+                chart=options.chart,
+                values=None,
+            )
+            if self.instrumentation is not None
+            else None
+        )
+        with self._measure(
+            RENDER_PHASE,
+            chart=options.chart,
+            helm_arguments=helm_arguments,
+        ):
+            templates_yaml = self._template_output(options)
+            with self._measure(
+                PARSE_PHASE,
+                chart=options.chart,
+                output_size=len(templates_yaml),
+            ):
+                return self._parse_template_output(templates_yaml)
+
+    def _select_show_only(
+        self,
+        cache_key: Optional[str],
+        documents: SourcedManifests,
+        show_only: List[str],
+    ) -> SourcedManifests:
+        """
+        Select the documents helm would have rendered for the given
+        `--show-only` patterns from the documents of a full render.
+        """
+        source_index = self._source_indexes.get(cache_key) if cache_key else None
+        if source_index is None:
+            source_index = {}
+            for position, (source, _) in enumerate(documents):
+                template_path = source_template_path(source) if source else None
+                if template_path:
+                    source_index.setdefault(template_path, []).append(position)
+            if cache_key:
+                self._source_indexes[cache_key] = source_index
+
+        selected_documents: SourcedManifests = []
+        for pattern in show_only:
+            if pattern in source_index:
+                positions = source_index[pattern]
+            else:
+                positions = sorted(
+                    position
+                    for template_path, template_positions in source_index.items()
+                    if template_path_matches(pattern, template_path)
+                    for position in template_positions
+                )
+            if not positions:
+                raise RuntimeError(f"could not find template {pattern} in chart")
+            selected_documents.extend(documents[position] for position in positions)
+        return selected_documents
+
+    def _shadow_adhoc_template(
+        self,
+        chart_path: Path,
+        content: str,
+        options: TemplateOptions,
+    ) -> Dict:
+        """
+        Render an adhoc template against a shadow chart of the given chart.
+        The cache key is computed from the chart itself, so the shadow chart
+        is only built when the render isn't memoized or cached.
+        """
+        shadow_options = replace(options, show_only=[ADHOC_TEMPLATE_PATH])
+        template_cache_key = (
+            self._template_cache_key(shadow_options)
+            if self.memoize or self.render_cache is not None
+            else None
+        )
+        cache_key = (
+            object_fingerprint({"adhoc": content, "template": template_cache_key})
+            if template_cache_key is not None
+            else None
+        )
+
+        def render() -> SourcedManifests:
+            with shadow_chart(chart_path, content) as shadow_chart_path:
+                return self._render_template(
+                    replace(shadow_options, chart=str(shadow_chart_path))
+                )
+
+        documents = self._cached(
+            cache_key,
+            render,
+            memoize=self.memoize,
+            share=self._freeze_documents if self.frozen_results else None,
+        )
+        manifest: Dict = documents[0][1]
+        if self.memoize and cache_key is not None and not self.frozen_results:
+            manifest = copy.deepcopy(manifest)
+        return manifest
+
+    def _template(
+        self,
+        options: TemplateOptions,
+        cacheable: bool = True,
+    ) -> ManifestSet:
+        """
+        Render the given template options. When the runner slices show_only
+        requests, the chart is rendered in full once and every subsequent
+        show_only request for the same chart, values and flags is answered
+        from that render.
+        """
+        slice_show_only = cacheable and self.slice_show_only and bool(options.show_only)
+        render_options = (
+            replace(options, show_only=None) if slice_show_only else options
+        )
+        memoize = self.memoize or slice_show_only
+        cache_key = (
+            self._template_cache_key(render_options)
+            if cacheable and (memoize or self.render_cache is not None)
+            else None
+        )
+
+        documents = self._cached(
+            cache_key,
+            lambda: self._render_template(render_options),
+            memoize=memoize,
+            share=self._freeze_documents if self.frozen_results else None,
+        )
+        if slice_show_only and options.show_only:
+            documents = self._select_show_only(
+                cache_key=cache_key,
+                documents=documents,
+                show_only=options.show_only,
+            )
+
+        manifests = [manifest for _, manifest in documents]
+        if memoize and cache_key is not None and not self.frozen_results:
+            manifests = copy.deepcopy(manifests)
+        return ManifestSet(
+            manifests=manifests,
+            sources=[source for source, _ in documents],
+        )
+
+    def _template_output(self, options: TemplateOptions) -> str:
+        helm_arguments, stdin = self._template_helm_invocation(
+            self._with_cached_chart(options)
+        )
+        return self._run(helm_arguments, stdin=stdin)
+
+    def _template_cache_key(self, options: TemplateOptions) -> Optional[str]:
+        """
+        Compute a key that uniquely identifies the output of the given
+        template invocation, or None if the output can't be reliably
+        identified, e.g. for an unpinned remote chart or values given by URL.
+        """
+        chart_key = self._chart_key(options.chart, options.repo, options.version)
+        if chart_key is None:
+            return None
+        chart_argument = "<chart>" if chart_key[0] == "local" else options.chart
+        values_key = self._values_key(options.values)
+        if values_key is None:
+            return None
+        return object_fingerprint(
+            {
+                "arguments": self._template_helm_arguments(
+                    options=options,
+                    chart=chart_argument,
+                    values=None,
+                ),
+                "chart": chart_key,
+                "env": self.env,
+                "helm_version": self.helm_version(),
+                "values": values_key,
+            }
+        )
+
+    def _values_cache_key(
+        self,
+        chart: str,
+        repo: Optional[str],
+        version: Optional[str],
+    ) -> Optional[str]:
+        """
+        Compute a key that uniquely identifies the values of the given chart,
+        or None for an unpinned remote chart. `helm show values` prints the
+        chart's values file as is, so unlike renders the key doesn't depend
+        on the helm version.
+        """
+        chart_key = self._chart_key(chart, repo, version)
+        if chart_key is None:
+            return None
+        return object_fingerprint(
+            {
+                "arguments": ShowValuesCommand.helm_arguments(
+                    chart="<chart>" if chart_key[0] == "local" else chart,
+                    repo=repo,
+                    version=version,
+                ),
+                "chart": chart_key,
+                "env": self.env,
+            }
+        )
+
+    def _values_key(
+        self,
+        values: Optional[List[Union[Dict[str, Any], str]]],
+    ) -> Optional[List[str]]:
+        """
+        Identify the content of the given values, or None if a values file
+        can't be found, e.g. because it is given by URL.
+        """
+        values_key: List[str] = []
+        for values_instance in values or []:
+            if isinstance(values_instance, str):
+                values_path = (
+                    values_instance
+                    if not self.cwd
+                    else path.join(self.cwd, values_instance)
+                )
+                if not path.isfile(values_path):
+                    return None
+                values_key.append(file_fingerprint(values_path))
+            else:
+                values_key.append(object_fingerprint(values_instance))
+        return values_key
+
+    def _with_cached_chart(self, options: TemplateOptions) -> TemplateOptions:
+        """
+        Point the given options at the chart cache's copy of their chart, if
+        there is one.
+        """
+        cached_chart_path = self._cached_chart_path(
+            options.chart, options.repo, options.version
+        )
+        if cached_chart_path is None:
+            return options
+        return replace(options, chart=cached_chart_path, repo=None, version=None)
+
+    def _run(self, helm_arguments: List[str], stdin: Optional[str] = None) -> str:
+        helm_arguments = self._helm_command(helm_arguments)
+        completed_process = self._run_process(
             helm_arguments,
-            capture_output=True,
-            cwd=self.cwd,
-            env=self.env,
+            stdin=stdin,
+            stdout=subprocess.PIPE,
         )
 
+        with self._measure(
+            DECODE_PHASE,
+            helm_arguments=helm_arguments,
+            output_size=len(completed_process.stdout),
+        ):
+            return completed_process.stdout.decode("utf-8")
+
+    def _run_to_file(
+        self,
+        helm_arguments: List[str],
+        output_file: IO[bytes],
+        stdin: Optional[str] = None,
+    ) -> None:
+        """
+        Like _run, but helm writes its output straight to the given file.
+        """
+        self._run_process(
+            self._helm_command(helm_arguments),
+            stdin=stdin,
+            stdout=output_file,
+        )
+
+    def _run_process(
+        self,
+        helm_arguments: List[str],
+        stdin: Optional[str],
+        stdout: Union[int, IO[bytes]],
+    ) -> "subprocess.CompletedProcess[bytes]":
+        with (
+            self._process_slots,
+            self._measure(
+                HELM_PHASE,
+                helm_arguments=helm_arguments,
+            ),
+        ):
+            completed_process = subprocess.run(
+                helm_arguments,
+                cwd=self.cwd,
+                env=self.env,
+                input=stdin.encode("utf-8") if stdin is not None else None,
+                stderr=subprocess.PIPE,
+                stdout=stdout,
+            )
+
         return_code = completed_process.returncode
         if return_code > 0:
-            stderr = completed_process.stderr.decode("utf-8")
-            raise RuntimeError(
-                f"helm command failed with return code {return_code}:"
-                f"exec {helm_arguments}\n{stderr}"
+            raise self._helm_command_error(
+                helm_arguments=helm_arguments,
+                return_code=return_code,
+                stderr=completed_process.stderr,
             )
-
-        return completed_process.stdout.decode("utf-8")
+        return completed_process
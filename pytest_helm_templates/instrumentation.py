@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from pytest_helm_templates.types import HelmEvent
+
+
+# Running the helm process, from spawning it to collecting its output.
+HELM_PHASE = "helm"
+# Decoding the output of a helm process.
+DECODE_PHASE = "decode"
+# Parsing the YAML output of a render.
+PARSE_PHASE = "parse"
+# A whole render, from building the helm arguments to parsing the output.
+RENDER_PHASE = "render"
+
+CACHE_HITS = "cache_hits"
+CACHE_MISSES = "cache_misses"
+MEMO_HITS = "memo_hits"
+
+HelmEventListener = Callable[[HelmEvent], None]
+
+
+class Instrumentation:
+    """
+    Collects the timed phases of the helm calls made by a HelmRunner along
+    with counters such as cache hits and misses. Every event is passed to the
+    registered listeners as it happens and, when record is True, kept so that
+    the slowest renders can be reported and the session can be exported as a
+    Chrome trace. Listeners are called from the thread that made the call.
+    """
+
+    def __init__(self, record: bool = True) -> None:
+        self.record = record
+        self.events: List[HelmEvent] = []
+        self._counters: Counter = Counter()
+        self._listeners: List[HelmEventListener] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def add_listener(self, listener: HelmEventListener) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def merge(self, events: Iterable[HelmEvent], counters: Mapping[str, int]) -> None:
+        """
+        Add the events and counters collected by another Instrumentation, e.g.
+        one of a pytest-xdist worker. Events keep their start times, which are
+        only comparable across processes on the same machine.
+        """
+        with self._lock:
+            if self.record:
+                self.events.extend(events)
+            self._counters.update(counters)
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += amount
+
+    def emit(self, event: HelmEvent) -> None:
+        with self._lock:
+            if self.record:
+                self.events.append(event)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(event)
+
+    @contextmanager
+    def measure(
+        self,
+        phase: str,
+        chart: Optional[str] = None,
+        helm_arguments: Optional[List[str]] = None,
+        output_size: Optional[int] = None,
+    ) -> Iterator[None]:
+        """
+        Time the enclosed block and emit it as an event of the given phase,
+        even if the block raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.emit(
+                HelmEvent(
+                    chart=chart,
+                    duration=time.perf_counter() - start,
+                    helm_arguments=helm_arguments,
+                    output_size=output_size,
+                    phase=phase,
+                    start=start,
+                    thread_id=threading.get_ident(),
+                )
+            )
+
+    def busy_time(self, phase: str = HELM_PHASE) -> float:
+        """
+        The wall time during which at least one event of the given phase was
+        in progress. Comparing it to the total duration of those events shows
+        how much they overlapped.
+        """
+        with self._lock:
+            intervals = sorted(
+                (event.start, event.start + event.duration)
+                for event in self.events
+                if event.phase == phase
+            )
+        busy_time = 0.0
+        busy_until = float("-inf")
+        for start, end in intervals:
+            if end > busy_until:
+                busy_time += end - max(start, busy_until)
+                busy_until = end
+        return busy_time
+
+    def slowest(self, count: int, phase: str = RENDER_PHASE) -> List[HelmEvent]:
+        """
+        The count longest recorded events of the given phase, longest first.
+        """
+        with self._lock:
+            events = [event for event in self.events if event.phase == phase]
+        return sorted(events, key=lambda event: event.duration, reverse=True)[:count]
+
+    def total_time(self, phase: str = HELM_PHASE) -> float:
+        """
+        The summed duration of the recorded events of the given phase.
+        """
+        with self._lock:
+            return sum(event.duration for event in self.events if event.phase == phase)
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        """
+        The recorded events in the Chrome trace event format, with one track
+        per thread so that overlapping helm calls are visible.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self._counters)
+
+        trace_events: List[Dict[str, Any]] = []
+        for event in events:
+            args: Dict[str, Any] = {}
+            if event.chart is not None:
+                args["chart"] = event.chart
+            if event.helm_arguments is not None:
+                args["helm_arguments"] = event.helm_arguments
+            if event.output_size is not None:
+                args["output_size"] = event.output_size
+            trace_events.append(
+                {
+                    "args": args,
+                    "cat": "helm",
+                    "dur": event.duration * 1e6,
+                    "name": event.phase,
+                    "ph": "X",
+                    "pid": pid,
+                    "tid": event.thread_id,
+                    "ts": (event.start - self._origin) * 1e6,
+                }
+            )
+        if counters:
+            trace_events.append(
+                {
+                    "args": counters,
+                    "name": "counters",
+                    "ph": "C",
+                    "pid": pid,
+                    "ts": (time.perf_counter() - self._origin) * 1e6,
+                }
+            )
+        return trace_events
+
+    def write_trace(self, trace_path: str) -> None:
+        """
+        Write the recorded events to the given path as a Chrome trace that can
+        be opened in chrome://tracing or Perfetto.
+        """
+        with open(trace_path, encoding="utf-8", mode="w") as trace_file:
+            json.dump({"traceEvents": self.trace_events()}, trace_file)
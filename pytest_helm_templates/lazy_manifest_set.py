@@ -0,0 +1,214 @@
+import mmap
+import os
+from typing import (
+    IO,
+    Any,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+    overload,
+)
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.documents import (
+    SOURCE_PATTERN,
+    UNKNOWN,
+    document_spans,
+    sniff_kind,
+    sniff_name,
+    source_template_path,
+)
+from pytest_helm_templates.manifest_set import Manifest, ManifestSet
+
+
+class DocumentRecord(NamedTuple):
+    """
+    Where a document is in the output of a render, along with its source,
+    kind and metadata.name. The kind and name are UNKNOWN while they couldn't
+    be sniffed and the document hasn't been parsed to find them.
+    """
+
+    start: int
+    end: int
+    source: Optional[str]
+    kind: Any
+    name: Any
+
+
+class LazyManifestSet(Sequence[Manifest]):
+    """
+    The manifests of a render whose output is kept in a buffer, usually a
+    memory-mapped file, instead of being parsed up front. Each document is
+    indexed by a compact record of its offsets, source, kind and name, which
+    are sniffed without parsing the document. A document whose kind or name
+    can't be sniffed is parsed the first time a filter needs them, and
+    otherwise only when it is accessed. Parsed documents aren't kept, so every access
+    parses the document again and returns a manifest that is safe to modify.
+    Call close(), or use the set as a context manager, to release the buffer.
+    """
+
+    def __init__(self, output: Union[bytes, mmap.mmap]) -> None:
+        self._output = output
+        self._records = [
+            self._record(start, end) for start, end in document_spans(output)
+        ]
+
+    @classmethod
+    def from_file(cls, output_file: IO[bytes]) -> "LazyManifestSet":
+        """
+        Build a set from the output in the given file, which is memory-mapped
+        so that it stays readable after the file is closed.
+        """
+        if os.fstat(output_file.fileno()).st_size == 0:
+            return cls(b"")
+        return cls(mmap.mmap(output_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def records(self) -> List[DocumentRecord]:
+        return [self._resolved_record(position) for position in range(len(self))]
+
+    @property
+    def sources(self) -> List[Optional[str]]:
+        """
+        The `# Source:` of each manifest, or None if it is unknown.
+        """
+        return [record.source for record in self._records]
+
+    def close(self) -> None:
+        if isinstance(self._output, mmap.mmap):
+            self._output.close()
+
+    def filter(
+        self,
+        kind: Optional[str] = None,
+        name: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> ManifestSet:
+        """
+        Parse the manifests matching all of the given criteria. Like
+        ManifestSet.filter, source may be given with or without the chart
+        name, e.g. `templates/service.yaml`.
+        """
+        positions = self._positions(kind=kind, name=name, source=source)
+        return ManifestSet(
+            manifests=[self[position] for position in positions],
+            sources=[self._records[position].source for position in positions],
+        )
+
+    def get(
+        self,
+        kind: Optional[str] = None,
+        name: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> Manifest:
+        """
+        Like filter, but parses and returns the single manifest matching the
+        given criteria, raising a KeyError if there isn't exactly one match.
+        """
+        positions = self._positions(kind=kind, name=name, source=source)
+        if len(positions) != 1:
+            criteria = {"kind": kind, "name": name, "source": source}
+            given_criteria = {key: value for key, value in criteria.items() if value}
+            raise KeyError(
+                f"Expected exactly one manifest matching {given_criteria}, found"
+                f" {len(positions)}"
+            )
+        return self[positions[0]]
+
+    def materialize(self) -> ManifestSet:
+        """
+        Parse every manifest into a ManifestSet.
+        """
+        return ManifestSet(manifests=list(self), sources=self.sources)
+
+    def raw(self, index: int) -> str:
+        """
+        The unparsed content of the document at the given index.
+        """
+        record = self._records[index]
+        return self._output[record.start : record.end].decode("utf-8")
+
+    def _positions(
+        self,
+        kind: Optional[str],
+        name: Optional[str],
+        source: Optional[str],
+    ) -> List[int]:
+        positions = []
+        for position, record in enumerate(self._records):
+            if not (
+                source is None
+                or source == record.source
+                or (
+                    record.source is not None
+                    and source == source_template_path(record.source)
+                )
+            ):
+                continue
+            if kind is not None or name is not None:
+                record = self._resolved_record(position)
+            if (kind is None or record.kind == kind) and (
+                name is None or record.name == name
+            ):
+                positions.append(position)
+        return positions
+
+    def _record(self, start: int, end: int) -> DocumentRecord:
+        content = self._output[start:end].decode("utf-8")
+        source_match = SOURCE_PATTERN.search(content)
+        return DocumentRecord(
+            end=end,
+            kind=sniff_kind(content),
+            name=sniff_name(content),
+            source=source_match.group(1) if source_match else None,
+            start=start,
+        )
+
+    def _resolved_record(self, position: int) -> DocumentRecord:
+        """
+        The record at the given position, parsing the document to find its
+        kind and name if they couldn't be sniffed.
+        """
+        record = self._records[position]
+        if record.kind is not UNKNOWN and record.name is not UNKNOWN:
+            return record
+
+        manifest = self[position]
+        kind = manifest.get("kind") if isinstance(manifest, dict) else None
+        metadata = manifest.get("metadata") if isinstance(manifest, dict) else None
+        name = metadata.get("name") if isinstance(metadata, dict) else None
+        record = record._replace(
+            kind=kind if record.kind is UNKNOWN else record.kind,
+            name=name if record.name is UNKNOWN else record.name,
+        )
+        self._records[position] = record
+        return record
+
+    def __enter__(self) -> "LazyManifestSet":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @overload
+    def __getitem__(self, index: int) -> Manifest:
+        pass
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Manifest]:
+        pass
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[position] for position in range(len(self._records))[index]]
+        return yaml_backend.safe_load(self.raw(index))
+
+    def __iter__(self) -> Iterator[Manifest]:
+        for position in range(len(self._records)):
+            yield self[position]
+
+    def __len__(self) -> int:
+        return len(self._records)
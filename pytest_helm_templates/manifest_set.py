@@ -0,0 +1,311 @@
+import copy
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    SupportsIndex,
+    Tuple,
+    Union,
+    cast,
+)
+
+from pytest_helm_templates.documents import source_template_path
+from pytest_helm_templates.frozen import thaw
+
+
+Manifest = Dict[str, Any]
+
+
+class ManifestSet(List[Manifest]):
+    """
+    A list of rendered manifests that can be queried by apiVersion, kind,
+    name, namespace, labels and source template without scanning every
+    manifest. Indexes are built on the first query and rebuilt after the list
+    is modified. Modifying the manifests themselves in ways that change how
+    they would be indexed is not detected.
+    """
+
+    def __init__(
+        self,
+        manifests: Iterable[Manifest] = (),
+        sources: Optional[Iterable[Optional[str]]] = None,
+    ) -> None:
+        super().__init__(manifests)
+        self._sources: List[Optional[str]] = (
+            list(sources) if sources is not None else [None] * len(self)
+        )
+        if len(self._sources) != len(self):
+            raise ValueError(
+                "Expected one source per manifest, got"
+                f" {len(self._sources)} sources for {len(self)} manifests"
+            )
+        self._indexes: Optional[Dict[str, Dict[Any, List[int]]]] = None
+
+    @property
+    def sources(self) -> List[Optional[str]]:
+        """
+        The `# Source:` of each manifest, or None if it is unknown.
+        """
+        return list(self._sources)
+
+    def filter(
+        self,
+        api_version: Optional[str] = None,
+        kind: Optional[str] = None,
+        labels: Optional[Mapping[str, str]] = None,
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> "ManifestSet":
+        """
+        Select the manifests matching all of the given criteria. source may be
+        given with or without the chart name, e.g. `templates/service.yaml`.
+        """
+        positions = self._positions(
+            api_version=api_version,
+            kind=kind,
+            labels=labels,
+            name=name,
+            namespace=namespace,
+            source=source,
+        )
+        return ManifestSet(
+            manifests=[self[position] for position in positions],
+            sources=[self._sources[position] for position in positions],
+        )
+
+    def get(
+        self,
+        api_version: Optional[str] = None,
+        kind: Optional[str] = None,
+        labels: Optional[Mapping[str, str]] = None,
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> Manifest:
+        """
+        Like filter, but returns the single manifest matching the given
+        criteria, raising a KeyError if there isn't exactly one match.
+        """
+        positions = self._positions(
+            api_version=api_version,
+            kind=kind,
+            labels=labels,
+            name=name,
+            namespace=namespace,
+            source=source,
+        )
+        if len(positions) != 1:
+            criteria = {
+                "api_version": api_version,
+                "kind": kind,
+                "labels": labels,
+                "name": name,
+                "namespace": namespace,
+                "source": source,
+            }
+            given_criteria = {key: value for key, value in criteria.items() if value}
+            raise KeyError(
+                f"Expected exactly one manifest matching {given_criteria}, found"
+                f" {len(positions)}"
+            )
+        return self[positions[0]]
+
+    def thaw(self) -> "ManifestSet":
+        """
+        A copy of this set whose manifests are plain mutable dicts, even if
+        they were shared FrozenDicts.
+        """
+        return ManifestSet(manifests=thaw(list(self)), sources=self._sources)
+
+    def _build_indexes(self) -> Dict[str, Dict[Any, List[int]]]:
+        indexes: Dict[str, Dict[Any, List[int]]] = {
+            "api_version_kind": {},
+            "kind": {},
+            "label": {},
+            "name": {},
+            "namespace": {},
+            "source": {},
+        }
+        for position, manifest in enumerate(self):
+            source = self._sources[position]
+            if source:
+                indexes["source"].setdefault(source, []).append(position)
+                template_path = source_template_path(source)
+                if template_path:
+                    indexes["source"].setdefault(template_path, []).append(position)
+
+            if not isinstance(manifest, dict):
+                continue
+
+            api_version = manifest.get("apiVersion")
+            kind = manifest.get("kind")
+            indexes["api_version_kind"].setdefault((api_version, kind), []).append(
+                position
+            )
+            indexes["kind"].setdefault(kind, []).append(position)
+
+            metadata = manifest.get("metadata")
+            if not isinstance(metadata, dict):
+                continue
+            indexes["name"].setdefault(metadata.get("name"), []).append(position)
+            indexes["namespace"].setdefault(metadata.get("namespace"), []).append(
+                position
+            )
+            labels = metadata.get("labels")
+            if isinstance(labels, dict):
+                for label in labels.items():
+                    indexes["label"].setdefault(label, []).append(position)
+        return indexes
+
+    def _positions(
+        self,
+        api_version: Optional[str],
+        kind: Optional[str],
+        labels: Optional[Mapping[str, str]],
+        name: Optional[str],
+        namespace: Optional[str],
+        source: Optional[str],
+    ) -> List[int]:
+        if self._indexes is None:
+            self._indexes = self._build_indexes()
+        indexes = self._indexes
+
+        candidates: List[List[int]] = []
+        if api_version is not None:
+            candidates.append(
+                indexes["api_version_kind"].get((api_version, kind), [])
+                if kind is not None
+                else [
+                    position
+                    for (indexed_api_version, _), positions in indexes[
+                        "api_version_kind"
+                    ].items()
+                    if indexed_api_version == api_version
+                    for position in positions
+                ]
+            )
+        elif kind is not None:
+            candidates.append(indexes["kind"].get(kind, []))
+        if name is not None:
+            candidates.append(indexes["name"].get(name, []))
+        if namespace is not None:
+            candidates.append(indexes["namespace"].get(namespace, []))
+        if source is not None:
+            candidates.append(indexes["source"].get(source, []))
+        for label in (labels or {}).items():
+            candidates.append(indexes["label"].get(label, []))
+
+        if not candidates:
+            return list(range(len(self)))
+
+        candidates.sort(key=len)
+        matches = set(candidates[0])
+        for positions in candidates[1:]:
+            matches.intersection_update(positions)
+        return sorted(matches)
+
+    # The methods below keep the sources aligned with the manifests and
+    # invalidate the indexes whenever the list is modified.
+
+    def __copy__(self) -> "ManifestSet":
+        return ManifestSet(manifests=self, sources=self._sources)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ManifestSet":
+        return ManifestSet(
+            manifests=copy.deepcopy(list(self), memo),
+            sources=self._sources,
+        )
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (ManifestSet, (list(self), self._sources))
+
+    def __setitem__(
+        self,
+        index: Union[SupportsIndex, slice],
+        value: Union[Manifest, Iterable[Manifest]],
+    ) -> None:
+        if isinstance(index, slice):
+            manifests = list(cast(Iterable[Manifest], value))
+            super().__setitem__(index, manifests)
+            self._sources[index] = [None] * len(manifests)
+        else:
+            super().__setitem__(index, cast(Manifest, value))
+            self._sources[index] = None
+        self._indexes = None
+
+    def __delitem__(self, index: Union[SupportsIndex, slice]) -> None:
+        super().__delitem__(index)
+        del self._sources[index]
+        self._indexes = None
+
+    def __iadd__(  # type: ignore[misc, override]
+        self,
+        manifests: Iterable[Manifest],
+    ) -> "ManifestSet":
+        self.extend(manifests)
+        return self
+
+    def __imul__(self, count: SupportsIndex) -> "ManifestSet":
+        super().__imul__(count)
+        self._sources *= count
+        self._indexes = None
+        return self
+
+    def append(self, manifest: Manifest) -> None:
+        super().append(manifest)
+        self._sources.append(None)
+        self._indexes = None
+
+    def clear(self) -> None:
+        super().clear()
+        self._sources.clear()
+        self._indexes = None
+
+    def extend(self, manifests: Iterable[Manifest]) -> None:
+        if isinstance(manifests, ManifestSet):
+            sources = manifests.sources
+        else:
+            manifests = list(manifests)
+            sources = [None] * len(manifests)
+        super().extend(manifests)
+        self._sources.extend(sources)
+        self._indexes = None
+
+    def insert(self, index: SupportsIndex, manifest: Manifest) -> None:
+        super().insert(index, manifest)
+        self._sources.insert(index, None)
+        self._indexes = None
+
+    def pop(self, index: SupportsIndex = -1) -> Manifest:
+        manifest = super().pop(index)
+        self._sources.pop(index)
+        self._indexes = None
+        return manifest
+
+    def remove(self, manifest: Manifest) -> None:
+        del self[self.index(manifest)]
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._sources.reverse()
+        self._indexes = None
+
+    def sort(
+        self,
+        *,
+        key: Optional[Callable[[Manifest], Any]] = None,
+        reverse: bool = False,
+    ) -> None:
+        sort_key: Callable[[Manifest], Any] = (
+            key if key is not None else (lambda manifest: manifest)
+        )
+        pairs = list(zip(self, self._sources))
+        pairs.sort(key=lambda pair: sort_key(pair[0]), reverse=reverse)
+        super().__setitem__(slice(None), [manifest for manifest, _ in pairs])
+        self._sources = [source for _, source in pairs]
+        self._indexes = None
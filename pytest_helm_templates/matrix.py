@@ -0,0 +1,244 @@
+import copy
+import itertools
+from os import path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from pytest_helm_templates.fingerprint import object_fingerprint
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.types import BatchResult, MatrixCase
+from pytest_helm_templates.values_transport import merge_values
+
+
+if TYPE_CHECKING:
+    import pytest
+
+ValuesOverlay = Union[Dict[str, Any], str]
+# An axis is either a sequence of items, labelled by their position in case
+# ids, or a mapping of labels to items.
+Axis = Union[Sequence[Any], Mapping[str, Any]]
+
+DEFAULT_RELEASE_NAME = "release-name"
+
+
+class RenderMatrix:
+    """
+    The cartesian product of values overlays, kube versions and API versions
+    to render a chart with. Each axis of values contributes one overlay to
+    every case, in the order of the axes. Each item of api_versions is either
+    an API version or a list of them. Cases that normalize to the same
+    helm invocation, e.g. because their overlays merge to the same values,
+    are only rendered once. Any other keyword arguments are passed to every
+    HelmRunner.template call.
+    """
+
+    def __init__(
+        self,
+        chart: str,
+        name: str = DEFAULT_RELEASE_NAME,
+        api_versions: Optional[Axis] = None,
+        kube_versions: Optional[Axis] = None,
+        values: Optional[Mapping[str, Axis]] = None,
+        **template_kwargs: Any,
+    ) -> None:
+        for argument in ("kube_version", "values"):
+            if argument in template_kwargs:
+                raise ValueError(
+                    f"{argument} varies across the matrix, use the matrix's"
+                    " axes instead"
+                )
+        self.chart = chart
+        self.name = name
+        self.template_kwargs = template_kwargs
+        self._axes: List[Tuple[str, List[Tuple[str, Any]]]] = [
+            (axis_name, _labelled_items(axis_name, axis))
+            for axis_name, axis in (values or {}).items()
+        ]
+        if api_versions is not None:
+            self._axes.append(
+                ("api_versions", _labelled_items("api_versions", api_versions))
+            )
+        if kube_versions is not None:
+            self._axes.append(
+                ("kube_version", _labelled_items("kube_version", kube_versions))
+            )
+        self._values_axes = list(values or {})
+
+    def cases(self) -> List[MatrixCase]:
+        """
+        Expand the matrix into its cases, in the order of the product of the
+        axes.
+        """
+        cases = []
+        axis_names = [axis_name for axis_name, _ in self._axes]
+        for combination in itertools.product(*(items for _, items in self._axes)):
+            parameters = {
+                axis_name: item for axis_name, (_, item) in zip(axis_names, combination)
+            }
+            case_id = "-".join(
+                f"{axis_name}={label}"
+                for axis_name, (label, _) in zip(axis_names, combination)
+            )
+            cases.append(
+                MatrixCase(
+                    id=case_id or "default",
+                    parameters=parameters,
+                    request=self._request(parameters),
+                )
+            )
+        return cases
+
+    def unique_requests(self) -> List[Dict[str, Any]]:
+        """
+        The distinct template requests of the matrix, in the order of their
+        first case.
+        """
+        requests: Dict[str, Dict[str, Any]] = {}
+        for case in self.cases():
+            requests.setdefault(object_fingerprint(case.request), case.request)
+        return list(requests.values())
+
+    def render(self, helm_runner: HelmRunner) -> List[BatchResult[ManifestSet]]:
+        """
+        Render every distinct request of the matrix at the same time with
+        template_batch, returning one result per case in the order of the
+        cases. Cases that share a request get their own copy of its result,
+        unless the runner's results are frozen.
+        """
+        cases = self.cases()
+        requests = self.unique_requests()
+        results = dict(
+            zip(
+                (object_fingerprint(request) for request in requests),
+                helm_runner.template_batch(requests),
+            )
+        )
+        case_results = []
+        handed_out: Set[str] = set()
+        for case in cases:
+            request_key = object_fingerprint(case.request)
+            result = results[request_key]
+            if (
+                request_key in handed_out
+                and result.ok
+                and not helm_runner.frozen_results
+            ):
+                result = BatchResult(value=copy.deepcopy(result.value))
+            handed_out.add(request_key)
+            case_results.append(result)
+        return case_results
+
+    def parametrize(self, argname: str = "matrix_case") -> "pytest.MarkDecorator":
+        """
+        Parametrize a test over the cases of the matrix. Each case is passed as
+        argname and declares its render with a helm_render marker, so that the
+        distinct renders are prewarmed in parallel and the helm_render fixture
+        hands each case its result.
+        """
+        # Imported here so that the package can be imported without pytest.
+        import pytest
+
+        return pytest.mark.parametrize(
+            argname,
+            [
+                pytest.param(
+                    case,
+                    id=case.id,
+                    marks=pytest.mark.helm_render(**case.request),
+                )
+                for case in self.cases()
+            ],
+        )
+
+    def _request(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the normalized template request of a case. Adjacent dict
+        overlays are merged the way helm merges them and empty ones are
+        dropped, API versions are sorted and deduplicated, and unset or empty
+        arguments are left out.
+        """
+        request: Dict[str, Any] = {
+            "chart": self.chart,
+            "name": self.name,
+            **{
+                key: value
+                for key, value in self.template_kwargs.items()
+                if value is not None
+            },
+        }
+
+        values: List[ValuesOverlay] = []
+        for axis_name in self._values_axes:
+            overlay = parameters[axis_name]
+            if overlay is None:
+                continue
+            if isinstance(overlay, str):
+                values.append(overlay)
+            elif values and isinstance(values[-1], dict):
+                values[-1] = merge_values(values[-1], overlay)
+            else:
+                values.append(dict(overlay))
+        values = [overlay for overlay in values if overlay != {}]
+        if values:
+            request["values"] = values
+
+        api_versions = parameters.get("api_versions")
+        if isinstance(api_versions, str):
+            api_versions = [api_versions]
+        if api_versions:
+            request["api_versions"] = sorted(set(api_versions))
+        kube_version = parameters.get("kube_version")
+        if kube_version:
+            request["kube_version"] = kube_version
+        return request
+
+
+def _labelled_items(axis_name: str, axis: Axis) -> List[Tuple[str, Any]]:
+    if isinstance(axis, Mapping):
+        items = [(str(label), item) for label, item in axis.items()]
+    elif isinstance(axis, (str, bytes)):
+        raise ValueError(
+            f"Expected a sequence or mapping for matrix axis `{axis_name}`, got"
+            f" {axis!r}"
+        )
+    else:
+        items = [
+            (_label(axis_name, position, item), item)
+            for position, item in enumerate(axis)
+        ]
+    if not items:
+        raise ValueError(f"Matrix axis `{axis_name}` is empty")
+    return items
+
+
+def _label(axis_name: str, position: int, item: Any) -> str:
+    """
+    Label an item of an unlabelled axis with its value when it's short and
+    readable, otherwise with its position. Values files are labelled by their
+    file name, API versions by the versions themselves.
+    """
+    if item is None:
+        return "none"
+    if axis_name == "api_versions":
+        api_versions = [item] if isinstance(item, str) else item
+        if isinstance(api_versions, Sequence) and all(
+            isinstance(api_version, str) for api_version in api_versions
+        ):
+            return "+".join(api_versions) or str(position)
+        return str(position)
+    if isinstance(item, str):
+        return path.basename(item) if item else str(position)
+    if isinstance(item, (bool, int, float)):
+        return str(item)
+    return str(position)
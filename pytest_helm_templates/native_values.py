@@ -0,0 +1,445 @@
+import copy
+import io
+import os
+import tarfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.semver import is_compatible_range
+from pytest_helm_templates.values_transport import merge_values
+
+
+GLOBAL_KEY = "global"
+HELM_ENGINE = "helm"
+NATIVE_ENGINE = "native"
+VERIFY_ENGINE = "verify"
+COMPUTED_VALUES_ENGINES = (HELM_ENGINE, NATIVE_ENGINE, VERIFY_ENGINE)
+
+# The files that determine the values of a chart.
+CHART_FILE_NAMES = ("Chart.yaml", "requirements.yaml", "values.yaml")
+CHART_ARCHIVE_SUFFIX = ".tgz"
+
+
+@dataclass
+class NativeChart:
+    """
+    The parts of a chart that determine its values: its metadata, its
+    values.yaml, the dependencies it declares and the subcharts it contains.
+    """
+
+    metadata: Dict[str, Any]
+    values: Dict[str, Any]
+    requirements: Optional[List[Dict[str, Any]]] = None
+    dependencies: List["NativeChart"] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return str(self.metadata.get("name", ""))
+
+    @property
+    def version(self) -> str:
+        return str(self.metadata.get("version", ""))
+
+
+def compute_values(
+    chart_path: str,
+    values: Optional[List[Union[Dict[str, Any], str]]] = None,
+    cwd: Optional[str] = None,
+    chart: Optional[NativeChart] = None,
+) -> Dict[str, Any]:
+    """
+    Compute the `.Values` helm would render the given local chart with, without
+    running helm. This follows helm 3's rules: user values files are merged in
+    order, dependencies are enabled or disabled by their conditions and tags,
+    import-values are imported into their parent, and the chart's values are
+    coalesced with the user's, scoping subchart values, propagating globals
+    and deleting keys set to null. chart is the chart at chart_path if it was
+    already loaded, e.g. by a cache, and isn't modified.
+    """
+    user_values: Dict[str, Any] = {}
+    for values_instance in values or []:
+        if isinstance(values_instance, str):
+            values_path = (
+                values_instance if not cwd else os.path.join(cwd, values_instance)
+            )
+            if not os.path.isfile(values_path):
+                raise ValueError(
+                    "Computed values can only be computed natively from local"
+                    f" values files. Could not find `{values_instance}`"
+                )
+            with open(values_path, encoding="utf-8", mode="r") as values_file:
+                values_instance = yaml_backend.safe_load(values_file.read()) or {}
+        user_values = merge_values(user_values, values_instance)
+
+    chart = copy_chart(chart if chart is not None else load_chart(chart_path))
+    _process_dependency_enabled(chart, user_values, "")
+    _process_dependency_import_values(chart, merge=True)
+    return coalesce_values(chart, user_values)
+
+
+def coalesce_values(chart: NativeChart, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coalesce the given values with the values of the chart and its subcharts
+    like helm's CoalesceValues.
+    """
+    return _coalesce(chart, copy.deepcopy(values), merge=False)
+
+
+def copy_chart(chart: NativeChart) -> NativeChart:
+    """
+    Copy the parts of the given chart and its subcharts that computing values
+    modifies: the lists of dependencies and the requirements. Metadata and
+    values are shared, as they are only ever replaced.
+    """
+    return NativeChart(
+        dependencies=[copy_chart(subchart) for subchart in chart.dependencies],
+        metadata=chart.metadata,
+        requirements=(
+            [dict(requirement) for requirement in chart.requirements]
+            if chart.requirements is not None
+            else None
+        ),
+        values=chart.values,
+    )
+
+
+def load_chart(chart_path: str) -> NativeChart:
+    """
+    Load the parts of the chart directory or archive at the given path that
+    determine its values.
+    """
+    if os.path.isfile(chart_path):
+        with open(chart_path, mode="rb") as archive_file:
+            return _load_archive(archive_file.read())
+
+    files: Dict[str, bytes] = {}
+    for dir_path, dir_names, file_names in os.walk(chart_path, followlinks=True):
+        dir_names.sort()
+        for file_name in file_names:
+            if file_name in CHART_FILE_NAMES or file_name.endswith(
+                CHART_ARCHIVE_SUFFIX
+            ):
+                file_path = os.path.join(dir_path, file_name)
+                relative_path = os.path.relpath(file_path, chart_path)
+                with open(file_path, mode="rb") as file:
+                    files[relative_path.replace(os.sep, "/")] = file.read()
+    return _load_files(files)
+
+
+def _load_archive(archive: bytes) -> NativeChart:
+    files: Dict[str, bytes] = {}
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:gz") as tar:
+        for member in tar.getmembers():
+            if not member.isfile():
+                continue
+            # Archives hold the chart in a directory named after it.
+            _, _, relative_path = member.name.partition("/")
+            extracted_file = tar.extractfile(member)
+            if relative_path and extracted_file is not None:
+                files[relative_path] = extracted_file.read()
+    return _load_files(files)
+
+
+def _load_files(files: Dict[str, bytes]) -> NativeChart:
+    if "Chart.yaml" not in files:
+        raise ValueError("Chart.yaml file is missing")
+    metadata = yaml_backend.safe_load(files["Chart.yaml"]) or {}
+    requirements = metadata.get("dependencies")
+    if metadata.get("apiVersion", "v1") == "v1" and "requirements.yaml" in files:
+        requirements = (yaml_backend.safe_load(files["requirements.yaml"]) or {}).get(
+            "dependencies"
+        )
+    values = yaml_backend.safe_load(files.get("values.yaml", b"")) or {}
+
+    subchart_files: Dict[str, Dict[str, bytes]] = {}
+    archives: Dict[str, bytes] = {}
+    for file_path, data in files.items():
+        if not file_path.startswith("charts/"):
+            continue
+        name, _, relative_path = file_path[len("charts/") :].partition("/")
+        if name[:1] in ("_", "."):
+            continue
+        if relative_path:
+            subchart_files.setdefault(name, {})[relative_path] = data
+        elif name.endswith(CHART_ARCHIVE_SUFFIX):
+            archives[name] = data
+
+    dependencies = [_load_archive(archives[name]) for name in sorted(archives)]
+    dependencies += [
+        _load_files(subchart_files[name])
+        for name in sorted(subchart_files)
+        if "Chart.yaml" in subchart_files[name]
+    ]
+    return NativeChart(
+        dependencies=dependencies,
+        metadata=metadata,
+        requirements=copy.deepcopy(requirements),
+        values=values,
+    )
+
+
+def _coalesce(
+    chart: NativeChart,
+    dest: Dict[str, Any],
+    merge: bool,
+) -> Dict[str, Any]:
+    _coalesce_values(chart, dest, merge)
+    return _coalesce_dependencies(chart, dest, merge)
+
+
+def _coalesce_dependencies(
+    chart: NativeChart,
+    dest: Dict[str, Any],
+    merge: bool,
+) -> Dict[str, Any]:
+    for subchart in chart.dependencies:
+        if subchart.name not in dest:
+            dest[subchart.name] = {}
+        elif not isinstance(dest[subchart.name], dict):
+            raise ValueError(f"type mismatch on {subchart.name}: {dest[subchart.name]}")
+        subchart_dest = dest[subchart.name]
+        _coalesce_globals(subchart_dest, dest)
+        dest[subchart.name] = _coalesce(subchart, subchart_dest, merge)
+    return dest
+
+
+def _coalesce_globals(dest: Dict[str, Any], src: Dict[str, Any]) -> None:
+    """
+    Copy the globals of src into dest. Unlike other values, the parent's
+    globals take precedence over the subchart's.
+    """
+    dest_globals = dest.get(GLOBAL_KEY, {})
+    src_globals = src.get(GLOBAL_KEY, {})
+    if not isinstance(dest_globals, dict) or not isinstance(src_globals, dict):
+        return
+
+    for key, value in src_globals.items():
+        if isinstance(value, dict):
+            value = copy.deepcopy(value)
+            if key not in dest_globals:
+                dest_globals[key] = value
+            elif isinstance(dest_globals[key], dict):
+                _coalesce_tables(value, dest_globals[key], merge=True)
+                dest_globals[key] = value
+        elif not isinstance(dest_globals.get(key), dict):
+            dest_globals[key] = value
+    dest[GLOBAL_KEY] = dest_globals
+
+
+def _coalesce_values(chart: NativeChart, values: Dict[str, Any], merge: bool) -> None:
+    subchart_names = {subchart.name for subchart in chart.dependencies}
+    for key, chart_value in copy.deepcopy(chart.values).items():
+        if key not in values:
+            values[key] = chart_value
+            continue
+
+        value = values[key]
+        if value is None and not merge:
+            # null deletes the key when coalescing rather than merging.
+            del values[key]
+        elif isinstance(value, dict) and isinstance(chart_value, dict):
+            _coalesce_tables(value, chart_value, merge or key in subchart_names)
+
+
+def _coalesce_tables(
+    dest: Dict[str, Any],
+    src: Optional[Dict[str, Any]],
+    merge: bool,
+) -> Dict[str, Any]:
+    """
+    Merge src into dest, where dest takes precedence.
+    """
+    if src is None:
+        return dest
+    for key, src_value in src.items():
+        if key not in dest:
+            dest[key] = src_value
+        elif dest[key] is None and not merge:
+            del dest[key]
+        elif isinstance(src_value, dict) and isinstance(dest[key], dict):
+            _coalesce_tables(dest[key], src_value, merge)
+    return dest
+
+
+def _process_dependency_enabled(
+    chart: NativeChart,
+    values: Dict[str, Any],
+    path: str,
+) -> None:
+    requirements = chart.requirements
+    if requirements is None:
+        return
+
+    dependencies = [
+        subchart
+        for subchart in chart.dependencies
+        if not any(
+            subchart.name == requirement.get("name")
+            and is_compatible_range(
+                str(requirement.get("version", "")), subchart.version
+            )
+            for requirement in requirements
+        )
+    ]
+    for requirement in requirements:
+        alias_dependency = _alias_dependency(chart.dependencies, requirement)
+        if alias_dependency is not None:
+            dependencies.append(alias_dependency)
+        if requirement.get("alias"):
+            requirement["name"] = requirement["alias"]
+    chart.dependencies = dependencies
+
+    for requirement in requirements:
+        requirement["enabled"] = True
+    chart_values = coalesce_values(chart, values)
+    _process_dependency_tags(requirements, chart_values)
+    _process_dependency_conditions(requirements, chart_values, path)
+
+    disabled = {
+        requirement.get("name")
+        for requirement in requirements
+        if not requirement["enabled"]
+    }
+    chart.dependencies = [
+        subchart for subchart in chart.dependencies if subchart.name not in disabled
+    ]
+    chart.requirements = [
+        requirement
+        for requirement in requirements
+        if requirement.get("name") not in disabled
+    ]
+    for subchart in chart.dependencies:
+        _process_dependency_enabled(
+            subchart,
+            chart_values,
+            f"{path}{subchart.name}.",
+        )
+
+
+def _alias_dependency(
+    subcharts: List[NativeChart],
+    requirement: Dict[str, Any],
+) -> Optional[NativeChart]:
+    for subchart in subcharts:
+        if subchart.name != requirement.get("name"):
+            continue
+        if not is_compatible_range(
+            str(requirement.get("version", "")), subchart.version
+        ):
+            continue
+        alias_dependency = copy_chart(subchart)
+        if requirement.get("alias"):
+            alias_dependency.metadata = {
+                **subchart.metadata,
+                "name": requirement["alias"],
+            }
+        return alias_dependency
+    return None
+
+
+def _process_dependency_tags(
+    requirements: List[Dict[str, Any]],
+    values: Dict[str, Any],
+) -> None:
+    tags = _table(values, "tags")
+    if tags is None:
+        return
+    for requirement in requirements:
+        tag_values = [
+            tags[tag]
+            for tag in requirement.get("tags") or []
+            if isinstance(tags.get(tag), bool)
+        ]
+        # A dependency is only disabled by its tags if none of them are true.
+        requirement["enabled"] = any(tag_values) or not tag_values
+
+
+def _process_dependency_conditions(
+    requirements: List[Dict[str, Any]],
+    values: Dict[str, Any],
+    path: str,
+) -> None:
+    for requirement in requirements:
+        condition = str(requirement.get("condition") or "").strip()
+        for condition_path in condition.split(","):
+            if not condition_path:
+                continue
+            value = _path_value(values, path + condition_path)
+            # The first condition that resolves to a bool decides.
+            if isinstance(value, bool):
+                requirement["enabled"] = value
+                break
+
+
+def _process_dependency_import_values(chart: NativeChart, merge: bool) -> None:
+    for subchart in chart.dependencies:
+        _process_dependency_import_values(subchart, merge)
+    _process_import_values(chart, merge)
+
+
+def _process_import_values(chart: NativeChart, merge: bool) -> None:
+    if chart.requirements is None:
+        return
+
+    chart_values = _coalesce(chart, {}, merge)
+    imported: Dict[str, Any] = {}
+    for requirement in chart.requirements:
+        for import_value in requirement.get("import-values") or []:
+            if isinstance(import_value, dict):
+                table = _table(
+                    chart_values, f"{requirement.get('name')}.{import_value['child']}"
+                )
+                if table is None:
+                    continue
+                imported = _coalesce_tables(
+                    imported,
+                    _path_to_map(import_value["parent"], copy.deepcopy(table)),
+                    merge,
+                )
+            elif isinstance(import_value, str):
+                table = _table(
+                    chart_values, f"{requirement.get('name')}.exports.{import_value}"
+                )
+                if table is None:
+                    continue
+                imported = _coalesce_tables(imported, copy.deepcopy(table), merge)
+
+    # Imported values have a lower priority than the parent's own values, so
+    # that a parent can import a section of a subchart and override parts.
+    if not merge:
+        chart_values = _trim_nil_values(chart_values)
+    chart.values = _coalesce_tables(copy.deepcopy(chart_values), imported, merge)
+
+
+def _path_to_map(path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    if path == ".":
+        return data
+    for key in reversed(path.split(".")):
+        data = {key: data}
+    return data
+
+
+def _path_value(values: Dict[str, Any], path: str) -> Any:
+    *table_path, key = path.split(".")
+    table = _table(values, ".".join(table_path)) if table_path else values
+    if table is None or key not in table or isinstance(table[key], dict):
+        return None
+    return table[key]
+
+
+def _table(values: Dict[str, Any], path: str) -> Optional[Dict[str, Any]]:
+    table: Any = values
+    for key in path.split("."):
+        if not isinstance(table, dict) or not isinstance(table.get(key), dict):
+            return None
+        table = table[key]
+    return table if isinstance(table, dict) else None
+
+
+def _trim_nil_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: _trim_nil_values(value) if isinstance(value, dict) else value
+        for key, value in values.items()
+        if value is not None
+    }
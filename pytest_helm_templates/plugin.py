@@ -0,0 +1,488 @@
+import itertools
+import shutil
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytest
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.chart_cache import ChartCache
+from pytest_helm_templates.chart_index import ChartIndex
+from pytest_helm_templates.fingerprint import object_fingerprint
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.instrumentation import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    MEMO_HITS,
+    Instrumentation,
+)
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.matrix import DEFAULT_RELEASE_NAME
+from pytest_helm_templates.native_values import HELM_ENGINE
+from pytest_helm_templates.render_cache import RenderCache
+from pytest_helm_templates.snapshot import (
+    SNAPSHOT_DIR_NAME,
+    UPDATE_OPTION,
+    HelmSnapshot,
+    snapshot_file_name,
+)
+from pytest_helm_templates.types import BatchResult, HelmEvent
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        UPDATE_OPTION,
+        action="store_true",
+        default=False,
+        help=(
+            "Write the snapshots checked with the helm_snapshot fixture instead"
+            " of failing when they don't match."
+        ),
+    )
+    parser.addini(
+        "helm_templates_cache_dir",
+        default=None,
+        help=(
+            "Directory used to persist rendered helm output between sessions."
+            " Relative paths are resolved against the rootdir. Disabled if unset."
+        ),
+    )
+    parser.addini(
+        "helm_templates_cache_max_age",
+        default=None,
+        help=(
+            "Evict entries of the render cache that haven't been used for this"
+            " many seconds. Unlimited if unset."
+        ),
+    )
+    parser.addini(
+        "helm_templates_cache_max_size",
+        default=None,
+        help=(
+            "Evict the least recently used entries of the render cache once it"
+            " grows beyond this many bytes. Unlimited if unset."
+        ),
+    )
+    parser.addini(
+        "helm_templates_computed_values_engine",
+        default=HELM_ENGINE,
+        help=(
+            "How computed values are collected: `helm` renders them with helm,"
+            " `native` merges them in Python without running helm and `verify`"
+            " does both and fails if they differ. Defaults to `helm`."
+        ),
+    )
+    parser.addini(
+        "helm_templates_frozen_results",
+        default=False,
+        help=(
+            "Share one frozen copy of each memoized render with every test"
+            " instead of deep copying it for every test. Frozen manifests raise"
+            " a TypeError when modified, call thaw() for a mutable copy."
+        ),
+        type="bool",
+    )
+    parser.addini(
+        "helm_templates_helm_binary",
+        default="helm",
+        help="The helm binary used to render charts. Defaults to `helm`.",
+    )
+    parser.addini(
+        "helm_templates_max_workers",
+        default=None,
+        help="Maximum number of helm processes to run at the same time.",
+    )
+    parser.addini(
+        "helm_templates_prewarm",
+        default=True,
+        help=(
+            "Render every chart declared with the helm_render marker in parallel"
+            " once collection finishes, before the first test runs. pytest-xdist"
+            " workers render the chart of their next test while a test runs"
+            " instead."
+        ),
+        type="bool",
+    )
+    parser.addini(
+        "helm_templates_shadow_charts",
+        default=False,
+        help=(
+            "Render adhoc templates, computed values and notes against a shadow"
+            " chart that leaves out the chart's other templates."
+        ),
+        type="bool",
+    )
+    parser.addini(
+        "helm_templates_slice_show_only",
+        default=False,
+        help=(
+            "Answer show_only requests from a single full render of the chart"
+            " instead of rendering the chart again for every request."
+        ),
+        type="bool",
+    )
+    parser.addini(
+        "helm_templates_slowest_renders",
+        default=None,
+        help=(
+            "Report this many of the slowest helm renders, along with cache hit"
+            " and miss counts, at the end of the session."
+        ),
+    )
+    parser.addini(
+        "helm_templates_trace_file",
+        default=None,
+        help=(
+            "Write a Chrome trace of every helm call made during the session to"
+            " this path. Relative paths are resolved against the rootdir and"
+            " pytest-xdist workers each write their own file."
+        ),
+    )
+    parser.addini(
+        "helm_templates_yaml_backend",
+        default=None,
+        help=(
+            "The YAML backend used to load and dump YAML, one of `auto`,"
+            " `libyaml` or `python`. Defaults to the"
+            f" {yaml_backend.YAML_BACKEND_ENV_VAR} environment variable or `auto`."
+        ),
+    )
+
+
+CHART_CACHE_NAME = "charts"
+CHART_INDEX_NAME = "chart-index.json"
+INSTRUMENTATION_KEY = "helm_templates_instrumentation"
+SHARED_CACHE_DIR_KEY = "helm_templates_shared_cache_dir"
+
+helm_runner_key = pytest.StashKey[HelmRunner]()
+# The key of the render a pytest-xdist worker is prewarming for its next test,
+# and the prewarm.
+next_render_key = pytest.StashKey[
+    Tuple[str, "Future[List[BatchResult[ManifestSet]]]"]
+]()
+next_render_executor_key = pytest.StashKey[ThreadPoolExecutor]()
+shared_cache_dir_key = pytest.StashKey[str]()
+# The instrumentation of the pytest-xdist workers, merged on the controller.
+worker_instrumentation_key = pytest.StashKey[Instrumentation]()
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers",
+        "helm_render(chart, name='release-name', **kwargs): declare a render of"
+        " the given chart with the given HelmRunner.template arguments. Declared"
+        " renders are prewarmed in parallel after collection and their result is"
+        " available to the test through the helm_render fixture.",
+    )
+
+    backend: Optional[str] = config.getini("helm_templates_yaml_backend")
+    if backend:
+        yaml_backend.set_backend(backend)
+
+    # When pytest-xdist distributes the session and no persistent cache is
+    # configured, the controller creates a cache directory for the run that
+    # all of its workers share, so that each render is only performed once.
+    if (
+        not hasattr(config, "workerinput")
+        and getattr(config.option, "numprocesses", None)
+        and not config.getini("helm_templates_cache_dir")
+    ):
+        config.stash[shared_cache_dir_key] = tempfile.mkdtemp(
+            prefix="pytest-helm-templates-"
+        )
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    shared_cache_dir = config.stash.get(shared_cache_dir_key, None)
+    if shared_cache_dir:
+        shutil.rmtree(shared_cache_dir, ignore_errors=True)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node: Any) -> None:
+    shared_cache_dir = node.config.stash.get(shared_cache_dir_key, None)
+    if shared_cache_dir:
+        node.workerinput[SHARED_CACHE_DIR_KEY] = shared_cache_dir
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    next_render_executor = session.config.stash.get(next_render_executor_key, None)
+    if next_render_executor is not None:
+        next_render_executor.shutdown()
+
+    helm_runner = session.config.stash.get(helm_runner_key, None)
+    if helm_runner is None or helm_runner.instrumentation is None:
+        return
+
+    # pytest-xdist workers hand their instrumentation to the controller, which
+    # reports on the whole session.
+    workeroutput: Optional[Dict[str, Any]] = getattr(
+        session.config, "workeroutput", None
+    )
+    if workeroutput is not None:
+        workeroutput[INSTRUMENTATION_KEY] = {
+            "counters": helm_runner.instrumentation.counters,
+            "events": [asdict(event) for event in helm_runner.instrumentation.events],
+        }
+
+    trace_file: Optional[str] = session.config.getini("helm_templates_trace_file")
+    if not trace_file:
+        return
+
+    trace_path = session.config.rootpath.joinpath(trace_file)
+    workerinput: Dict[str, Any] = getattr(session.config, "workerinput", {})
+    if "workerid" in workerinput:
+        trace_path = trace_path.with_name(
+            f"{trace_path.stem}-{workerinput['workerid']}{trace_path.suffix}"
+        )
+    helm_runner.instrumentation.write_trace(str(trace_path))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node: Any, error: Any) -> None:
+    worker_instrumentation = getattr(node, "workeroutput", {}).get(INSTRUMENTATION_KEY)
+    if worker_instrumentation is None:
+        return
+
+    if worker_instrumentation_key not in node.config.stash:
+        node.config.stash[worker_instrumentation_key] = Instrumentation()
+    node.config.stash[worker_instrumentation_key].merge(
+        counters=worker_instrumentation["counters"],
+        events=[HelmEvent(**event) for event in worker_instrumentation["events"]],
+    )
+
+
+def pytest_terminal_summary(
+    terminalreporter: Any,
+    config: pytest.Config,
+) -> None:
+    slowest_renders: Optional[str] = config.getini("helm_templates_slowest_renders")
+    helm_runner = config.stash.get(helm_runner_key, None)
+    instrumentation = config.stash.get(worker_instrumentation_key, None)
+    if instrumentation is None and helm_runner is not None:
+        instrumentation = helm_runner.instrumentation
+    if not slowest_renders or instrumentation is None:
+        return
+
+    terminalreporter.write_sep("=", f"slowest {slowest_renders} helm renders")
+    for event in instrumentation.slowest(int(slowest_renders)):
+        helm_arguments = " ".join((event.helm_arguments or [])[1:])
+        terminalreporter.write_line(f"{event.duration:.2f}s {helm_arguments}")
+    counters = instrumentation.counters
+    terminalreporter.write_line(
+        f"helm ran for {instrumentation.total_time():.2f}s over"
+        f" {instrumentation.busy_time():.2f}s of wall time;"
+        f" {counters.get(MEMO_HITS, 0)} memo hits,"
+        f" {counters.get(CACHE_HITS, 0)} cache hits,"
+        f" {counters.get(CACHE_MISSES, 0)} cache misses"
+    )
+
+
+def pytest_report_header(config: pytest.Config) -> str:
+    return f"helm-templates: yaml backend {yaml_backend.get_backend()}"
+
+
+def pytest_collection_finish(session: pytest.Session) -> None:
+    config = session.config
+    if not config.getini("helm_templates_prewarm") or config.option.collectonly:
+        return
+    # pytest-xdist hands tests to its workers while the session runs, so a
+    # worker doesn't know which of the collected tests are its own. Workers
+    # prewarm the render of their next test instead.
+    if hasattr(config, "workerinput"):
+        return
+
+    requests: Dict[str, Dict[str, Any]] = {}
+    for item in session.items:
+        request = declared_render_request(item)
+        if request is not None:
+            requests.setdefault(object_fingerprint(request), request)
+    if not requests:
+        return
+
+    # Failed renders aren't memoized, so their errors are raised again when
+    # the tests that declared them ask for the result.
+    session_helm_runner(session.config).template_batch(list(requests.values()))
+
+
+def pytest_runtest_protocol(item: pytest.Item, nextitem: Optional[pytest.Item]) -> None:
+    config = item.config
+    if (
+        nextitem is None
+        or not hasattr(config, "workerinput")
+        or not config.getini("helm_templates_prewarm")
+    ):
+        return
+    request = declared_render_request(nextitem)
+    if request is None:
+        return
+
+    # Render the next test's render in the background while this test runs.
+    if next_render_executor_key not in config.stash:
+        config.stash[next_render_executor_key] = ThreadPoolExecutor(max_workers=1)
+    config.stash[next_render_key] = (
+        object_fingerprint(request),
+        config.stash[next_render_executor_key].submit(
+            session_helm_runner(config).template_batch, [request]
+        ),
+    )
+
+
+def declared_render_request(item: pytest.Item) -> Optional[Dict[str, Any]]:
+    """
+    The HelmRunner.template arguments declared by the closest helm_render
+    marker of the given test, or None if it has none. Malformed markers are
+    left to the helm_render fixture to report.
+    """
+    mark = item.get_closest_marker("helm_render")
+    if mark is None:
+        return None
+    try:
+        return helm_render_request(mark)
+    except ValueError:
+        return None
+
+
+def helm_render_request(mark: pytest.Mark) -> Dict[str, Any]:
+    """
+    Build the HelmRunner.template arguments declared by a helm_render marker.
+    """
+    if len(mark.args) > 1:
+        raise ValueError(
+            "helm_render only accepts the chart as a positional argument, got"
+            f" {mark.args}"
+        )
+    request = dict(mark.kwargs)
+    if mark.args:
+        request["chart"] = mark.args[0]
+    if "chart" not in request:
+        raise ValueError("helm_render requires a chart")
+    request.setdefault("name", DEFAULT_RELEASE_NAME)
+    return request
+
+
+def helm_runner_from_config(config: pytest.Config) -> HelmRunner:
+    """
+    Build a memoizing HelmRunner configured by the helm_templates_* ini options.
+    A chart index is kept alongside the render cache so later sessions only
+    re-read the chart files that changed, as is a chart cache so that pinned
+    remote charts are only pulled once.
+    pytest-xdist workers without a configured cache directory share a cache
+    directory created by the controller for the run. Helm calls are only
+    instrumented when a report or trace of them was asked for.
+    """
+    cache_dir: Optional[str] = config.getini("helm_templates_cache_dir")
+    if not cache_dir:
+        workerinput: Dict[str, Any] = getattr(config, "workerinput", {})
+        cache_dir = workerinput.get(SHARED_CACHE_DIR_KEY)
+    cache_max_age: Optional[str] = config.getini("helm_templates_cache_max_age")
+    cache_max_size: Optional[str] = config.getini("helm_templates_cache_max_size")
+    max_workers: Optional[str] = config.getini("helm_templates_max_workers")
+    resolved_cache_dir = config.rootpath.joinpath(cache_dir) if cache_dir else None
+    return HelmRunner(
+        chart_cache=(
+            ChartCache(cache_dir=str(resolved_cache_dir.joinpath(CHART_CACHE_NAME)))
+            if resolved_cache_dir
+            else None
+        ),
+        chart_index=(
+            ChartIndex(index_path=str(resolved_cache_dir.joinpath(CHART_INDEX_NAME)))
+            if resolved_cache_dir
+            else None
+        ),
+        computed_values_engine=config.getini("helm_templates_computed_values_engine"),
+        frozen_results=config.getini("helm_templates_frozen_results"),
+        helm_binary=config.getini("helm_templates_helm_binary"),
+        instrumentation=(
+            Instrumentation()
+            if config.getini("helm_templates_slowest_renders")
+            or config.getini("helm_templates_trace_file")
+            else None
+        ),
+        max_workers=int(max_workers) if max_workers else None,
+        memoize=True,
+        render_cache=(
+            RenderCache(
+                cache_dir=str(resolved_cache_dir),
+                max_age=float(cache_max_age) if cache_max_age else None,
+                max_size=int(cache_max_size) if cache_max_size else None,
+            )
+            if resolved_cache_dir
+            else None
+        ),
+        shadow_charts=config.getini("helm_templates_shadow_charts"),
+        slice_show_only=config.getini("helm_templates_slice_show_only"),
+    )
+
+
+def session_helm_runner(config: pytest.Config) -> HelmRunner:
+    """
+    The HelmRunner shared by the whole session, built on first use.
+    """
+    if helm_runner_key not in config.stash:
+        config.stash[helm_runner_key] = helm_runner_from_config(config)
+    return config.stash[helm_runner_key]
+
+
+@pytest.fixture(scope="session")
+def helm_runner(pytestconfig: pytest.Config) -> HelmRunner:
+    """
+    A HelmRunner shared by the whole session. Identical renders are only
+    performed once per session.
+    """
+    return session_helm_runner(pytestconfig)
+
+
+@pytest.fixture(scope="session")
+def helm_template(helm_runner: HelmRunner) -> Callable[..., List[Dict[str, Any]]]:
+    """
+    The template method of the session's shared HelmRunner.
+    """
+    return helm_runner.template
+
+
+@pytest.fixture
+def helm_render(request: pytest.FixtureRequest, helm_runner: HelmRunner) -> ManifestSet:
+    """
+    The rendered manifests of the closest helm_render marker of the test.
+    """
+    mark = request.node.get_closest_marker("helm_render")
+    if mark is None:
+        raise ValueError(
+            f"{request.node.nodeid} uses the helm_render fixture without a"
+            " helm_render marker"
+        )
+    render_request = helm_render_request(mark)
+    next_render = request.config.stash.get(next_render_key, None)
+    if next_render is not None and next_render[0] == object_fingerprint(render_request):
+        next_render[1].result()
+    return helm_runner.template(**render_request)
+
+
+@pytest.fixture
+def helm_snapshot(
+    request: pytest.FixtureRequest,
+    helm_runner: HelmRunner,
+) -> Callable[..., str]:
+    """
+    Check the render of the given HelmRunner.template arguments against a
+    golden snapshot stored next to the test module, see HelmSnapshot. A test
+    may take several snapshots, which are stored in separate files.
+    """
+    snapshot_dir = request.path.parent.joinpath(SNAPSHOT_DIR_NAME, request.path.stem)
+    update: bool = request.config.getoption(UPDATE_OPTION)
+    indexes = itertools.count()
+
+    def assert_match(chart: str, **template_kwargs: Any) -> str:
+        snapshot = HelmSnapshot(
+            helm_runner=helm_runner,
+            snapshot_path=snapshot_dir.joinpath(
+                snapshot_file_name(request.node.name, next(indexes))
+            ),
+            update=update,
+        )
+        return snapshot.assert_match(chart, **template_kwargs)
+
+    return assert_match
@@ -0,0 +1,258 @@
+import re
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from pytest_helm_templates.lazy_manifest_set import LazyManifestSet
+from pytest_helm_templates.manifest_set import Manifest, ManifestSet
+
+
+# A step of a path is a dict key, a list index or a wildcard over the items
+# of a list or the values of a dict.
+KEY_STEP = "key"
+INDEX_STEP = "index"
+WILDCARD_STEP = "wildcard"
+
+STEP_PATTERN = re.compile(
+    r"""
+    \[(?P<index>-?\d+)\]
+    | \[(?P<wildcard>\*)\]
+    | \[(?P<quote>["'])(?P<quoted_key>.*?)(?P=quote)\]
+    | (?P<dot>\.)?(?P<key>[^.\[\]"']+)
+    """,
+    re.VERBOSE,
+)
+
+# The criteria a LazyManifestSet can answer from its index.
+LAZY_CRITERIA = {"kind", "name", "source"}
+
+# Marks that no default was given, so that None can be a default.
+_NO_DEFAULT = object()
+
+
+class PathStep(NamedTuple):
+    kind: str
+    # The key or index of the step, None for wildcards.
+    value: Any
+    text: str
+
+
+class Query:
+    """
+    A path into the manifest selected by the given criteria, compiled once so
+    that it can be evaluated against many renders, e.g. one per values
+    variant of a chart. Paths are dotted keys with JSONPath-style brackets,
+    e.g. `spec.template.spec.containers[0].image`,
+    `metadata.labels["app.kubernetes.io/name"]` or `spec.ports[*].port`, and
+    may start with `$.`. Keys that aren't strings are written as their str(),
+    e.g. `data["80"]` for an integer key. Paths with a wildcard evaluate to a
+    list.
+    The criteria are those of ManifestSet.filter.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        api_version: Optional[str] = None,
+        kind: Optional[str] = None,
+        labels: Optional[Mapping[str, str]] = None,
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.criteria: Dict[str, Any] = {
+            "api_version": api_version,
+            "kind": kind,
+            "labels": labels,
+            "name": name,
+            "namespace": namespace,
+            "source": source,
+        }
+        self.steps = parse_path(path)
+        self.has_wildcard = any(step.kind == WILDCARD_STEP for step in self.steps)
+
+    def evaluate(
+        self,
+        manifests: Sequence[Manifest],
+        default: Any = _NO_DEFAULT,
+    ) -> Any:
+        """
+        Select the manifest matching the criteria from the given render and
+        return the value at the path. A KeyError describing the first missing
+        step is raised if the manifest or the path is missing, unless a
+        default is given. See select for how the manifest is selected.
+        """
+        try:
+            return self._resolve(self.select(manifests))
+        except KeyError:
+            if default is _NO_DEFAULT:
+                raise
+            return default
+
+    def evaluate_all(
+        self,
+        renders: Iterable[Sequence[Manifest]],
+        default: Any = _NO_DEFAULT,
+    ) -> List[Any]:
+        """
+        Evaluate the query against each of the given renders, returning a
+        column of results in the order of the renders. Errors name the
+        position of the render they were raised for.
+        """
+        results = []
+        for position, manifests in enumerate(renders):
+            try:
+                results.append(self.evaluate(manifests, default=default))
+            except (KeyError, ValueError) as error:
+                raise type(error)(f"render {position}: {error.args[0]}") from error
+        return results
+
+    def select(self, manifests: Sequence[Manifest]) -> Manifest:
+        """
+        Select the manifest matching the criteria from the given render,
+        raising a KeyError if there is none and a ValueError if the criteria
+        match several. Lazy renders are only parsed for the matching manifest
+        when the criteria can be answered from their index.
+        """
+        given_criteria = {
+            key: value for key, value in self.criteria.items() if value is not None
+        }
+        if isinstance(manifests, LazyManifestSet) and not (
+            set(given_criteria) <= LAZY_CRITERIA
+        ):
+            manifests = manifests.materialize()
+        elif not isinstance(manifests, (LazyManifestSet, ManifestSet)):
+            manifests = ManifestSet(manifests)
+
+        matches = manifests.filter(**given_criteria)
+        if len(matches) > 1:
+            raise ValueError(
+                f"{self!r} matches {len(matches)} manifests, expected exactly one"
+            )
+        if not matches:
+            raise KeyError(f"No manifest matches {given_criteria}")
+        return matches[0]
+
+    def _resolve(self, manifest: Manifest) -> Any:
+        description = self._describe(manifest)
+        values: List[Tuple[Any, str]] = [(manifest, "")]
+        for step in self.steps:
+            next_values = []
+            for value, trail in values:
+                next_values.extend(_step(value, step, trail, description))
+            values = next_values
+        if self.has_wildcard:
+            return [value for value, _ in values]
+        return values[0][0]
+
+    def _describe(self, manifest: Manifest) -> str:
+        metadata = manifest.get("metadata") if isinstance(manifest, dict) else None
+        name = metadata.get("name") if isinstance(metadata, dict) else None
+        kind = manifest.get("kind") if isinstance(manifest, dict) else None
+        return f"{kind}/{name}"
+
+    def __repr__(self) -> str:
+        given_criteria = ", ".join(
+            f"{key}={value!r}"
+            for key, value in self.criteria.items()
+            if value is not None
+        )
+        return f"Query({self.path!r}{', ' if given_criteria else ''}{given_criteria})"
+
+
+def parse_path(path: str) -> List[PathStep]:
+    """
+    Parse the given path into its steps, raising a ValueError if the path is
+    invalid.
+    """
+    position = 2 if path.startswith("$.") else 0
+    steps: List[PathStep] = []
+    while position < len(path):
+        step_match = STEP_PATTERN.match(path, position)
+        if step_match is None or (
+            step_match.group("key") is not None
+            and bool(step_match.group("dot")) != bool(steps)
+        ):
+            raise ValueError(
+                f"Invalid path `{path}`, unexpected `{path[position:]}` at"
+                f" position {position}"
+            )
+        text = step_match.group(0)
+        if step_match.group("index") is not None:
+            steps.append(PathStep(INDEX_STEP, int(step_match.group("index")), text))
+        elif step_match.group("wildcard") is not None:
+            steps.append(PathStep(WILDCARD_STEP, None, text))
+        elif step_match.group("quoted_key") is not None:
+            steps.append(PathStep(KEY_STEP, step_match.group("quoted_key"), text))
+        elif step_match.group("key") == "*":
+            steps.append(PathStep(WILDCARD_STEP, None, text))
+        else:
+            steps.append(PathStep(KEY_STEP, step_match.group("key"), text))
+        position = step_match.end()
+    if not steps:
+        raise ValueError(f"Invalid path `{path}`, expected at least one key")
+    return steps
+
+
+def _step(
+    value: Any,
+    step: PathStep,
+    trail: str,
+    description: str,
+) -> List[Tuple[Any, str]]:
+    """
+    Apply the given step to the value found at the given trail, returning the
+    values it leads to along with their trails.
+    """
+    step_trail = f"{trail}{step.text}" if trail else step.text.lstrip(".")
+    location = f"`{trail}`" if trail else "the manifest"
+    if step.kind == WILDCARD_STEP:
+        if isinstance(value, dict):
+            return [(item, f'{trail}["{key}"]') for key, item in value.items()]
+        if isinstance(value, list):
+            return [(item, f"{trail}[{index}]") for index, item in enumerate(value)]
+        raise KeyError(
+            f"{description}: expected a list or dict at {location} for"
+            f" `{step_trail}`, found {type(value).__name__}"
+        )
+
+    if step.kind == INDEX_STEP:
+        if not isinstance(value, list):
+            raise KeyError(
+                f"{description}: expected a list at {location} for `{step_trail}`,"
+                f" found {type(value).__name__}"
+            )
+        index = step.value
+        if not -len(value) <= index < len(value):
+            raise KeyError(
+                f"{description}: `{step_trail}` is out of range, {location} has"
+                f" {len(value)} items"
+            )
+        return [(value[index], step_trail)]
+
+    if not isinstance(value, dict):
+        raise KeyError(
+            f"{description}: expected a dict at {location} for `{step_trail}`,"
+            f" found {type(value).__name__}"
+        )
+    if step.value in value:
+        return [(value[step.value], step_trail)]
+    # YAML mapping keys may be integers and other scalars, which paths can
+    # only spell as strings.
+    for key, item in value.items():
+        if not isinstance(key, str) and str(key) == step.value:
+            return [(item, step_trail)]
+    available_keys = ", ".join(sorted(str(key) for key in value)) or "none"
+    raise KeyError(
+        f"{description}: `{step_trail}` is missing, {location} has keys"
+        f" {available_keys}"
+    )
@@ -0,0 +1,178 @@
+import os
+import pickle  # noqa: DUO103
+import sys
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+if sys.platform != "win32":
+    import fcntl
+
+
+class RenderCache:
+    """
+    A persistent, content-addressed cache of parsed helm output. Entries are
+    stored as zlib compressed pickles named after their key. Reading an entry
+    refreshes its modification time so that entries can be evicted in least
+    recently used order once they exceed the configured age or total size.
+    """
+
+    ENTRY_SUFFIX = ".entry"
+    FORMAT_VERSION = 2
+    LOCK_SUFFIX = ".lock"
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_age: Optional[float] = None,
+        max_size: Optional[int] = None,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_age = max_age
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the value stored for the given key, or None if there is no
+        usable entry for the key.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, mode="rb") as entry_file:
+                payload = entry_file.read()
+        except FileNotFoundError:
+            return None
+
+        # The entry may be evicted by another process, e.g. a pytest-xdist
+        # worker, at any point after it was read, which makes it a miss.
+        if self.max_age is not None:
+            try:
+                age = time.time() - entry_path.stat().st_mtime
+            except FileNotFoundError:
+                return None
+            if age > self.max_age:
+                self._remove(entry_path)
+                return None
+
+        try:
+            format_version, value = pickle.loads(  # noqa: DUO103
+                zlib.decompress(payload)
+            )
+        except Exception:
+            self._remove(entry_path)
+            return None
+
+        if format_version != self.FORMAT_VERSION:
+            self._remove(entry_path)
+            return None
+
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store the given value under the given key, evicting older entries if
+        the cache has grown beyond its limits.
+        """
+        payload = zlib.compress(
+            pickle.dumps(
+                (self.FORMAT_VERSION, value),
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        )
+        with NamedTemporaryFile(
+            delete=False,
+            dir=self.cache_dir,
+            mode="wb",
+            suffix=".tmp",
+        ) as temp_file:
+            temp_file.write(payload)
+        os.replace(temp_file.name, self._entry_path(key))
+
+        if self.max_age is not None or self.max_size is not None:
+            self.evict()
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the given key for the duration of the
+        context. The lock is a file lock, so it is shared by every process
+        using the same cache directory, e.g. pytest-xdist workers. Locking is a
+        no-op on platforms without fcntl.
+        """
+        if sys.platform == "win32":
+            yield
+            return
+
+        with open(self._lock_path(key), mode="ab") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+        """
+        for entry_path, _, _ in self._entries():
+            self._remove(entry_path)
+        for lock_path in self.cache_dir.glob(f"*{self.LOCK_SUFFIX}"):
+            self._remove(lock_path)
+
+    def evict(self) -> None:
+        """
+        Remove entries that are older than max_age, then remove the least
+        recently used entries until the cache is no larger than max_size.
+        """
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        retained: List[Tuple[Path, float, int]] = []
+        for entry in entries:
+            entry_path, modified_at, _ = entry
+            if self.max_age is not None and now - modified_at > self.max_age:
+                self._remove(entry_path)
+            else:
+                retained.append(entry)
+
+        if self.max_size is None:
+            return
+
+        total_size = sum(size for _, _, size in retained)
+        for entry_path, _, size in retained:
+            if total_size <= self.max_size:
+                break
+            self._remove(entry_path)
+            total_size -= size
+
+    def _entries(self) -> List[Tuple[Path, float, int]]:
+        entries = []
+        for dir_entry in os.scandir(self.cache_dir):
+            if not dir_entry.name.endswith(self.ENTRY_SUFFIX):
+                continue
+            try:
+                stat = dir_entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((Path(dir_entry.path), stat.st_mtime, stat.st_size))
+        return entries
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir.joinpath(f"{key}{self.ENTRY_SUFFIX}")
+
+    def _lock_path(self, key: str) -> Path:
+        return self.cache_dir.joinpath(f"{key}{self.LOCK_SUFFIX}")
+
+    def _remove(self, entry_path: Path) -> None:
+        try:
+            entry_path.unlink()
+        except FileNotFoundError:
+            pass
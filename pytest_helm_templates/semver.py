@@ -0,0 +1,207 @@
+import re
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+
+VERSION_PATTERN = re.compile(
+    r"^v?(?P<major>0|[1-9]\d*)"
+    r"(?:\.(?P<minor>0|[1-9]\d*))?"
+    r"(?:\.(?P<patch>0|[1-9]\d*))?"
+    r"(?:-(?P<prerelease>[0-9A-Za-z.-]+))?"
+    r"(?:\+[0-9A-Za-z.-]+)?$"
+)
+COMPARISON_PATTERN = re.compile(
+    r"^(?P<operator>!=|>=|=>|<=|=<|~>|[<>=~^])?"
+    r"v?(?P<major>[0-9]+|[xX*])"
+    r"(?:\.(?P<minor>[0-9]+|[xX*]))?"
+    r"(?:\.(?P<patch>[0-9]+|[xX*]))?"
+    r"(?:-(?P<prerelease>[0-9A-Za-z.-]+))?"
+    r"(?:\+[0-9A-Za-z.-]+)?$"
+)
+HYPHEN_RANGE_PATTERN = re.compile(r"(\S+)\s+-\s+(\S+)")
+OPERATOR_SPACING_PATTERN = re.compile(r"(!=|>=|=>|<=|=<|~>|[<>=~^])\s+")
+OPERATOR_ALIASES = {"=": "", "=>": ">=", "=<": "<=", "~>": "~"}
+WILDCARDS = ("x", "X", "*")
+
+Predicate = Callable[["Version"], bool]
+
+
+class Version(NamedTuple):
+    major: int
+    minor: int
+    patch: int
+    prerelease: Tuple[str, ...] = ()
+
+    def sort_key(self) -> Tuple:
+        # A release sorts after its prereleases. Numeric prerelease identifiers
+        # sort numerically and before alphanumeric ones.
+        prerelease_key = tuple(
+            (0, int(identifier), "") if identifier.isdigit() else (1, 0, identifier)
+            for identifier in self.prerelease
+        )
+        return (self.major, self.minor, self.patch, not self.prerelease, prerelease_key)
+
+
+def parse_version(version: str) -> Version:
+    """
+    Parse a semantic version, allowing a leading `v` and a missing minor or
+    patch version like helm does. Raises a ValueError for invalid versions.
+    """
+    match = VERSION_PATTERN.match(version.strip())
+    if match is None:
+        raise ValueError(f"Invalid semantic version `{version}`")
+    prerelease = match.group("prerelease")
+    return Version(
+        major=int(match.group("major")),
+        minor=int(match.group("minor") or 0),
+        patch=int(match.group("patch") or 0),
+        prerelease=tuple(prerelease.split(".")) if prerelease else (),
+    )
+
+
+def version_matches(constraint: str, version: str) -> bool:
+    """
+    Check whether the given version satisfies the given constraint, following
+    the constraint syntax helm uses for chart dependencies: `||` separated
+    alternatives of comma or space separated comparisons, `~` and `^` ranges,
+    `x` wildcards and hyphen ranges. Prereleases only satisfy comparisons that
+    include a prerelease. Raises a ValueError for invalid constraints or
+    versions.
+    """
+    parsed_version = parse_version(version)
+    return any(
+        all(predicate(parsed_version) for predicate in alternative)
+        for alternative in _parse_constraint(constraint)
+    )
+
+
+def is_compatible_range(constraint: str, version: str) -> bool:
+    """
+    Like version_matches, but invalid constraints or versions are reported as
+    incompatible instead of raising, like helm's IsCompatibleRange.
+    """
+    try:
+        return version_matches(constraint, version)
+    except ValueError:
+        return False
+
+
+def _parse_constraint(constraint: str) -> List[List[Predicate]]:
+    alternatives = []
+    for alternative in constraint.split("||"):
+        alternative = HYPHEN_RANGE_PATTERN.sub(r">=\1,<=\2", alternative)
+        alternative = OPERATOR_SPACING_PATTERN.sub(r"\1", alternative)
+        comparisons = [
+            comparison for comparison in re.split(r"[\s,]+", alternative) if comparison
+        ]
+        if not comparisons:
+            raise ValueError(f"Invalid semantic version constraint `{constraint}`")
+        alternatives.append(
+            [_parse_comparison(comparison) for comparison in comparisons]
+        )
+    return alternatives
+
+
+def _parse_comparison(comparison: str) -> Predicate:
+    match = COMPARISON_PATTERN.match(comparison)
+    if match is None:
+        raise ValueError(f"Invalid semantic version constraint `{comparison}`")
+
+    operator = match.group("operator") or ""
+    operator = OPERATOR_ALIASES.get(operator, operator)
+    numbers: List[int] = []
+    for part in (match.group("major"), match.group("minor"), match.group("patch")):
+        if part is None or part in WILDCARDS:
+            break
+        numbers.append(int(part))
+    # The number of leading version parts that were given explicitly.
+    precision = len(numbers)
+    numbers += [0] * (3 - precision)
+    prerelease = match.group("prerelease")
+    lower = Version(
+        major=numbers[0],
+        minor=numbers[1],
+        patch=numbers[2],
+        prerelease=tuple(prerelease.split(".")) if prerelease else (),
+    )
+
+    def upper(bump_index: int) -> Version:
+        bumped = numbers[:bump_index] + [numbers[bump_index] + 1] + [0, 0]
+        return Version(major=bumped[0], minor=bumped[1], patch=bumped[2])
+
+    if precision == 0:
+        # A full wildcard is equivalent to >=0.0.0.
+        low, high = lower, None
+        if operator in ("!=", ">", "<"):
+            return lambda version: False
+    elif operator in ("", "!=", ">", "<="):
+        # Partial versions stand for every version they are a prefix of.
+        low, high = lower, upper(precision - 1) if precision < 3 else None
+        if operator == "!=":
+            return _excluding(_within(low, high, exact=high is None), bool(prerelease))
+        if operator == ">":
+            return _within(high or lower, None, exclusive_low=high is None)
+        if operator == "<=":
+            return _below(high, inclusive=False) if high else _below(lower, True)
+        return _within(low, high, exact=high is None)
+    elif operator == ">=":
+        low, high = lower, None
+    elif operator == "<":
+        return _below(lower, inclusive=False)
+    elif operator == "~":
+        low, high = lower, upper(0 if precision == 1 else 1)
+    else:
+        # The caret allows changes that don't modify the left-most non-zero
+        # part of the version.
+        if numbers[0] > 0 or precision == 1:
+            high = upper(0)
+        elif numbers[1] > 0 or precision == 2:
+            high = upper(1)
+        else:
+            high = upper(2)
+        low = lower
+    return _within(low, high)
+
+
+def _allowed(version: Version, low: Version) -> bool:
+    return not version.prerelease or bool(low.prerelease)
+
+
+def _below(bound: Version, inclusive: bool) -> Predicate:
+    def check(version: Version) -> bool:
+        if not _allowed(version, bound):
+            return False
+        if inclusive:
+            return version.sort_key() <= bound.sort_key()
+        return version.sort_key() < bound.sort_key()
+
+    return check
+
+
+def _excluding(predicate: Predicate, allows_prerelease: bool) -> Predicate:
+    def check(version: Version) -> bool:
+        if version.prerelease and not allows_prerelease:
+            return False
+        return not predicate(version)
+
+    return check
+
+
+def _within(
+    low: Version,
+    high: Optional[Version],
+    exact: bool = False,
+    exclusive_low: bool = False,
+) -> Predicate:
+    def check(version: Version) -> bool:
+        if not _allowed(version, low):
+            return False
+        if exact:
+            return version.sort_key() == low.sort_key()
+        if exclusive_low:
+            if version.sort_key() <= low.sort_key():
+                return False
+        elif version.sort_key() < low.sort_key():
+            return False
+        return high is None or version.sort_key() < high.sort_key()
+
+    return check
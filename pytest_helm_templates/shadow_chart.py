@@ -0,0 +1,50 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Iterator
+
+
+ADHOC_TEMPLATE_PATH = "templates/pytest-helm-templates-adhoc.yaml"
+
+
+@contextmanager
+def shadow_chart(chart_path: Path, content: str) -> Iterator[Path]:
+    """
+    Build a lightweight copy of the given chart whose only regular template is
+    an adhoc template populated with the given content, yielding the path of
+    the copy. Everything but the chart's templates is symlinked into the copy,
+    as are the partials in its templates, so the adhoc template can use the
+    chart's values, subcharts and helpers without helm rendering every other
+    template. The adhoc template is always at ADHOC_TEMPLATE_PATH, so renders
+    of the same content against an unchanged chart are identical.
+    """
+    chart_path = chart_path.resolve()
+    with TemporaryDirectory(prefix="pytest-helm-templates-shadow-") as temp_dir:
+        shadow_chart_path = Path(temp_dir).joinpath(chart_path.name)
+        shadow_chart_path.mkdir()
+        for entry in chart_path.iterdir():
+            if entry.name != "templates":
+                shadow_chart_path.joinpath(entry.name).symlink_to(entry)
+
+        templates_path = chart_path.joinpath("templates")
+        shadow_templates_path = shadow_chart_path.joinpath("templates")
+        shadow_templates_path.mkdir()
+        for dir_path, _, file_names in os.walk(templates_path, followlinks=True):
+            for file_name in file_names:
+                # helm doesn't render files starting with an underscore, they
+                # only hold named templates.
+                if not file_name.startswith("_"):
+                    continue
+                file_path = Path(dir_path).joinpath(file_name)
+                shadow_file_path = shadow_templates_path.joinpath(
+                    file_path.relative_to(templates_path)
+                )
+                shadow_file_path.parent.mkdir(parents=True, exist_ok=True)
+                shadow_file_path.symlink_to(file_path)
+
+        shadow_chart_path.joinpath(ADHOC_TEMPLATE_PATH).write_text(
+            content,
+            encoding="utf-8",
+        )
+        yield shadow_chart_path
@@ -0,0 +1,196 @@
+import os
+import re
+from pathlib import Path
+from typing import Any, Iterator, List, NamedTuple, Optional, Union
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.diff import diff_renders
+from pytest_helm_templates.fingerprint import object_fingerprint
+from pytest_helm_templates.frozen import thaw
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.matrix import DEFAULT_RELEASE_NAME
+
+
+SNAPSHOT_DIR_NAME = "__snapshots__"
+SNAPSHOT_VERSION = 1
+UPDATE_OPTION = "--helm-templates-update-snapshots"
+
+# How a snapshot was checked. A fresh snapshot was neither rendered nor
+# compared because its fingerprint matched.
+FRESH = "fresh"
+MATCHED = "matched"
+WRITTEN = "written"
+
+UNSAFE_NAME_PATTERN = re.compile(r"[^\w.=-]+")
+
+
+class SnapshotDocument(NamedTuple):
+    """
+    A rendered document as stored in a snapshot. digest is the digest of the
+    manifest alone.
+    """
+
+    digest: str
+    source: Optional[str]
+    manifest: Any
+
+
+class HelmSnapshot:
+    """
+    Golden-file snapshots of the full output of `helm template`. A snapshot
+    stores each rendered document in canonical form along with its digest,
+    and the fingerprint of the chart files, values, arguments and helm version
+    that produced it. While the fingerprint still matches, checking the
+    snapshot skips both the render and the comparison. The fingerprint
+    includes the helm version, so the first check of each HelmRunner still
+    runs `helm version` once. Otherwise the chart is rendered and only the
+    documents whose digest changed are reported. Renders that can't be
+    fingerprinted, e.g. of unpinned remote charts, are always rendered and
+    compared.
+    """
+
+    def __init__(
+        self,
+        helm_runner: HelmRunner,
+        snapshot_path: Union[Path, str],
+        update: bool = False,
+    ) -> None:
+        self.helm_runner = helm_runner
+        self.snapshot_path = Path(snapshot_path)
+        self.update = update
+
+    def assert_match(
+        self,
+        chart: str,
+        name: str = DEFAULT_RELEASE_NAME,
+        **template_kwargs: Any,
+    ) -> str:
+        """
+        Check the render of the given HelmRunner.template arguments against
+        the snapshot, raising an AssertionError describing the documents that
+        changed if it doesn't match. When updating, the snapshot is written
+        instead, and a matching render refreshes the stored fingerprint so
+        that later checks can skip it. Checks never modify the snapshot.
+        Returns FRESH, MATCHED or WRITTEN.
+        """
+        fingerprint = self.helm_runner.template_fingerprint(
+            chart=chart, name=name, **template_kwargs
+        )
+        exists = self.snapshot_path.exists()
+        if not exists and not self.update:
+            raise AssertionError(
+                f"Snapshot {self.snapshot_path} doesn't exist, run pytest with"
+                f" {UPDATE_OPTION} to write it"
+            )
+        stored_fingerprint = self._stored_fingerprint()
+        if fingerprint is not None and fingerprint == stored_fingerprint:
+            return FRESH
+
+        documents = canonical_documents(
+            self.helm_runner.template(chart=chart, name=name, **template_kwargs)
+        )
+        stored_documents = list(self._stored_documents()) if exists else []
+        digests = [document.digest for document in documents]
+        if exists and digests == [document.digest for document in stored_documents]:
+            if self.update and fingerprint != stored_fingerprint:
+                self._write(fingerprint, documents)
+            return MATCHED
+        if self.update:
+            self._write(fingerprint, documents)
+            return WRITTEN
+        raise AssertionError(
+            f"The render of {chart} doesn't match snapshot {self.snapshot_path}:\n"
+            f"{describe_changes(stored_documents, documents)}\n"
+            f"Run pytest with {UPDATE_OPTION} to update it"
+        )
+
+    def _stored_documents(self) -> Iterator[SnapshotDocument]:
+        with open(self.snapshot_path, encoding="utf-8") as snapshot_file:
+            stored = yaml_backend.safe_load_all(snapshot_file.read())
+            next(stored)
+            for document in stored:
+                yield SnapshotDocument(
+                    digest=document["digest"],
+                    manifest=document["manifest"],
+                    source=document.get("source"),
+                )
+
+    def _stored_fingerprint(self) -> Optional[str]:
+        """
+        The fingerprint of the snapshot, read from its header without parsing
+        the documents.
+        """
+        if not self.snapshot_path.exists():
+            return None
+        with open(self.snapshot_path, encoding="utf-8") as snapshot_file:
+            header = next(yaml_backend.safe_load_all(snapshot_file.read()), None)
+        if not isinstance(header, dict) or header.get("version") != SNAPSHOT_VERSION:
+            return None
+        fingerprint: Optional[str] = header.get("fingerprint")
+        return fingerprint
+
+    def _write(
+        self,
+        fingerprint: Optional[str],
+        documents: List[SnapshotDocument],
+    ) -> None:
+        header = {"fingerprint": fingerprint, "version": SNAPSHOT_VERSION}
+        content = yaml_backend.safe_dump_all(
+            [header]
+            + [
+                {
+                    "digest": document.digest,
+                    "manifest": document.manifest,
+                    "source": document.source,
+                }
+                for document in documents
+            ],
+            explicit_start=True,
+            sort_keys=True,
+        )
+        self.snapshot_path.parent.mkdir(exist_ok=True, parents=True)
+        temp_path = self.snapshot_path.with_name(f".{self.snapshot_path.name}.tmp")
+        temp_path.write_text(content, encoding="utf-8")
+        os.replace(temp_path, self.snapshot_path)
+
+
+def canonical_documents(manifests: ManifestSet) -> List[SnapshotDocument]:
+    """
+    The documents of a render in canonical form: plain data whose digest
+    doesn't depend on key order.
+    """
+    return [
+        SnapshotDocument(
+            digest=object_fingerprint(manifest),
+            manifest=thaw(manifest),
+            source=source,
+        )
+        for source, manifest in zip(manifests.sources, manifests)
+    ]
+
+
+def describe_changes(
+    old: List[SnapshotDocument],
+    new: List[SnapshotDocument],
+) -> str:
+    """
+    Describe the documents that differ between two snapshots. Documents whose
+    digest is found on both sides are left out without being compared.
+    """
+    old_digests = {document.digest for document in old}
+    new_digests = {document.digest for document in new}
+    diff = diff_renders(
+        [document.manifest for document in old if document.digest not in new_digests],
+        [document.manifest for document in new if document.digest not in old_digests],
+    )
+    return str(diff) if diff else "The documents were reordered"
+
+
+def snapshot_file_name(test_name: str, index: int = 0) -> str:
+    """
+    The file name of the snapshot a test takes at the given index, e.g. the
+    second snapshot of `test_app[prod]` is stored in `test_app-prod.1.yaml`.
+    """
+    safe_name = UNSAFE_NAME_PATTERN.sub("_", test_name.replace("[", "-").rstrip("]"))
+    return f"{safe_name}.{index}.yaml" if index else f"{safe_name}.yaml"
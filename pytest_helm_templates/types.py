@@ -1,4 +1,36 @@
 from dataclasses import dataclass
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar, Union, cast
+
+
+T = TypeVar("T")
+
+
+# A rendered manifest paired with the `# Source:` of the template that
+# produced it.
+SourcedManifests = List[Tuple[Optional[str], Any]]
+
+
+@dataclass(frozen=True)
+class BatchResult(Generic[T]):
+    """
+    The outcome of a single request in a batch: either the value the request
+    produced or the error it raised.
+    """
+
+    value: Optional[T] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def unwrap(self) -> T:
+        """
+        Return the value of the request, raising its error if it failed.
+        """
+        if self.error is not None:
+            raise self.error
+        return cast(T, self.value)
 
 
 @dataclass
@@ -15,3 +47,50 @@ class DependencyListItem:
     @property
     def is_ok(self) -> bool:
         return self.status == "ok"
+
+
+@dataclass(frozen=True)
+class HelmEvent:
+    """
+    A timed phase of a helm call. start is a time.perf_counter() reading and
+    duration is in seconds. chart and helm_arguments describe the call the
+    phase belongs to and output_size is the size of the output the phase
+    handled, where they apply.
+    """
+
+    phase: str
+    start: float
+    duration: float
+    thread_id: int
+    chart: Optional[str] = None
+    helm_arguments: Optional[List[str]] = None
+    output_size: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class MatrixCase:
+    """
+    A case of a RenderMatrix: the item each axis contributes, keyed by axis
+    name, and the normalized HelmRunner.template arguments they make up.
+    """
+
+    id: str
+    parameters: Dict[str, Any]
+    request: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class TemplateOptions:
+    chart: str
+    name: str
+    api_versions: Optional[List[str]] = None
+    dry_run: Optional[str] = None
+    include_crds: Optional[bool] = None
+    is_upgrade: Optional[bool] = None
+    kube_version: Optional[str] = None
+    namespace: Optional[str] = None
+    repo: Optional[str] = None
+    show_only: Optional[List[str]] = None
+    skip_tests: Optional[bool] = None
+    values: Optional[List[Union[Dict[str, Any], str]]] = None
+    version: Optional[str] = None
@@ -0,0 +1,131 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pytest_helm_templates import yaml_backend
+
+
+# helm reads a values file named `-` from stdin.
+STDIN_VALUES = "-"
+TMPFS_DIR = "/dev/shm"
+
+
+def merge_values(base: Dict, override: Dict) -> Dict:
+    """
+    Merge override into a copy of base the same way helm merges successive
+    values files: nested maps are merged and any other value, including null,
+    replaces the existing one.
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_values(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class ValuesStage:
+    """
+    A staging area for values files that can't be passed to helm in memory.
+    Files are named after the hash of their content, so identical values are
+    only written once and are reused by later renders. The staging area lives
+    on tmpfs when /dev/shm is available and is removed when the process exits.
+    """
+
+    def __init__(self, stage_dir: Optional[str] = None) -> None:
+        if stage_dir is None:
+            stage_dir = tempfile.mkdtemp(
+                dir=_tmpfs_dir(),
+                prefix=f"pytest-helm-templates-values-{os.getpid()}-",
+            )
+        self.stage_dir = Path(stage_dir)
+        self.stage_dir.mkdir(parents=True, exist_ok=True)
+
+    def stage(self, values_yaml: str) -> str:
+        """
+        Return the path of a file holding the given values YAML, writing it if
+        it isn't staged yet.
+        """
+        digest = hashlib.sha256(values_yaml.encode("utf-8")).hexdigest()
+        values_path = self.stage_dir.joinpath(f"{digest}.yaml")
+        if not values_path.exists():
+            with tempfile.NamedTemporaryFile(
+                delete=False,
+                dir=self.stage_dir,
+                encoding="utf-8",
+                mode="w",
+                suffix=".tmp",
+            ) as temp_file:
+                temp_file.write(values_yaml)
+            os.replace(temp_file.name, values_path)
+        return str(values_path)
+
+    def cleanup(self) -> None:
+        """
+        Remove the staging area and every file in it.
+        """
+        shutil.rmtree(self.stage_dir, ignore_errors=True)
+
+
+def _tmpfs_dir() -> Optional[str]:
+    if os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK):
+        return TMPFS_DIR
+    return None
+
+
+_default_stage: Optional[ValuesStage] = None
+_default_stage_lock = threading.Lock()
+
+
+def default_values_stage() -> ValuesStage:
+    """
+    The staging area shared by every runner in this process. It is created on
+    first use and removed when the process exits.
+    """
+    global _default_stage
+
+    with _default_stage_lock:
+        if _default_stage is None:
+            _default_stage = ValuesStage()
+            atexit.register(_default_stage.cleanup)
+        return _default_stage
+
+
+def values_transport(
+    values: List[Union[Dict[str, Any], str]],
+    stage: Optional[ValuesStage] = None,
+) -> Tuple[List[str], Optional[str]]:
+    """
+    Plan how the given values are handed to helm, returning the values files
+    to pass in order and the YAML to write to helm's stdin, if any. Adjacent
+    dicts are merged with helm's semantics. The first group of dicts is passed
+    on stdin and any later group, which can only follow a values file, is
+    staged on disk.
+    """
+    groups: List[Union[Dict[str, Any], str]] = []
+    for values_instance in values:
+        if isinstance(values_instance, str):
+            groups.append(values_instance)
+        elif groups and isinstance(groups[-1], dict):
+            groups[-1] = merge_values(groups[-1], values_instance)
+        else:
+            groups.append(dict(values_instance))
+
+    values_files: List[str] = []
+    stdin: Optional[str] = None
+    for group in groups:
+        if isinstance(group, str):
+            values_files.append(group)
+        elif stdin is None:
+            stdin = yaml_backend.safe_dump(group)
+            values_files.append(STDIN_VALUES)
+        else:
+            values_stage = stage or default_values_stage()
+            values_files.append(values_stage.stage(yaml_backend.safe_dump(group)))
+    return values_files, stdin
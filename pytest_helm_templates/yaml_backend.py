@@ -0,0 +1,116 @@
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Type, Union
+
+import yaml
+
+from pytest_helm_templates.frozen import FrozenDict, FrozenList
+
+
+AUTO_BACKEND = "auto"
+LIBYAML_BACKEND = "libyaml"
+PYTHON_BACKEND = "python"
+YAML_BACKEND_ENV_VAR = "PYTEST_HELM_TEMPLATES_YAML_BACKEND"
+
+LIBYAML_AVAILABLE = bool(getattr(yaml, "__with_libyaml__", False)) and hasattr(
+    yaml, "CSafeLoader"
+)
+
+
+class _SafeDumper(yaml.SafeDumper):
+    """
+    A SafeDumper that also dumps frozen containers, without registering them
+    on yaml's own SafeDumper.
+    """
+
+
+_dumpers: Dict[str, Type[yaml.SafeDumper]] = {PYTHON_BACKEND: _SafeDumper}
+if LIBYAML_AVAILABLE:
+
+    class _CSafeDumper(yaml.CSafeDumper):
+        """
+        Like _SafeDumper, but for the libyaml backend.
+        """
+
+    _dumpers[LIBYAML_BACKEND] = _CSafeDumper  # type: ignore[assignment]
+
+for _frozen_dumper in _dumpers.values():
+    _frozen_dumper.add_representer(FrozenDict, yaml.SafeDumper.represent_dict)
+    _frozen_dumper.add_representer(FrozenList, yaml.SafeDumper.represent_list)
+    _frozen_dumper.add_representer(frozenset, yaml.SafeDumper.represent_set)
+
+_backend = PYTHON_BACKEND
+_dumper: Type[yaml.SafeDumper] = _SafeDumper
+_loader: Type[yaml.SafeLoader] = yaml.SafeLoader
+
+
+def available_backends() -> List[str]:
+    """
+    The YAML backends that can be used in this environment.
+    """
+    if LIBYAML_AVAILABLE:
+        return [LIBYAML_BACKEND, PYTHON_BACKEND]
+    return [PYTHON_BACKEND]
+
+
+def get_backend() -> str:
+    """
+    The name of the YAML backend currently used to load and dump YAML.
+    """
+    return _backend
+
+
+def set_backend(backend: str) -> None:
+    """
+    Select the YAML backend used to load and dump YAML. `libyaml` uses the
+    PyYAML C extension, `python` uses the pure Python implementation, and
+    `auto` uses libyaml when it is available.
+    """
+    global _backend, _dumper, _loader
+
+    if backend == AUTO_BACKEND:
+        backend = LIBYAML_BACKEND if LIBYAML_AVAILABLE else PYTHON_BACKEND
+    if backend not in available_backends():
+        raise ValueError(
+            f"Unsupported YAML backend `{backend}`. Expected one of"
+            f" {[AUTO_BACKEND, *available_backends()]}"
+        )
+
+    _dumper = _dumpers[backend]
+    if backend == LIBYAML_BACKEND:
+        _loader = yaml.CSafeLoader  # type: ignore[assignment]
+    else:
+        _loader = yaml.SafeLoader
+    _backend = backend
+
+
+def safe_dump(data: Any, **kwargs: Any) -> str:
+    """
+    Like yaml.safe_dump, but using the selected backend.
+    """
+    dumped: str = yaml.dump(data, Dumper=_dumper, **kwargs)  # noqa: DUO109
+    return dumped
+
+
+def safe_dump_all(documents: Iterable[Any], **kwargs: Any) -> str:
+    """
+    Like yaml.safe_dump_all, but using the selected backend.
+    """
+    dumped: str = yaml.dump_all(documents, Dumper=_dumper, **kwargs)  # noqa: DUO109
+    return dumped
+
+
+def safe_load(stream: Union[bytes, str]) -> Any:
+    """
+    Like yaml.safe_load, but using the selected backend.
+    """
+    return yaml.load(stream, Loader=_loader)  # noqa: DUO109
+
+
+def safe_load_all(stream: Union[bytes, str]) -> Iterator[Any]:
+    """
+    Like yaml.safe_load_all, but using the selected backend.
+    """
+    return yaml.load_all(stream, Loader=_loader)  # noqa: DUO109
+
+
+set_backend(os.environ.get(YAML_BACKEND_ENV_VAR, AUTO_BACKEND))
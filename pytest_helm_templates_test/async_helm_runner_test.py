@@ -0,0 +1,141 @@
+import asyncio
+import os
+import stat
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Optional
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates.async_helm_runner import AsyncHelmRunner
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates_test.test_helpers import fixture_path
+
+
+def test_async_helm_runner_template_matches_helm_runner() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    manifests = asyncio.run(
+        AsyncHelmRunner().template(chart=test_chart_path, name="test-chart")
+    )
+
+    expected_manifests = HelmRunner().template(chart=test_chart_path, name="test-chart")
+    assert manifests == expected_manifests
+    assert manifests.sources == expected_manifests.sources
+
+
+def test_async_helm_runner_computed_values_returns_expected_values() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    values = asyncio.run(AsyncHelmRunner().computed_values(chart=test_chart_path))
+
+    with open(f"{test_chart_path}/values.yaml", encoding="utf-8", mode="r") as file:
+        expected_values = yaml.safe_load(file)
+    assert values == expected_values
+
+
+def test_async_helm_runner_notes_raises_error_if_local_chart_not_found() -> None:
+    with pytest.raises(ValueError) as ex:
+        asyncio.run(
+            AsyncHelmRunner().notes(
+                chart="/almost/certainly/not/a/real/path",
+                name="test-chart",
+            )
+        )
+
+    assert "Notes can only be rendered for local charts." in str(ex)
+
+
+def test_async_helm_runner_raises_error_when_helm_fails(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch.object(
+        AsyncHelmRunner,
+        "_helm_command",
+        return_value=[sys.executable, "-c", "import sys; sys.exit(3)"],
+    )
+    with pytest.raises(RuntimeError) as ex:
+        asyncio.run(AsyncHelmRunner().dependency_build(chart="chart"))
+
+    assert "helm command failed with return code 3" in str(ex)
+
+
+def test_async_helm_runner_limits_concurrency(mocker: MockerFixture) -> None:
+    running: List[int] = [0, 0]
+
+    async def communicate(helm_arguments: List[str], stdin: Optional[str]) -> tuple:
+        running[0] += 1
+        running[1] = max(running)
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return b"", b"", 0
+
+    helm_runner = AsyncHelmRunner(max_concurrency=2)
+    mocker.patch.object(helm_runner, "_communicate", side_effect=communicate)
+
+    async def run() -> None:
+        await asyncio.gather(
+            *(helm_runner.dependency_build(chart=str(n)) for n in range(6))
+        )
+
+    asyncio.run(run())
+
+    assert running[1] == 2
+
+
+def test_async_helm_runner_limits_concurrency_across_event_loops(
+    mocker: MockerFixture,
+) -> None:
+    async def communicate(helm_arguments: List[str], stdin: Optional[str]) -> tuple:
+        await asyncio.sleep(0.01)
+        return b"", b"", 0
+
+    helm_runner = AsyncHelmRunner(max_concurrency=1)
+    mocker.patch.object(helm_runner, "_communicate", side_effect=communicate)
+
+    async def run() -> None:
+        await asyncio.gather(
+            *(helm_runner.dependency_build(chart=str(n)) for n in range(3))
+        )
+
+    asyncio.run(asyncio.wait_for(run(), timeout=30))
+    asyncio.run(asyncio.wait_for(run(), timeout=30))
+
+    assert helm_runner._communicate.call_count == 6  # type: ignore[attr-defined]
+
+
+def test_async_helm_runner_rejects_invalid_max_concurrency() -> None:
+    with pytest.raises(ValueError):
+        AsyncHelmRunner(max_concurrency=0)
+
+
+def test_async_helm_runner_kills_helm_when_cancelled() -> None:
+    with TemporaryDirectory() as temp_dir:
+        pid_path = Path(temp_dir).joinpath("pid")
+        fake_helm_path = Path(temp_dir).joinpath("helm")
+        fake_helm_path.write_text(
+            f"#!{sys.executable}\n"
+            "import os, time\n"
+            f"open({str(pid_path)!r}, 'w').write(str(os.getpid()))\n"
+            "time.sleep(60)\n",
+            encoding="utf-8",
+        )
+        fake_helm_path.chmod(fake_helm_path.stat().st_mode | stat.S_IEXEC)
+        helm_runner = AsyncHelmRunner(helm_binary=str(fake_helm_path))
+
+        async def run() -> None:
+            task = asyncio.create_task(helm_runner.dependency_build(chart="chart"))
+            while not pid_path.exists() or not pid_path.read_text():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(asyncio.wait_for(run(), timeout=30))
+
+        pid = int(pid_path.read_text())
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
@@ -0,0 +1,6 @@
+import sys
+
+from pytest_helm_templates_test.benchmarks.suite import main
+
+
+sys.exit(main())
@@ -0,0 +1,434 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import textwrap
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import yaml
+
+from pytest_helm_templates.chart_index import ChartIndex
+from pytest_helm_templates.diff import diff_renders
+from pytest_helm_templates.fingerprint import chart_fingerprint
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.lazy_manifest_set import LazyManifestSet
+from pytest_helm_templates.native_values import NATIVE_ENGINE
+from pytest_helm_templates_test.test_helpers.synthetic_chart import (
+    SyntheticChartShape,
+    write_synthetic_chart,
+)
+
+
+BASELINES_PATH = Path(__file__).parent.joinpath("baselines.json")
+BATCH_SIZE = 8
+# A benchmark regresses when its median latency or peak memory grows by more
+# than these factors, or its throughput shrinks by more than the latency one.
+LATENCY_THRESHOLD = 1.5
+MEMORY_THRESHOLD = 1.25
+PROFILES: Dict[str, SyntheticChartShape] = {
+    "small": {
+        "crd_properties": 50,
+        "subcharts": 2,
+        "templates": 10,
+        "values_breadth": 3,
+        "values_depth": 3,
+    },
+    "large": {
+        "crd_properties": 1000,
+        "subcharts": 10,
+        "templates": 200,
+        "values_breadth": 5,
+        "values_depth": 5,
+    },
+}
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """
+    The measurements of a benchmark. Latencies are in seconds, throughput is
+    in operations per second and peak_memory is the peak size in bytes of the
+    Python allocations made by a single iteration.
+    """
+
+    name: str
+    iterations: int
+    latency_median: float
+    latency_p95: float
+    throughput: float
+    peak_memory: int
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: str
+    metric: str
+    baseline: float
+    measured: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.metric} regressed from {self.baseline:.6g} to"
+            f" {self.measured:.6g}"
+        )
+
+
+def measure(
+    name: str,
+    operation: Callable[[], Any],
+    iterations: int,
+    operations_per_iteration: int = 1,
+) -> BenchmarkResult:
+    """
+    Run the operation once to warm up, then time the given number of
+    iterations. Memory is traced in a separate iteration so that tracing
+    doesn't skew the latencies.
+    """
+    operation()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    sorted_latencies = sorted(latencies)
+    return BenchmarkResult(
+        iterations=iterations,
+        latency_median=statistics.median(sorted_latencies),
+        latency_p95=sorted_latencies[
+            min(len(sorted_latencies) - 1, int(len(sorted_latencies) * 0.95))
+        ],
+        name=name,
+        peak_memory=peak_memory,
+        throughput=operations_per_iteration * iterations / sum(latencies),
+    )
+
+
+def synthetic_template_output(chart_path: Path, templates: int) -> str:
+    """
+    Build output shaped like `helm template` output for a synthetic chart, so
+    that parsing can be measured without helm. Like helm with --include-crds,
+    the output starts with the chart's CRD, if it ships one.
+    """
+    crd_path = chart_path.joinpath("crds/crd.yaml")
+    crd_documents = (
+        [f"---\n# Source: {chart_path.name}/crds/crd.yaml\n{crd_path.read_text()}"]
+        if crd_path.exists()
+        else []
+    )
+    values = yaml.safe_load(chart_path.joinpath("values.yaml").read_text())
+    # Dumping the settings once and indenting them by hand is much faster than
+    # dumping a large block scalar for every document.
+    settings_yaml = textwrap.indent(yaml.safe_dump(values["settings"]), "    ")
+    documents = [
+        f"---\n# Source: {chart_path.name}/templates/configmap-{index}.yaml\n"
+        "apiVersion: v1\n"
+        "kind: ConfigMap\n"
+        "metadata:\n"
+        f"  name: release-name-{chart_path.name}-{index}\n"
+        "data:\n"
+        f"  index: '{index}'\n"
+        f"  settings: |\n{settings_yaml}"
+        for index in range(templates)
+    ]
+    return "".join(crd_documents + documents)
+
+
+def run_benchmarks(
+    chart_path: Path,
+    profile: SyntheticChartShape,
+    iterations: int,
+    helm_binary: Optional[str] = None,
+) -> List[BenchmarkResult]:
+    """
+    Measure each HelmRunner method against the given synthetic chart. The
+    methods that need helm are only measured when a helm binary is given.
+    """
+    chart = str(chart_path)
+    template_output = synthetic_template_output(chart_path, profile["templates"])
+    encoded_template_output = template_output.encode("utf-8")
+    native_helm_runner = HelmRunner(computed_values_engine=NATIVE_ENGINE)
+    # Like the session runner of the plugin with frozen results. The chart's
+    # files are backdated so that the index trusts their digests, as it would
+    # for a checkout.
+    backdated = time.time() - 2 * ChartIndex.RACY_WINDOW
+    for file_path in chart_path.rglob("*"):
+        os.utime(file_path, (backdated, backdated))
+    memoized_native_helm_runner = HelmRunner(
+        chart_index=ChartIndex(str(chart_path.parent.joinpath("chart-index.json"))),
+        computed_values_engine=NATIVE_ENGINE,
+        frozen_results=True,
+        memoize=True,
+    )
+    old_render = [
+        manifest
+        for _, manifest in native_helm_runner._parse_template_output(template_output)
+    ]
+    # The new render differs from the old one in a single document.
+    new_render = [
+        manifest
+        for _, manifest in native_helm_runner._parse_template_output(
+            template_output.replace("index: '0'", "index: 'changed'", 1)
+        )
+    ]
+    results = [
+        measure("chart_fingerprint", lambda: chart_fingerprint(chart), iterations),
+        measure(
+            "computed_values_memoized",
+            lambda: memoized_native_helm_runner.computed_values(chart=chart),
+            iterations,
+        ),
+        measure(
+            "computed_values_native",
+            lambda: native_helm_runner.computed_values(chart=chart),
+            iterations,
+        ),
+        measure(
+            "diff_renders",
+            lambda: diff_renders(old_render, new_render),
+            iterations,
+            operations_per_iteration=profile["templates"],
+        ),
+        measure(
+            "index_template_output",
+            lambda: LazyManifestSet(encoded_template_output),
+            iterations,
+            operations_per_iteration=profile["templates"],
+        ),
+        measure(
+            "parse_template_output",
+            lambda: native_helm_runner._parse_template_output(template_output),
+            iterations,
+            operations_per_iteration=profile["templates"],
+        ),
+    ]
+    if helm_binary is None:
+        return results
+
+    helm_runner = HelmRunner(helm_binary=helm_binary)
+    batch_requests = [
+        {"chart": chart, "name": f"release-{index}"} for index in range(BATCH_SIZE)
+    ]
+    results += [
+        measure(
+            "computed_values",
+            lambda: helm_runner.computed_values(chart=chart),
+            iterations,
+        ),
+        measure(
+            "notes",
+            lambda: helm_runner.notes(chart=chart, name="release-name"),
+            iterations,
+        ),
+        measure(
+            "template",
+            lambda: helm_runner.template(chart=chart, name="release-name"),
+            iterations,
+        ),
+        measure(
+            "template_batch",
+            lambda: [
+                result.unwrap() for result in helm_runner.template_batch(batch_requests)
+            ],
+            iterations,
+            operations_per_iteration=BATCH_SIZE,
+        ),
+        measure(
+            "template_show_only",
+            lambda: helm_runner.template(
+                chart=chart,
+                name="release-name",
+                show_only=["templates/configmap-0.yaml"],
+            ),
+            iterations,
+        ),
+        measure("values", lambda: helm_runner.values(chart=chart), iterations),
+    ]
+    return sorted(results, key=lambda result: result.name)
+
+
+def compare(
+    results: Sequence[BenchmarkResult],
+    baselines: Dict[str, Dict[str, float]],
+    latency_threshold: float = LATENCY_THRESHOLD,
+    memory_threshold: float = MEMORY_THRESHOLD,
+) -> List[Regression]:
+    """
+    Compare the given results against their baselines. Results without a
+    baseline can't regress.
+    """
+    regressions = []
+    for result in results:
+        baseline = baselines.get(result.name)
+        if baseline is None:
+            continue
+        if result.latency_median > baseline["latency_median"] * latency_threshold:
+            regressions.append(
+                Regression(
+                    baseline=baseline["latency_median"],
+                    measured=result.latency_median,
+                    metric="latency_median",
+                    name=result.name,
+                )
+            )
+        if result.throughput < baseline["throughput"] / latency_threshold:
+            regressions.append(
+                Regression(
+                    baseline=baseline["throughput"],
+                    measured=result.throughput,
+                    metric="throughput",
+                    name=result.name,
+                )
+            )
+        if result.peak_memory > baseline["peak_memory"] * memory_threshold:
+            regressions.append(
+                Regression(
+                    baseline=baseline["peak_memory"],
+                    measured=result.peak_memory,
+                    metric="peak_memory",
+                    name=result.name,
+                )
+            )
+    return regressions
+
+
+def missing_baselines(
+    results: Sequence[BenchmarkResult],
+    baselines: Dict[str, Dict[str, float]],
+) -> List[str]:
+    """
+    The names of the given results that have no baseline to compare against.
+    """
+    return [result.name for result in results if result.name not in baselines]
+
+
+def load_baselines(baselines_path: Path) -> Dict[str, Dict[str, Dict[str, float]]]:
+    if not baselines_path.exists():
+        return {}
+    baselines: Dict[str, Dict[str, Dict[str, float]]] = json.loads(
+        baselines_path.read_text(encoding="utf-8")
+    )
+    return baselines
+
+
+def update_baselines(
+    baselines_path: Path,
+    profile_name: str,
+    results: Sequence[BenchmarkResult],
+) -> None:
+    """
+    Record the given results as the baselines of the given profile, keeping
+    the baselines of benchmarks that weren't run.
+    """
+    baselines = load_baselines(baselines_path)
+    profile_baselines = baselines.setdefault(profile_name, {})
+    for result in results:
+        profile_baselines[result.name] = {
+            "latency_median": result.latency_median,
+            "peak_memory": result.peak_memory,
+            "throughput": result.throughput,
+        }
+    baselines_path.write_text(
+        json.dumps(baselines, indent=2, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+
+
+def format_results(results: Sequence[BenchmarkResult]) -> str:
+    lines = [
+        f"{'benchmark':<24} {'median':>10} {'p95':>10} {'ops/s':>10} {'peak KiB':>10}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result.name:<24} {result.latency_median * 1000:>8.2f}ms"
+            f" {result.latency_p95 * 1000:>8.2f}ms {result.throughput:>10.1f}"
+            f" {result.peak_memory / 1024:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark HelmRunner against synthetic charts and compare the"
+            " results against stored baselines."
+        ),
+        prog="python -m pytest_helm_templates_test.benchmarks",
+    )
+    parser.add_argument("--baselines", default=str(BASELINES_PATH), type=Path)
+    parser.add_argument("--helm-binary", default="helm")
+    parser.add_argument("--iterations", default=5, type=int)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    parser.add_argument(
+        "--latency-threshold",
+        default=LATENCY_THRESHOLD,
+        type=float,
+    )
+    parser.add_argument("--memory-threshold", default=MEMORY_THRESHOLD, type=float)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help="Record the results as the new baselines instead of comparing.",
+    )
+    arguments = parser.parse_args(argv)
+
+    helm_binary = shutil.which(arguments.helm_binary)
+    if helm_binary is None:
+        print(
+            f"{arguments.helm_binary} not found, only benchmarking what doesn't"
+            " need helm"
+        )
+
+    profile = PROFILES[arguments.profile]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        chart_path = write_synthetic_chart(
+            Path(temp_dir).joinpath("synthetic"), **profile
+        )
+        results = run_benchmarks(
+            chart_path=chart_path,
+            helm_binary=helm_binary,
+            iterations=arguments.iterations,
+            profile=profile,
+        )
+
+    if arguments.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))
+    else:
+        print(format_results(results))
+
+    if arguments.update_baselines:
+        update_baselines(arguments.baselines, arguments.profile, results)
+        return 0
+
+    baselines = load_baselines(arguments.baselines).get(arguments.profile, {})
+    # A benchmark without a baseline can't regress, so warn rather than let it
+    # go unchecked silently. The baselines of the benchmarks that need helm
+    # can only be recorded where helm is installed, so this isn't a failure.
+    for name in missing_baselines(results, baselines):
+        print(
+            f"warning: {name}: no {arguments.profile} baseline, skipped; run with"
+            " --update-baselines to record it"
+        )
+    regressions = compare(
+        results,
+        baselines,
+        latency_threshold=arguments.latency_threshold,
+        memory_threshold=arguments.memory_threshold,
+    )
+    for regression in regressions:
+        print(regression)
+    return 1 if regressions else 0
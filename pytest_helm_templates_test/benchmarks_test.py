@@ -0,0 +1,193 @@
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates.native_values import compute_values
+from pytest_helm_templates_test.benchmarks.suite import (
+    BenchmarkResult,
+    compare,
+    load_baselines,
+    main,
+    measure,
+    run_benchmarks,
+    synthetic_template_output,
+    update_baselines,
+)
+from pytest_helm_templates_test.test_helpers.synthetic_chart import (
+    SyntheticChartShape,
+    synthetic_values,
+    write_synthetic_chart,
+)
+
+
+def result(
+    latency_median: float = 1.0,
+    peak_memory: int = 1000,
+    throughput: float = 1.0,
+) -> BenchmarkResult:
+    return BenchmarkResult(
+        iterations=1,
+        latency_median=latency_median,
+        latency_p95=latency_median,
+        name="template",
+        peak_memory=peak_memory,
+        throughput=throughput,
+    )
+
+
+def test_synthetic_values_builds_a_tree_of_the_given_shape() -> None:
+    values = synthetic_values(depth=3, breadth=2)
+
+    assert sorted(values) == ["level3-0", "level3-1"]
+    assert sorted(values["level3-0"]) == ["level2-0", "level2-1"]
+    assert values["level3-0"]["level2-1"] == {"leaf0": "value-0", "leaf1": 1}
+
+
+def test_write_synthetic_chart_writes_templates_subcharts_and_crds(
+    tmp_path: Path,
+) -> None:
+    chart_path = write_synthetic_chart(
+        tmp_path.joinpath("synthetic"),
+        crd_properties=5,
+        subcharts=2,
+        templates=3,
+        values_breadth=2,
+        values_depth=2,
+    )
+
+    assert sorted(path.name for path in chart_path.joinpath("templates").iterdir()) == [
+        "NOTES.txt",
+        "_helpers.tpl",
+        "configmap-0.yaml",
+        "configmap-1.yaml",
+        "configmap-2.yaml",
+    ]
+    crd = yaml.safe_load(chart_path.joinpath("crds/crd.yaml").read_text())
+    schema = crd["spec"]["versions"][0]["schema"]["openAPIV3Schema"]
+    assert len(schema["properties"]) == 5
+
+    values = compute_values(str(chart_path))
+    assert sorted(values) == [
+        "global",
+        "settings",
+        "synthetic-sub0",
+        "synthetic-sub1",
+    ]
+    assert values["synthetic-sub1"]["settings"] == values["settings"]
+
+
+def test_measure_reports_latency_throughput_and_memory() -> None:
+    measured = measure(
+        "allocate",
+        lambda: [bytearray(1024) for _ in range(64)],
+        iterations=3,
+        operations_per_iteration=64,
+    )
+
+    assert measured.iterations == 3
+    assert 0 < measured.latency_median <= measured.latency_p95
+    assert measured.throughput > 0
+    assert measured.peak_memory >= 64 * 1024
+
+
+def test_compare_reports_regressions_beyond_thresholds() -> None:
+    baselines = {
+        "template": {"latency_median": 1.0, "peak_memory": 1000, "throughput": 1.0}
+    }
+
+    assert compare([result(latency_median=1.4, peak_memory=1200)], baselines) == []
+    regressions = compare(
+        [result(latency_median=2.0, peak_memory=2000, throughput=0.5)],
+        baselines,
+    )
+    assert [regression.metric for regression in regressions] == [
+        "latency_median",
+        "throughput",
+        "peak_memory",
+    ]
+    assert compare([result(latency_median=100.0)], {}) == []
+
+
+def test_update_baselines_keeps_baselines_of_benchmarks_not_run(
+    tmp_path: Path,
+) -> None:
+    baselines_path = tmp_path.joinpath("baselines.json")
+    update_baselines(baselines_path, "small", [result()])
+    update_baselines(baselines_path, "small", [replace(result(), name="values")])
+
+    assert sorted(load_baselines(baselines_path)["small"]) == ["template", "values"]
+
+
+def test_synthetic_template_output_includes_the_crd(tmp_path: Path) -> None:
+    chart_path = write_synthetic_chart(
+        tmp_path.joinpath("synthetic"),
+        crd_properties=5,
+        subcharts=1,
+        templates=2,
+        values_breadth=2,
+        values_depth=2,
+    )
+
+    documents = list(yaml.safe_load_all(synthetic_template_output(chart_path, 2)))
+
+    assert [document["kind"] for document in documents] == [
+        "CustomResourceDefinition",
+        "ConfigMap",
+        "ConfigMap",
+    ]
+
+
+def test_run_benchmarks_without_helm(tmp_path: Path) -> None:
+    profile: SyntheticChartShape = {
+        "crd_properties": 0,
+        "subcharts": 1,
+        "templates": 2,
+        "values_breadth": 2,
+        "values_depth": 2,
+    }
+    chart_path = write_synthetic_chart(tmp_path.joinpath("synthetic"), **profile)
+
+    results = run_benchmarks(chart_path=chart_path, iterations=1, profile=profile)
+
+    assert [measured.name for measured in results] == [
+        "chart_fingerprint",
+        "computed_values_memoized",
+        "computed_values_native",
+        "diff_renders",
+        "index_template_output",
+        "parse_template_output",
+    ]
+
+
+def test_main_fails_on_regressions(mocker: MockerFixture, tmp_path: Path) -> None:
+    run_benchmarks_mock = mocker.patch(
+        "pytest_helm_templates_test.benchmarks.suite.run_benchmarks",
+        return_value=[result()],
+    )
+    arguments = ["--baselines", str(tmp_path.joinpath("baselines.json"))]
+
+    assert main([*arguments, "--update-baselines"]) == 0
+    assert main(arguments) == 0
+
+    run_benchmarks_mock.return_value = [result(latency_median=2.0)]
+    assert main(arguments) == 1
+
+
+def test_main_warns_about_missing_baselines(
+    capsys: pytest.CaptureFixture,
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    run_benchmarks_mock = mocker.patch(
+        "pytest_helm_templates_test.benchmarks.suite.run_benchmarks",
+        return_value=[result()],
+    )
+    arguments = ["--baselines", str(tmp_path.joinpath("baselines.json"))]
+    assert main([*arguments, "--update-baselines"]) == 0
+
+    run_benchmarks_mock.return_value = [result(), replace(result(), name="values")]
+    assert main(arguments) == 0
+    assert "warning: values: no small baseline, skipped" in capsys.readouterr().out
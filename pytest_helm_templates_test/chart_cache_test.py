@@ -0,0 +1,190 @@
+import hashlib
+import io
+import tarfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator, List, NamedTuple
+
+import pytest
+import yaml
+
+from pytest_helm_templates.chart_cache import ChartCache
+from pytest_helm_templates_test.test_helpers import fixture_path
+
+
+class ChartRepo(NamedTuple):
+    path: Path
+    requests: List[str]
+    url: str
+
+
+def write_chart_archive(repo_path: Path, name: str = "test-chart") -> Path:
+    archive_path = repo_path.joinpath(f"{name}-0.1.0.tgz")
+    with tarfile.open(archive_path, mode="w:gz") as tar:
+        tar.add(fixture_path("charts/test-chart"), arcname=name)
+    return archive_path
+
+
+def write_index(repo_path: Path, archive_path: Path, digest: str) -> None:
+    index = {
+        "apiVersion": "v1",
+        "entries": {
+            "test-chart": [
+                {
+                    "digest": digest,
+                    "name": "test-chart",
+                    "urls": [archive_path.name],
+                    "version": "0.1.0",
+                }
+            ]
+        },
+    }
+    repo_path.joinpath("index.yaml").write_text(yaml.safe_dump(index))
+
+
+@pytest.fixture
+def chart_repo(tmp_path: Path) -> Iterator[ChartRepo]:
+    """
+    A chart repository served over HTTP from a temporary directory holding an
+    archive of the test chart. Requested paths are recorded.
+    """
+    repo_path = tmp_path.joinpath("repo")
+    repo_path.mkdir()
+    archive_path = write_chart_archive(repo_path)
+    write_index(
+        repo_path,
+        archive_path,
+        hashlib.sha256(archive_path.read_bytes()).hexdigest(),
+    )
+
+    requests: List[str] = []
+
+    class RecordingHandler(SimpleHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            requests.append(self.path)
+            super().do_GET()
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        partial(RecordingHandler, directory=str(repo_path)),
+    )
+    thread = threading.Thread(
+        daemon=True,
+        kwargs={"poll_interval": 0.01},
+        target=server.serve_forever,
+    )
+    thread.start()
+    try:
+        yield ChartRepo(
+            path=repo_path,
+            requests=requests,
+            url=f"http://127.0.0.1:{server.server_address[1]}/",
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_chart_path_pulls_a_chart_once(chart_repo: ChartRepo, tmp_path: Path) -> None:
+    cache_dir = str(tmp_path.joinpath("cache"))
+    chart_cache = ChartCache(cache_dir=cache_dir)
+
+    chart_path = chart_cache.chart_path("test-chart", chart_repo.url, "0.1.0")
+    assert chart_path is not None
+    assert Path(chart_path).name == "test-chart"
+    assert (
+        Path(chart_path).joinpath("values.yaml").read_text()
+        == Path(fixture_path("charts/test-chart/values.yaml")).read_text()
+    )
+    assert chart_repo.requests == ["/index.yaml", "/test-chart-0.1.0.tgz"]
+
+    assert chart_cache.chart_path("test-chart", chart_repo.url, "0.1.0") == chart_path
+    assert (
+        ChartCache(cache_dir=cache_dir).chart_path(
+            "test-chart", chart_repo.url.rstrip("/"), "0.1.0"
+        )
+        == chart_path
+    )
+    assert chart_repo.requests == ["/index.yaml", "/test-chart-0.1.0.tgz"]
+
+
+def test_chart_path_returns_none_for_charts_left_to_helm(
+    chart_repo: ChartRepo,
+    tmp_path: Path,
+) -> None:
+    chart_cache = ChartCache(cache_dir=str(tmp_path.joinpath("cache")))
+
+    assert (
+        chart_cache.chart_path("test-chart", "oci://registry/charts", "0.1.0") is None
+    )
+    assert chart_cache.chart_path("test-chart", chart_repo.url, "^0.1.0") is None
+    assert chart_cache.chart_path("missing-chart", chart_repo.url, "0.1.0") is None
+    assert chart_repo.requests == ["/index.yaml"]
+
+
+def test_chart_path_raises_error_on_digest_mismatch(
+    chart_repo: ChartRepo,
+    tmp_path: Path,
+) -> None:
+    write_index(chart_repo.path, chart_repo.path.joinpath("test-chart-0.1.0.tgz"), "0")
+    chart_cache = ChartCache(cache_dir=str(tmp_path.joinpath("cache")))
+
+    with pytest.raises(RuntimeError) as ex:
+        chart_cache.chart_path("test-chart", chart_repo.url, "0.1.0")
+
+    assert "does not match the digest in the repository index" in str(ex.value)
+    assert list(chart_cache.cache_dir.iterdir()) == []
+
+
+def test_chart_path_pulls_a_corrupted_chart_again(
+    chart_repo: ChartRepo,
+    tmp_path: Path,
+) -> None:
+    cache_dir = str(tmp_path.joinpath("cache"))
+    chart_path = ChartCache(cache_dir=cache_dir).chart_path(
+        "test-chart", chart_repo.url, "0.1.0"
+    )
+    assert chart_path is not None
+    Path(chart_path).parent.parent.joinpath(ChartCache.ARCHIVE_NAME).write_bytes(b"")
+
+    assert (
+        ChartCache(cache_dir=cache_dir).chart_path(
+            "test-chart", chart_repo.url, "0.1.0"
+        )
+        == chart_path
+    )
+    assert chart_repo.requests == [
+        "/index.yaml",
+        "/test-chart-0.1.0.tgz",
+        "/index.yaml",
+        "/test-chart-0.1.0.tgz",
+    ]
+
+
+def test_chart_path_refuses_archives_with_unsafe_paths(
+    chart_repo: ChartRepo,
+    tmp_path: Path,
+) -> None:
+    archive_path = chart_repo.path.joinpath("test-chart-0.1.0.tgz")
+    with tarfile.open(archive_path, mode="w:gz") as tar:
+        content = b"escaped"
+        member = tarfile.TarInfo("test-chart/../../escaped.txt")
+        member.size = len(content)
+        tar.addfile(member, io.BytesIO(content))
+    write_index(
+        chart_repo.path,
+        archive_path,
+        hashlib.sha256(archive_path.read_bytes()).hexdigest(),
+    )
+    chart_cache = ChartCache(cache_dir=str(tmp_path.joinpath("cache")))
+
+    with pytest.raises(RuntimeError) as ex:
+        chart_cache.chart_path("test-chart", chart_repo.url, "0.1.0")
+
+    assert "contains an unsafe path" in str(ex.value)
+    assert not tmp_path.joinpath("escaped.txt").exists()
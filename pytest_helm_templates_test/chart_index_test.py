@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates import chart_index
+from pytest_helm_templates.chart_index import ChartIndex
+from pytest_helm_templates.fingerprint import chart_fingerprint
+from pytest_helm_templates_test.test_helpers import fixture_path
+
+
+def copy_chart(tmp_path: Path) -> Path:
+    chart_path = tmp_path.joinpath("chart")
+    shutil.copytree(fixture_path("charts/test-chart"), chart_path)
+    an_hour_ago = time.time() - 3600
+    for dir_path, _, file_names in os.walk(chart_path):
+        for file_name in file_names:
+            os.utime(os.path.join(dir_path, file_name), (an_hour_ago, an_hour_ago))
+    return chart_path
+
+
+def test_fingerprint_matches_chart_fingerprint(tmp_path: Path) -> None:
+    chart_path = copy_chart(tmp_path)
+    index = ChartIndex(index_path=str(tmp_path.joinpath("index.json")))
+
+    assert index.fingerprint(str(chart_path)) == chart_fingerprint(str(chart_path))
+    assert index.fingerprint(str(chart_path)) == chart_fingerprint(str(chart_path))
+
+
+def test_fingerprint_only_reads_changed_files(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    chart_path = copy_chart(tmp_path)
+    index_path = str(tmp_path.joinpath("index.json"))
+    original_fingerprint = ChartIndex(index_path=index_path).fingerprint(
+        str(chart_path)
+    )
+
+    file_fingerprint_spy = mocker.spy(chart_index, "file_fingerprint")
+    assert (
+        ChartIndex(index_path=index_path).fingerprint(str(chart_path))
+        == original_fingerprint
+    )
+    assert file_fingerprint_spy.call_count == 0
+
+    values_path = chart_path.joinpath("values.yaml")
+    values_path.write_text("replicaCount: 3\n", encoding="utf-8")
+    changed_fingerprint = ChartIndex(index_path=index_path).fingerprint(str(chart_path))
+    assert changed_fingerprint != original_fingerprint
+    assert changed_fingerprint == chart_fingerprint(str(chart_path))
+    assert [call.args[0] for call in file_fingerprint_spy.call_args_list] == [
+        str(values_path)
+    ]
+
+
+def test_fingerprint_does_not_trust_recently_modified_files(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    chart_path = copy_chart(tmp_path)
+    chart_path.joinpath("values.yaml").write_text("replicaCount: 3\n")
+    index = ChartIndex(index_path=str(tmp_path.joinpath("index.json")))
+    index.fingerprint(str(chart_path))
+
+    file_fingerprint_spy = mocker.spy(chart_index, "file_fingerprint")
+    index.fingerprint(str(chart_path))
+    assert file_fingerprint_spy.call_count == 1
+
+
+def test_fingerprint_ignores_unreadable_index(tmp_path: Path) -> None:
+    chart_path = copy_chart(tmp_path)
+    index_path = tmp_path.joinpath("index.json")
+    index_path.write_text("not json", encoding="utf-8")
+
+    index = ChartIndex(index_path=str(index_path))
+    assert index.fingerprint(str(chart_path)) == chart_fingerprint(str(chart_path))
+
+
+def test_fingerprint_drops_charts_that_no_longer_exist(tmp_path: Path) -> None:
+    chart_path = copy_chart(tmp_path)
+    removed_chart_path = tmp_path.joinpath("removed-chart")
+    shutil.copytree(chart_path, removed_chart_path)
+    index_path = tmp_path.joinpath("index.json")
+    ChartIndex(index_path=str(index_path)).fingerprint(str(removed_chart_path))
+    ChartIndex(index_path=str(index_path)).fingerprint(str(chart_path))
+    assert sorted(json.loads(index_path.read_text())["charts"]) == [
+        str(chart_path),
+        str(removed_chart_path),
+    ]
+
+    shutil.rmtree(removed_chart_path)
+    chart_path.joinpath("values.yaml").write_text("replicaCount: 3\n")
+    ChartIndex(index_path=str(index_path)).fingerprint(str(chart_path))
+    assert list(json.loads(index_path.read_text())["charts"]) == [str(chart_path)]
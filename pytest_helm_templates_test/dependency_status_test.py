@@ -0,0 +1,133 @@
+import io
+import os
+import tarfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from pytest_helm_templates.dependency_status import (
+    dependency_state_digest,
+    dependency_statuses,
+)
+from pytest_helm_templates_test.test_helpers import fixture_path
+
+
+def write_chart(
+    chart_path: Path,
+    dependencies: List[Dict[str, Any]],
+    lock: Optional[List[Dict[str, Any]]] = None,
+) -> Path:
+    chart_path.joinpath("charts").mkdir(parents=True)
+    chart_path.joinpath("Chart.yaml").write_text(
+        yaml.safe_dump(
+            {
+                "apiVersion": "v2",
+                "dependencies": dependencies,
+                "name": "chart",
+                "version": "1.0.0",
+            }
+        )
+    )
+    if lock is not None:
+        chart_path.joinpath("Chart.lock").write_text(
+            yaml.safe_dump({"dependencies": lock})
+        )
+    return chart_path
+
+
+def write_archive(chart_path: Path, name: str, version: str) -> None:
+    metadata = yaml.safe_dump({"name": name, "version": version}).encode("utf-8")
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        member = tarfile.TarInfo(f"{name}/Chart.yaml")
+        member.size = len(metadata)
+        tar.addfile(member, io.BytesIO(metadata))
+    chart_path.joinpath(f"charts/{name}-{version}.tgz").write_bytes(archive.getvalue())
+
+
+def test_dependency_statuses_reports_unpacked_dependencies_as_ok() -> None:
+    dependency_list = dependency_statuses(fixture_path("charts/test-chart"))
+
+    assert dependency_list is not None
+    assert [(item.name, item.status) for item in dependency_list] == [
+        ("dependency", "ok")
+    ]
+    assert dependency_list[0].repository == "file://charts/dependency"
+    assert dependency_list[0].version == "*.*.*"
+
+
+def test_dependency_statuses_checks_archives(tmp_path: Path) -> None:
+    chart_path = write_chart(
+        tmp_path,
+        [
+            {"name": "matching", "version": "^1.0.0"},
+            {"name": "outdated", "version": "^2.0.0"},
+            {"name": "absent", "version": "1.0.0"},
+        ],
+    )
+    write_archive(chart_path, "matching", "1.2.0")
+    write_archive(chart_path, "outdated", "1.2.0")
+
+    dependency_list = dependency_statuses(str(chart_path))
+
+    assert dependency_list is not None
+    assert [(item.name, item.status) for item in dependency_list] == [
+        ("matching", "ok"),
+        ("outdated", "wrong version"),
+        ("absent", "missing"),
+    ]
+
+
+def test_dependency_statuses_reports_corrupt_and_ambiguous_archives(
+    tmp_path: Path,
+) -> None:
+    chart_path = write_chart(
+        tmp_path,
+        [{"name": "corrupt", "version": "1.0.0"}, {"name": "twice", "version": "*"}],
+    )
+    chart_path.joinpath("charts/corrupt-1.0.0.tgz").write_bytes(b"not an archive")
+    write_archive(chart_path, "twice", "1.0.0")
+    write_archive(chart_path, "twice", "1.1.0")
+
+    dependency_list = dependency_statuses(str(chart_path))
+
+    assert dependency_list is not None
+    assert [item.status for item in dependency_list] == [
+        "corrupt",
+        "too many matches",
+    ]
+
+
+def test_dependency_statuses_requires_locked_versions(tmp_path: Path) -> None:
+    chart_path = write_chart(
+        tmp_path,
+        [{"name": "locked", "version": "^1.0.0"}],
+        lock=[{"name": "locked", "version": "1.1.0"}],
+    )
+    write_archive(chart_path, "locked", "1.2.0")
+
+    dependency_list = dependency_statuses(str(chart_path))
+
+    assert dependency_list is not None
+    assert dependency_list[0].status == "wrong version"
+
+
+def test_dependency_statuses_returns_none_without_chart(tmp_path: Path) -> None:
+    assert dependency_statuses(str(tmp_path)) is None
+
+
+def test_dependency_state_digest_changes_with_dependencies(tmp_path: Path) -> None:
+    chart_path = write_chart(tmp_path, [{"name": "sub", "version": "1.0.0"}])
+    digest = dependency_state_digest(str(chart_path))
+
+    assert dependency_state_digest(str(chart_path)) == digest
+
+    write_archive(chart_path, "sub", "1.0.0")
+    archived_digest = dependency_state_digest(str(chart_path))
+    assert archived_digest != digest
+
+    chart_yaml_path = chart_path.joinpath("Chart.yaml")
+    stat = chart_yaml_path.stat()
+    os.utime(chart_yaml_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert dependency_state_digest(str(chart_path)) != archived_digest
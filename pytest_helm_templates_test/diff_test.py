@@ -0,0 +1,173 @@
+import copy
+from typing import Any, Dict, List
+
+import pytest
+
+from pytest_helm_templates.diff import (
+    ADDED,
+    CHANGED,
+    REMOVED,
+    Change,
+    ManifestKey,
+    diff_renders,
+)
+from pytest_helm_templates.frozen import freeze
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.query import Query
+
+
+def deployment(
+    name: str = "web",
+    namespace: str = "apps",
+    replicas: int = 1,
+) -> Dict[str, Any]:
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {
+            "labels": {"app.kubernetes.io/name": name},
+            "name": name,
+            "namespace": namespace,
+        },
+        "spec": {
+            "replicas": replicas,
+            "template": {
+                "spec": {
+                    "containers": [
+                        {"image": f"{name}:1", "name": name},
+                        {"image": "proxy:1", "name": "proxy"},
+                    ]
+                }
+            },
+        },
+    }
+
+
+SERVICE = {"apiVersion": "v1", "kind": "Service", "metadata": {"name": "web"}}
+
+WEB_KEY = ManifestKey("apps/v1", "Deployment", "apps", "web")
+
+
+def test_diff_renders_of_equal_renders_is_empty() -> None:
+    old = [deployment(), SERVICE]
+
+    diff = diff_renders(old, copy.deepcopy(old))
+
+    assert not diff
+    assert list(diff) == []
+    assert str(diff) == ""
+    assert not diff_renders(ManifestSet(old), freeze(old))
+
+
+def test_diff_renders_reports_path_level_changes() -> None:
+    old = [deployment(), SERVICE]
+    new = copy.deepcopy(old)
+    new[0]["spec"]["replicas"] = 3
+    new[0]["metadata"]["labels"]["app.kubernetes.io/name"] = "api"
+    new[0]["metadata"]["annotations"] = {"checksum": "abc"}
+    del new[0]["spec"]["template"]["spec"]["containers"][1]
+    new[0]["spec"]["template"]["spec"]["containers"][0]["image"] = "web:2"
+
+    diff = diff_renders(old, new)
+
+    assert list(diff) == [
+        Change(
+            WEB_KEY, CHANGED, 'metadata.labels["app.kubernetes.io/name"]', "web", "api"
+        ),
+        Change(WEB_KEY, ADDED, "metadata.annotations", None, {"checksum": "abc"}),
+        Change(WEB_KEY, CHANGED, "spec.replicas", 1, 3),
+        Change(
+            WEB_KEY,
+            CHANGED,
+            "spec.template.spec.containers[0].image",
+            "web:1",
+            "web:2",
+        ),
+        Change(
+            WEB_KEY,
+            REMOVED,
+            "spec.template.spec.containers[1]",
+            {"image": "proxy:1", "name": "proxy"},
+            None,
+        ),
+    ]
+    assert diff.changed == [WEB_KEY]
+    assert diff.added == diff.removed == []
+    # Paths can be evaluated against the render they came from.
+    for change in diff:
+        if change.operation == CHANGED:
+            assert Query(change.path, kind="Deployment").evaluate(new) == change.new
+
+
+def test_diff_renders_matches_manifests_by_identity() -> None:
+    old = [deployment(name="web"), deployment(name="worker"), SERVICE]
+    new = [SERVICE, deployment(name="web", namespace="other"), deployment("worker")]
+
+    diff = diff_renders(old, new)
+
+    assert diff.removed == [WEB_KEY]
+    assert diff.added == [ManifestKey("apps/v1", "Deployment", "other", "web")]
+    assert diff.changed == []
+    assert str(diff) == "- apps/v1/Deployment apps/web\n+ apps/v1/Deployment other/web"
+
+
+def test_diff_renders_pairs_manifests_with_the_same_identity_in_order() -> None:
+    old = [deployment(replicas=1), deployment(replicas=2)]
+    new = [deployment(replicas=1), deployment(replicas=3), deployment(replicas=4)]
+
+    diff = diff_renders(old, new)
+
+    assert list(diff) == [
+        Change(WEB_KEY, CHANGED, "spec.replicas", 2, 3),
+        Change(WEB_KEY, ADDED, "", None, deployment(replicas=4)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "old, new, expected_changes",
+    (
+        ({"a": 1}, {"a": "1"}, [(CHANGED, "data.a", 1, "1")]),
+        ({"a": {"b": 1}}, {"a": [1]}, [(CHANGED, "data.a", {"b": 1}, [1])]),
+        ({"a.b": 1}, {}, [(REMOVED, 'data["a.b"]', 1, None)]),
+        ({"a": [1]}, {"a": [1, 2]}, [(ADDED, "data.a[1]", None, 2)]),
+    ),
+)
+def test_diff_renders_describes_changes(
+    old: Dict[str, Any],
+    new: Dict[str, Any],
+    expected_changes: List[Any],
+) -> None:
+    config_map: Dict[str, Any] = {"kind": "ConfigMap", "metadata": {"name": "c"}}
+
+    diff = diff_renders([{**config_map, "data": old}], [{**config_map, "data": new}])
+
+    assert [
+        (change.operation, change.path, change.old, change.new) for change in diff
+    ] == expected_changes
+
+
+def test_diff_renders_paths_of_non_string_keys_can_be_evaluated() -> None:
+    config_map: Dict[str, Any] = {"kind": "ConfigMap", "metadata": {"name": "c"}}
+    old = [{**config_map, "data": {80: "http", True: "on", 'say "hi"': "hi"}}]
+    new = [{**config_map, "data": {80: "https", True: "off", 'say "hi"': "bye"}}]
+
+    diff = diff_renders(old, new)
+
+    assert [change.path for change in diff] == [
+        'data["80"]',
+        'data["True"]',
+        "data['say \"hi\"']",
+    ]
+    for change in diff:
+        assert Query(change.path, kind="ConfigMap").evaluate(new) == change.new
+
+
+def test_render_diff_filter_and_str() -> None:
+    old = [deployment(name="web"), deployment(name="worker")]
+    new = [deployment(name="web", replicas=2), deployment(name="worker", replicas=3)]
+
+    diff = diff_renders(old, new).filter(kind="Deployment", name="worker")
+
+    assert len(diff) == 1
+    assert str(diff[0]) == "~ apps/v1/Deployment apps/worker: spec.replicas: 1 -> 3"
+    assert not diff_renders(old, new).filter(kind="Service")
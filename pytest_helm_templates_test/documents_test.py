@@ -0,0 +1,146 @@
+from typing import Any, Dict, Optional
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.documents import (
+    RawDocument,
+    document_matcher,
+    document_spans,
+    split_documents,
+    template_path_matches,
+)
+
+
+OUTPUTS = (
+    "",
+    "---\na: 1",
+    "\n---\na: 1",
+    "# comment\n---\na: 1",
+    "a: 1\n---\nb: 2",
+    "---\n# Source: chart/templates/empty.yaml\n---\na: 1\n",
+    "---\na: 1\n---\n",
+    "--- # comment\na: |\n  ---\n  text\n",
+)
+
+
+@pytest.mark.parametrize("output", OUTPUTS)
+def test_split_documents_matches_safe_load_all(output: str) -> None:
+    documents = split_documents(output)
+    assert [yaml.safe_load(document.content) for document in documents] == list(
+        yaml.safe_load_all(output)
+    )
+
+
+@pytest.mark.parametrize("output", OUTPUTS)
+def test_document_spans_match_split_documents(output: str) -> None:
+    encoded_output = output.encode("utf-8")
+    assert [
+        encoded_output[start:end].decode("utf-8")
+        for start, end in document_spans(encoded_output)
+    ] == [document.content for document in split_documents(output)]
+
+
+def test_split_documents_collects_sources() -> None:
+    output = (
+        "---\n# Source: chart/templates/service.yaml\nkind: Service\n"
+        "---\n# Source: chart/charts/dependency/templates/pod.yaml\nkind: Pod\n"
+        "---\nkind: Unknown\n"
+    )
+    documents = split_documents(output)
+    assert [document.source for document in documents] == [
+        "chart/templates/service.yaml",
+        "chart/charts/dependency/templates/pod.yaml",
+        None,
+    ]
+    assert [document.template_path for document in documents] == [
+        "templates/service.yaml",
+        "charts/dependency/templates/pod.yaml",
+        None,
+    ]
+
+
+@pytest.mark.parametrize(
+    "pattern,template_path,expected_match",
+    (
+        ("templates/service.yaml", "templates/service.yaml", True),
+        ("templates/service.yaml", "templates/deployment.yaml", False),
+        ("templates/*.yaml", "templates/service.yaml", True),
+        ("templates/*.yaml", "templates/tests/test.yaml", False),
+        ("templates/*/*.yaml", "templates/tests/test.yaml", True),
+        ("templates/servic?.yaml", "templates/service.yaml", True),
+        ("templates/[st]*.yaml", "templates/service.yaml", True),
+        ("templates/[^st]*.yaml", "templates/service.yaml", False),
+        ("templates/a.b", "templates/axb", False),
+    ),
+)
+def test_template_path_matches(
+    pattern: str,
+    template_path: str,
+    expected_match: bool,
+) -> None:
+    assert template_path_matches(pattern, template_path) is expected_match
+
+
+@pytest.mark.parametrize(
+    "content,expected_kind,expected_name",
+    (
+        ("kind: Service\nmetadata:\n  name: web\n", "Service", "web"),
+        ("kind: 'Service'\nmetadata:\n    name: \"web\" # comment\n", "Service", "web"),
+        (
+            "metadata:\n  labels:\n    name: label\n  name: web\nkind: Pod\n",
+            "Pod",
+            "web",
+        ),
+        ("metadata: {name: web}\nkind: Pod\n", "Pod", "web"),
+        ("kind: Pod\nmetadata:\n  name: >-\n    folded\n", "Pod", "folded"),
+        ("kind: Pod\nmetadata:\n  name: 123\n", "Pod", 123),
+        ("kind: Pod\nmetadata:\n  namespace: default\n", "Pod", None),
+        ("NOTES.txt: |\n  kind: Fake\n", None, None),
+        ("", None, None),
+    ),
+)
+def test_raw_document_sniffs_kind_and_name(
+    content: str,
+    expected_kind: Optional[str],
+    expected_name: Any,
+) -> None:
+    document = RawDocument(content=content, source=None)
+    assert document.kind == expected_kind
+    assert document.name == expected_name
+
+
+def test_raw_document_only_parses_when_sniffing_fails(mocker: MockerFixture) -> None:
+    safe_load_spy = mocker.spy(yaml_backend, "safe_load")
+    document = RawDocument(
+        content="kind: Service\nmetadata:\n  name: web\nspec:\n  type: ClusterIP\n",
+        source="chart/templates/service.yaml",
+    )
+    matcher = document_matcher(kind="Service", name="web", source="templates/*.yaml")
+    assert matcher(document) is True
+    assert "manifest" not in document.__dict__
+    assert all(len(call.args[0]) < 20 for call in safe_load_spy.call_args_list)
+
+    assert document.manifest["spec"] == {"type": "ClusterIP"}
+
+
+@pytest.mark.parametrize(
+    "matcher_kwargs,expected_match",
+    (
+        ({"kind": "Service"}, True),
+        ({"kind": "Deployment"}, False),
+        ({"name": "web"}, True),
+        ({"name": "other"}, False),
+        ({"source": "chart/templates/service.yaml"}, True),
+        ({"source": "templates/service.yaml"}, True),
+        ({"source": "templates/deployment.yaml"}, False),
+    ),
+)
+def test_document_matcher(matcher_kwargs: Dict[str, str], expected_match: bool) -> None:
+    document = RawDocument(
+        content="kind: Service\nmetadata:\n  name: web\n",
+        source="chart/templates/service.yaml",
+    )
+    assert document_matcher(**matcher_kwargs)(document) is expected_match
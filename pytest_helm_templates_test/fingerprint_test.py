@@ -0,0 +1,33 @@
+import shutil
+from pathlib import Path
+
+from pytest_helm_templates.fingerprint import chart_fingerprint, object_fingerprint
+from pytest_helm_templates_test.test_helpers import fixture_path
+
+
+def test_chart_fingerprint_is_independent_of_chart_location(tmp_path: Path) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+    copied_chart_path = tmp_path.joinpath("copied-chart")
+    shutil.copytree(test_chart_path, copied_chart_path)
+
+    assert chart_fingerprint(test_chart_path) == chart_fingerprint(
+        str(copied_chart_path)
+    )
+
+
+def test_chart_fingerprint_changes_when_subchart_changes(tmp_path: Path) -> None:
+    copied_chart_path = tmp_path.joinpath("copied-chart")
+    shutil.copytree(fixture_path("charts/test-chart"), copied_chart_path)
+    original_fingerprint = chart_fingerprint(str(copied_chart_path))
+
+    subchart_values_path = copied_chart_path.joinpath("charts/dependency/values.yaml")
+    subchart_values_path.write_text("config: false\n", encoding="utf-8")
+
+    assert original_fingerprint != chart_fingerprint(str(copied_chart_path))
+
+
+def test_object_fingerprint_is_independent_of_key_order() -> None:
+    assert object_fingerprint({"a": 1, "b": {"c": 2, "d": 3}}) == object_fingerprint(
+        {"b": {"d": 3, "c": 2}, "a": 1}
+    )
+    assert object_fingerprint({"a": 1}) != object_fingerprint({"a": 2})
@@ -0,0 +1,118 @@
+import copy
+import json
+import pickle  # noqa: DUO103
+from typing import Any, Callable, Dict
+
+import pytest
+import yaml
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.frozen import FrozenDict, FrozenList, freeze, thaw
+
+
+MANIFEST: Dict[str, Any] = {
+    "kind": "Deployment",
+    "metadata": {"labels": {"app": "web"}, "name": "web"},
+    "spec": {"containers": [{"args": ["--verbose"], "name": "web"}]},
+}
+
+
+def test_freeze_converts_nested_containers() -> None:
+    frozen = freeze(MANIFEST)
+
+    assert isinstance(frozen, FrozenDict)
+    assert isinstance(frozen["spec"]["containers"], FrozenList)
+    assert isinstance(frozen["spec"]["containers"][0]["args"], FrozenList)
+    assert isinstance(frozen, dict)
+    assert frozen == MANIFEST
+    assert freeze(frozen) is frozen
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda frozen: frozen.__setitem__("kind", "Pod"),
+        lambda frozen: frozen.__delitem__("kind"),
+        lambda frozen: frozen.clear(),
+        lambda frozen: frozen.pop("kind"),
+        lambda frozen: frozen.popitem(),
+        lambda frozen: frozen.setdefault("status", {}),
+        lambda frozen: frozen.update(kind="Pod"),
+        lambda frozen: frozen["metadata"]["labels"].update(tier="frontend"),
+        lambda frozen: frozen["spec"]["containers"].append({}),
+        lambda frozen: frozen["spec"]["containers"].__setitem__(0, {}),
+        lambda frozen: frozen["spec"]["containers"][0]["args"].extend(["--debug"]),
+        lambda frozen: frozen["spec"]["containers"][0]["args"].sort(),
+    ],
+)
+def test_frozen_containers_are_immutable(mutate: Callable[[Any], Any]) -> None:
+    frozen = freeze(MANIFEST)
+
+    with pytest.raises(TypeError) as ex:
+        mutate(frozen)
+
+    assert "use thaw() to get a mutable copy" in str(ex.value)
+    assert frozen == MANIFEST
+
+
+def test_frozen_containers_reject_in_place_operators() -> None:
+    frozen = freeze(MANIFEST)
+    containers = frozen["spec"]["containers"]
+
+    with pytest.raises(TypeError):
+        containers += [{}]
+    with pytest.raises(TypeError):
+        containers *= 2
+    with pytest.raises(TypeError):
+        frozen |= {"kind": "Pod"}
+
+
+def test_thaw_returns_independent_mutable_copy() -> None:
+    frozen = freeze(MANIFEST)
+
+    thawed = thaw(frozen)
+    thawed["spec"]["containers"][0]["args"].append("--debug")
+
+    assert type(thawed) is dict
+    assert type(thawed["spec"]["containers"]) is list
+    assert frozen == MANIFEST
+    assert frozen.thaw() == MANIFEST
+    assert frozen["spec"]["containers"].thaw() == MANIFEST["spec"]["containers"]
+
+
+def test_copies_of_frozen_containers_are_shared() -> None:
+    frozen = freeze(MANIFEST)
+
+    assert copy.copy(frozen) is frozen
+    assert copy.deepcopy(frozen) is frozen
+    assert copy.deepcopy([frozen])[0] is frozen
+
+
+def test_frozen_containers_serialize_like_plain_containers() -> None:
+    frozen = freeze(MANIFEST)
+
+    unpickled = pickle.loads(pickle.dumps(frozen))  # noqa: DUO103
+    assert isinstance(unpickled["spec"]["containers"], FrozenList)
+    assert unpickled == MANIFEST
+    assert json.loads(json.dumps(frozen)) == MANIFEST
+    with pytest.raises(yaml.representer.RepresenterError):
+        yaml.safe_dump(frozen)
+    for backend in yaml_backend.available_backends():
+        previous_backend = yaml_backend.get_backend()
+        yaml_backend.set_backend(backend)
+        try:
+            assert yaml.safe_load(yaml_backend.safe_dump(frozen)) == MANIFEST
+        finally:
+            yaml_backend.set_backend(previous_backend)
+
+
+def test_freeze_converts_sets_to_frozensets() -> None:
+    loaded = yaml_backend.safe_load("tags: !!set {a: null, b: null}")
+
+    frozen = freeze(loaded)
+
+    assert frozen["tags"] == frozenset({"a", "b"})
+    assert isinstance(frozen["tags"], frozenset)
+    assert thaw(frozen) == loaded
+    assert isinstance(thaw(frozen)["tags"], set)
+    assert yaml_backend.safe_load(yaml_backend.safe_dump(frozen)) == loaded
@@ -1,12 +1,30 @@
+import copy
+import json
+import shutil
+import stat
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from os import path
+from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import pytest
 import yaml
 from pytest_mock import MockerFixture
 
+from pytest_helm_templates import base_helm_runner
+from pytest_helm_templates import helm_runner as helm_runner_module
+from pytest_helm_templates.chart_cache import ChartCache
+from pytest_helm_templates.chart_index import ChartIndex
+from pytest_helm_templates.documents import document_matcher
+from pytest_helm_templates.frozen import FrozenDict
 from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.instrumentation import Instrumentation
+from pytest_helm_templates.render_cache import RenderCache
+from pytest_helm_templates.types import DependencyListItem, TemplateOptions
 from pytest_helm_templates_test.test_helpers import fixture_path
 
 
@@ -61,6 +79,58 @@ def test_computed_values_can_handle_values_given_as_a_dict() -> None:
     assert values == expected_values
 
 
+def test_computed_values_can_be_rendered_against_a_shadow_chart(
+    mocker: MockerFixture,
+) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(memoize=True, shadow_charts=True)
+    values = helm_runner.computed_values(chart=test_chart_path)
+    with open(
+        f"{test_chart_path}/values.yaml",
+        encoding="utf-8",
+        mode="r",
+    ) as file:
+        expected_values = yaml.safe_load(file)
+    assert values == expected_values
+
+    run_spy = mocker.spy(helm_runner, "_run")
+    assert helm_runner.computed_values(chart=test_chart_path) == expected_values
+    assert run_spy.call_count == 0
+
+
+def test_memoized_shadow_renders_build_no_shadow_chart(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    chart_path = tmp_path.joinpath("chart")
+    shutil.copytree(fixture_path("charts/test-chart"), chart_path)
+    index_path = tmp_path.joinpath("chart-index.json")
+    helm_runner = HelmRunner(
+        chart_index=ChartIndex(str(index_path)),
+        memoize=True,
+        shadow_charts=True,
+    )
+    mocker.patch.object(
+        helm_runner,
+        "_run",
+        side_effect=lambda helm_arguments, stdin=None: (
+            "v3.0.0"
+            if helm_arguments[1] == "version"
+            else "---\n# Source: test-chart/templates/adhoc.yaml\nkey: value\n"
+        ),
+    )
+    shadow_chart_spy = mocker.spy(helm_runner_module, "shadow_chart")
+
+    assert helm_runner.computed_values(chart=str(chart_path)) == {"key": "value"}
+    index = index_path.read_text()
+    assert helm_runner.computed_values(chart=str(chart_path)) == {"key": "value"}
+
+    assert shadow_chart_spy.call_count == 1
+    assert index_path.read_text() == index
+    assert list(json.loads(index)["charts"]) == [str(chart_path)]
+
+
 def test_computed_values_includes_dependency_values() -> None:
     test_chart_path = fixture_path("charts/test-chart")
 
@@ -180,20 +250,59 @@ def test_dependency_update_if_missing_does_not_update_when_no_dependencies(
 
 def test_dependency_update_if_missing_does_update_when_missing_dependencies(
     mocker: MockerFixture,
+    tmp_path: Path,
 ) -> None:
+    test_chart_path = tmp_path.joinpath("test-chart")
+    shutil.copytree(fixture_path("charts/test-chart"), test_chart_path)
+    shutil.rmtree(test_chart_path.joinpath("charts/dependency"))
+
     helm_runner = HelmRunner()
-    test_chart_path = fixture_path("charts/test-chart")
+    dependency_update_mock = mocker.patch.object(helm_runner, "dependency_update")
+    helm_runner.dependency_update_if_missing(chart=str(test_chart_path))
+    dependency_update_mock.assert_called_once()
 
-    dependency = helm_runner.dependency_list(chart=test_chart_path)[0]
-    dependency.status = "missing"
-    mocker.patch.object(
+
+def test_dependency_update_if_missing_falls_back_to_helm_for_remote_charts(
+    mocker: MockerFixture,
+) -> None:
+    helm_runner = HelmRunner()
+    dependency = DependencyListItem(
+        name="dependency",
+        repository="https://example.com/charts",
+        status="missing",
+        version="1.0.0",
+    )
+    dependency_list_mock = mocker.patch.object(
         helm_runner,
         "dependency_list",
         return_value=[dependency],
     )
 
     dependency_update_mock = mocker.patch.object(helm_runner, "dependency_update")
-    helm_runner.dependency_update_if_missing(chart=test_chart_path)
+    helm_runner.dependency_update_if_missing(chart="oci://example.com/charts/chart")
+    dependency_list_mock.assert_called_once()
+    dependency_update_mock.assert_called_once()
+
+
+def test_dependency_update_if_missing_reuses_verdict_until_dependencies_change(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    test_chart_path = tmp_path.joinpath("test-chart")
+    shutil.copytree(fixture_path("charts/test-chart"), test_chart_path)
+
+    helm_runner = HelmRunner()
+    run_spy = mocker.spy(helm_runner, "_run")
+    statuses_spy = mocker.spy(base_helm_runner, "dependency_statuses")
+    for _ in range(3):
+        helm_runner.dependency_update_if_missing(chart=str(test_chart_path))
+    assert statuses_spy.call_count == 1
+    assert run_spy.call_count == 0
+
+    shutil.rmtree(test_chart_path.joinpath("charts/dependency"))
+    dependency_update_mock = mocker.patch.object(helm_runner, "dependency_update")
+    helm_runner.dependency_update_if_missing(chart=str(test_chart_path))
+    assert statuses_spy.call_count == 2
     dependency_update_mock.assert_called_once()
 
 
@@ -273,6 +382,148 @@ def test_template_returns_expected_helm_template_output(
     assert expected_manifest_names == manifest_names
 
 
+def test_template_returns_indexed_manifest_set() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner()
+    manifests = helm_runner.template(chart=test_chart_path, name="test-chart")
+
+    deployment_manifest = manifests.get(kind="Deployment")
+    assert deployment_manifest["metadata"]["name"] == "test-chart-deployment"
+    service_manifest = manifests.get(source="templates/service.yaml")
+    assert service_manifest["metadata"]["name"] == "test-chart-service"
+
+
+def test_template_batch_returns_results_in_request_order() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner()
+    results = helm_runner.template_batch(
+        [
+            {"chart": test_chart_path, "name": name}
+            for name in ("first", "second", "third")
+        ]
+    )
+
+    expected_results = [
+        helm_runner.template(chart=test_chart_path, name=name)
+        for name in ("first", "second", "third")
+    ]
+    assert [result.unwrap() for result in results] == expected_results
+
+
+def test_template_batch_keeps_errors_of_failed_requests(
+    mocker: MockerFixture,
+) -> None:
+    def run(helm_arguments: List[str], stdin: Optional[str] = None) -> str:
+        if "broken" in helm_arguments:
+            raise RuntimeError("helm command failed")
+        return "---\nkind: Service\n"
+
+    helm_runner = HelmRunner(max_workers=2)
+    mocker.patch.object(helm_runner, "_run", side_effect=run)
+    results = helm_runner.template_batch(
+        [
+            {"chart": "chart", "name": "working"},
+            {"chart": "chart", "name": "broken"},
+            {"chart": "chart", "name": "working"},
+        ]
+    )
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[0].unwrap() == [{"kind": "Service"}]
+    assert isinstance(results[1].error, RuntimeError)
+    with pytest.raises(RuntimeError):
+        results[1].unwrap()
+
+
+def test_computed_values_batch_keeps_errors_of_failed_requests() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    results = HelmRunner().computed_values_batch(
+        [
+            {"chart": test_chart_path},
+            {"chart": "/almost/certainly/not/a/real/path"},
+        ]
+    )
+
+    with open(
+        f"{test_chart_path}/values.yaml",
+        encoding="utf-8",
+        mode="r",
+    ) as file:
+        expected_values = yaml.safe_load(file)
+    assert results[0].unwrap() == expected_values
+    assert isinstance(results[1].error, ValueError)
+
+
+def test_template_lazy_indexes_helm_output_written_to_a_file(tmp_path: Path) -> None:
+    fake_helm_path = tmp_path.joinpath("helm")
+    fake_helm_path.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "print('---\\n# Source: chart/templates/service.yaml')\n"
+        "print(f'kind: Service\\nmetadata:\\n  name: {sys.argv[2]}')\n"
+        "print('---\\n# Source: chart/templates/pod.yaml')\n"
+        "print(f'kind: Pod\\nmetadata:\\n  name: {sys.argv[2]}')\n",
+        encoding="utf-8",
+    )
+    fake_helm_path.chmod(fake_helm_path.stat().st_mode | stat.S_IEXEC)
+
+    helm_runner = HelmRunner(helm_binary=str(fake_helm_path))
+    with helm_runner.template_lazy(chart="chart", name="test-chart") as manifests:
+        assert [record.kind for record in manifests.records] == ["Service", "Pod"]
+        assert manifests.get(source="templates/pod.yaml") == {
+            "kind": "Pod",
+            "metadata": {"name": "test-chart"},
+        }
+
+
+def test_template_lazy_raises_error_when_helm_fails(tmp_path: Path) -> None:
+    fake_helm_path = tmp_path.joinpath("helm")
+    fake_helm_path.write_text(
+        f"#!{sys.executable}\nimport sys\nsys.exit('Error: chart not found')\n",
+        encoding="utf-8",
+    )
+    fake_helm_path.chmod(fake_helm_path.stat().st_mode | stat.S_IEXEC)
+
+    with pytest.raises(RuntimeError) as ex:
+        HelmRunner(helm_binary=str(fake_helm_path)).template_lazy(
+            chart="chart", name="test-chart"
+        )
+
+    assert "Error: chart not found" in str(ex.value)
+
+
+def test_template_stream_only_parses_selected_documents() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner()
+    manifests = list(
+        helm_runner.template_stream(
+            chart=test_chart_path,
+            name="test-chart",
+            select=document_matcher(kind="Service"),
+        )
+    )
+    assert [manifest["metadata"]["name"] for manifest in manifests] == [
+        "test-chart-service"
+    ]
+
+
+def test_template_stream_yields_every_document_without_select(
+    mocker: MockerFixture,
+) -> None:
+    helm_runner = HelmRunner()
+    mocker.patch.object(
+        helm_runner,
+        "_run",
+        return_value="---\nkind: Service\n---\nkind: Pod\n",
+    )
+    manifests = helm_runner.template_stream(chart="chart", name="test-chart")
+    assert list(manifests) == [{"kind": "Service"}, {"kind": "Pod"}]
+
+
 def test_template_returns_expected_helm_template_output_for_remote_chart() -> None:
     helm_runner = HelmRunner()
     manifests = helm_runner.template(
@@ -305,6 +556,256 @@ def test_template_can_handle_values_given_a_dict() -> None:
     assert "test-chart-service-account" not in manifest_names
 
 
+def test_template_reuses_cached_output_for_identical_invocations(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(render_cache=RenderCache(cache_dir=str(tmp_path)))
+    run_spy = mocker.spy(helm_runner, "_run")
+    manifests = helm_runner.template(chart=test_chart_path, name="test-chart")
+    run_call_count = run_spy.call_count
+
+    cached_manifests = helm_runner.template(chart=test_chart_path, name="test-chart")
+    assert run_spy.call_count == run_call_count
+    assert cached_manifests == manifests
+
+    helm_runner.template(
+        chart=test_chart_path,
+        name="test-chart",
+        values=[{"serviceAccount": {"create": False}}],
+    )
+    assert run_spy.call_count == run_call_count + 1
+
+
+def test_template_renders_once_for_runners_sharing_a_cache(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    render_count = 0
+
+    def render_template(options: TemplateOptions) -> Any:
+        nonlocal render_count
+        render_count += 1
+        time.sleep(0.05)
+        return [("test-chart/templates/service.yaml", {"kind": "Service"})]
+
+    helm_runners = [
+        HelmRunner(render_cache=RenderCache(cache_dir=str(tmp_path))) for _ in range(4)
+    ]
+    for helm_runner in helm_runners:
+        mocker.patch.object(helm_runner, "_template_cache_key", return_value="key")
+        mocker.patch.object(
+            helm_runner, "_render_template", side_effect=render_template
+        )
+
+    with ThreadPoolExecutor(max_workers=len(helm_runners)) as executor:
+        results = list(
+            executor.map(
+                lambda helm_runner: helm_runner.template(chart="chart", name="name"),
+                helm_runners,
+            )
+        )
+
+    assert render_count == 1
+    assert all(manifests == [{"kind": "Service"}] for manifests in results)
+
+
+def test_template_memoizes_identical_invocations(mocker: MockerFixture) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(memoize=True)
+    run_spy = mocker.spy(helm_runner, "_run")
+    manifests = helm_runner.template(chart=test_chart_path, name="test-chart")
+    run_call_count = run_spy.call_count
+
+    manifests[0]["kind"] = "Mutated"
+    memoized_manifests = helm_runner.template(chart=test_chart_path, name="test-chart")
+    assert run_spy.call_count == run_call_count
+    assert memoized_manifests[0]["kind"] != "Mutated"
+
+
+def test_template_shares_frozen_memoized_manifests(mocker: MockerFixture) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(frozen_results=True, memoize=True)
+    manifests = helm_runner.template(chart=test_chart_path, name="test-chart")
+    run_spy = mocker.spy(helm_runner, "_run")
+    deepcopy_spy = mocker.spy(copy, "deepcopy")
+    memoized_manifests = helm_runner.template(chart=test_chart_path, name="test-chart")
+
+    assert run_spy.call_count == 0
+    assert deepcopy_spy.call_count == 0
+    assert memoized_manifests[0] is manifests[0]
+    assert isinstance(manifests[0], FrozenDict)
+    with pytest.raises(TypeError):
+        manifests[0]["kind"] = "Mutated"
+
+    thawed_manifests = memoized_manifests.thaw()
+    thawed_manifests[0]["kind"] = "Mutated"
+    assert manifests[0]["kind"] != "Mutated"
+
+
+def test_template_uses_configured_helm_binary(mocker: MockerFixture) -> None:
+    helm_runner = HelmRunner(helm_binary="/opt/helm/bin/helm")
+    run_mock = mocker.patch("subprocess.run")
+    run_mock.return_value.returncode = 0
+    run_mock.return_value.stdout = b"---\nkind: Service\n"
+
+    manifests = helm_runner.template(chart="chart", name="test-chart")
+    assert manifests == [{"kind": "Service"}]
+    assert run_mock.call_args[0][0][:3] == [
+        "/opt/helm/bin/helm",
+        "template",
+        "test-chart",
+    ]
+
+
+def test_template_passes_values_dicts_on_stdin(mocker: MockerFixture) -> None:
+    helm_runner = HelmRunner()
+    run_mock = mocker.patch("subprocess.run")
+    run_mock.return_value.returncode = 0
+    run_mock.return_value.stdout = b"---\nkind: Service\n"
+
+    helm_runner.template(
+        chart="chart",
+        name="test-chart",
+        values=[{"a": {"b": 1}}, {"a": {"c": 2}}],
+    )
+    helm_arguments = run_mock.call_args[0][0]
+    assert helm_arguments[helm_arguments.index("--values") + 1] == "-"
+    assert helm_arguments.count("--values") == 1
+    assert yaml.safe_load(run_mock.call_args[1]["input"]) == {"a": {"b": 1, "c": 2}}
+
+
+def test_template_does_not_cache_unpinned_remote_charts(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    helm_runner = HelmRunner(render_cache=RenderCache(cache_dir=str(tmp_path)))
+    cache_key = helm_runner._template_cache_key(
+        TemplateOptions(
+            chart="hello-world",
+            name="test-chart",
+            repo="https://helm.github.io/examples",
+        )
+    )
+    assert cache_key is None
+
+
+def test_template_and_values_render_pinned_remote_charts_from_the_chart_cache(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    chart_cache = ChartCache(cache_dir=str(tmp_path))
+    cached_chart_path = fixture_path("charts/test-chart")
+    chart_path_mock = mocker.patch.object(
+        chart_cache, "chart_path", return_value=cached_chart_path
+    )
+    helm_runner = HelmRunner(chart_cache=chart_cache)
+    run_mock = mocker.patch.object(
+        helm_runner, "_run", return_value="---\nkind: Service\n"
+    )
+
+    helm_runner.template(
+        chart="hello-world",
+        name="test-chart",
+        repo="https://helm.github.io/examples",
+        version="0.1.0",
+    )
+    helm_runner.values(
+        chart="hello-world",
+        repo="https://helm.github.io/examples",
+        version="0.1.0",
+    )
+    helm_runner.template(
+        chart="hello-world",
+        name="test-chart",
+        repo="https://helm.github.io/examples",
+    )
+
+    assert chart_path_mock.call_count == 2
+    template_arguments, values_arguments, unpinned_arguments = [
+        call.args[0] if call.args else call.kwargs["helm_arguments"]
+        for call in run_mock.call_args_list
+    ]
+    assert template_arguments[:4] == [
+        "helm",
+        "template",
+        "test-chart",
+        cached_chart_path,
+    ]
+    assert "--repo" not in template_arguments
+    assert "--version" not in template_arguments
+    assert values_arguments == ["helm", "show", "values", cached_chart_path]
+    assert "--repo" in unpinned_arguments
+
+
+def test_template_slices_show_only_from_a_single_full_render(
+    mocker: MockerFixture,
+) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(slice_show_only=True)
+    run_spy = mocker.spy(helm_runner, "_run")
+    service_manifests = helm_runner.template(
+        chart=test_chart_path,
+        name="test-chart",
+        show_only=["templates/service.yaml"],
+    )
+    run_call_count = run_spy.call_count
+
+    service_account_manifests = helm_runner.template(
+        chart=test_chart_path,
+        name="test-chart",
+        show_only=["templates/serviceaccount.yaml"],
+    )
+    assert run_spy.call_count == run_call_count
+    assert "--show-only" not in run_spy.call_args[0][0]
+
+    show_only_helm_runner = HelmRunner()
+    for show_only, manifests in [
+        ("templates/service.yaml", service_manifests),
+        ("templates/serviceaccount.yaml", service_account_manifests),
+    ]:
+        expected_manifests = show_only_helm_runner.template(
+            chart=test_chart_path,
+            name="test-chart",
+            show_only=[show_only],
+        )
+        assert manifests == expected_manifests
+
+
+def test_template_slicing_raises_error_for_unknown_templates(
+    mocker: MockerFixture,
+) -> None:
+    helm_runner = HelmRunner(slice_show_only=True)
+    mocker.patch.object(
+        helm_runner,
+        "_run",
+        return_value=(
+            "---\n# Source: chart/templates/service.yaml\nkind: Service\n"
+            "---\n# Source: chart/templates/tests/test.yaml\nkind: Pod\n"
+        ),
+    )
+
+    manifests = helm_runner.template(
+        chart="chart",
+        name="test-chart",
+        show_only=["templates/*.yaml"],
+    )
+    assert manifests == [{"kind": "Service"}]
+
+    with pytest.raises(RuntimeError) as ex:
+        helm_runner.template(
+            chart="chart",
+            name="test-chart",
+            show_only=["templates/missing.yaml"],
+        )
+    assert "could not find template templates/missing.yaml in chart" in str(ex)
+
+
 def test_template_should_support_override_delete_of_values() -> None:
     test_chart_path = fixture_path("charts/test-chart")
 
@@ -361,3 +862,109 @@ def test_values_returns_expected_values_for_remote_chart() -> None:
     )
     assert "image" in values
     assert "replicaCount" in values
+
+
+def test_values_memoizes_identical_invocations(mocker: MockerFixture) -> None:
+    helm_runner = HelmRunner(memoize=True)
+    run_mock = mocker.patch.object(
+        helm_runner, "_run", return_value="image:\n  tag: latest\n"
+    )
+    values = helm_runner.values(
+        chart="hello-world",
+        repo="https://helm.github.io/examples",
+        version="0.1.0",
+    )
+
+    values["image"]["tag"] = "mutated"
+    memoized_values = helm_runner.values(
+        chart="hello-world",
+        repo="https://helm.github.io/examples",
+        version="0.1.0",
+    )
+    assert run_mock.call_count == 1
+    assert memoized_values == {"image": {"tag": "latest"}}
+
+    helm_runner.values(
+        chart="hello-world",
+        repo="https://helm.github.io/examples",
+        version="0.2.0",
+    )
+    assert run_mock.call_count == 2
+
+
+def test_values_reuses_cached_values_across_runners(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(render_cache=RenderCache(cache_dir=str(tmp_path)))
+    mocker.patch.object(helm_runner, "_run", return_value="replicaCount: 1\n")
+    values = helm_runner.values(chart=test_chart_path)
+
+    cached_helm_runner = HelmRunner(render_cache=RenderCache(cache_dir=str(tmp_path)))
+    run_spy = mocker.spy(cached_helm_runner, "_run")
+    assert cached_helm_runner.values(chart=test_chart_path) == values
+    assert run_spy.call_count == 0
+
+
+def test_values_does_not_cache_unpinned_remote_charts(tmp_path: Path) -> None:
+    helm_runner = HelmRunner(render_cache=RenderCache(cache_dir=str(tmp_path)))
+    cache_key = helm_runner._values_cache_key(
+        chart="hello-world",
+        repo="https://helm.github.io/examples",
+        version=None,
+    )
+    assert cache_key is None
+
+
+def test_values_batch_returns_results_in_request_order(
+    mocker: MockerFixture,
+) -> None:
+    helm_runner = HelmRunner()
+    mocker.patch.object(
+        helm_runner,
+        "_run",
+        side_effect=lambda helm_arguments: f"chart: {helm_arguments[-1]}\n",
+    )
+    results = helm_runner.values_batch(
+        [{"chart": f"chart-{number}"} for number in range(8)]
+    )
+
+    assert [result.unwrap() for result in results] == [
+        {"chart": f"chart-{number}"} for number in range(8)
+    ]
+
+
+def test_instrumentation_records_phases_and_cache_counters(
+    mocker: MockerFixture,
+) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+    instrumentation = Instrumentation()
+    helm_runner = HelmRunner(instrumentation=instrumentation, memoize=True)
+    mocker.patch.object(helm_runner, "helm_version", return_value="v3.0.0")
+    mocker.patch(
+        "subprocess.run",
+        return_value=subprocess.CompletedProcess(
+            args=[],
+            returncode=0,
+            stderr=b"",
+            stdout=b"---\nkind: ConfigMap\n",
+        ),
+    )
+
+    for _ in range(2):
+        helm_runner.template(chart=test_chart_path, name="release")
+
+    assert [event.phase for event in instrumentation.events] == [
+        "helm",
+        "decode",
+        "parse",
+        "render",
+    ]
+    render_event = instrumentation.events[-1]
+    assert render_event.chart == test_chart_path
+    assert render_event.helm_arguments is not None
+    assert render_event.helm_arguments[:2] == ["helm", "template"]
+    assert instrumentation.events[1].output_size == len(b"---\nkind: ConfigMap\n")
+    assert instrumentation.counters == {"cache_misses": 1, "memo_hits": 1}
@@ -0,0 +1,94 @@
+import json
+import threading
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pytest_helm_templates.instrumentation import (
+    CACHE_MISSES,
+    HELM_PHASE,
+    RENDER_PHASE,
+    Instrumentation,
+)
+from pytest_helm_templates.types import HelmEvent
+
+
+def event(phase: str, start: float, duration: float) -> HelmEvent:
+    return HelmEvent(
+        duration=duration,
+        phase=phase,
+        start=start,
+        thread_id=threading.get_ident(),
+    )
+
+
+def test_measure_emits_events_to_listeners() -> None:
+    instrumentation = Instrumentation()
+    received: List[HelmEvent] = []
+    instrumentation.add_listener(received.append)
+
+    with instrumentation.measure(HELM_PHASE, helm_arguments=["helm", "version"]):
+        pass
+    with pytest.raises(RuntimeError):
+        with instrumentation.measure(RENDER_PHASE, chart="chart"):
+            raise RuntimeError("render failed")
+
+    assert [event.phase for event in received] == [HELM_PHASE, RENDER_PHASE]
+    assert received[0].helm_arguments == ["helm", "version"]
+    assert received[1].chart == "chart"
+    assert instrumentation.events == received
+
+
+def test_events_are_not_kept_unless_recording() -> None:
+    instrumentation = Instrumentation(record=False)
+    received: List[HelmEvent] = []
+    instrumentation.add_listener(received.append)
+
+    with instrumentation.measure(HELM_PHASE):
+        pass
+
+    assert len(received) == 1
+    assert instrumentation.events == []
+
+
+def test_slowest_returns_longest_events_of_a_phase() -> None:
+    instrumentation = Instrumentation()
+    for phase, duration in (
+        (RENDER_PHASE, 1.0),
+        (HELM_PHASE, 9.0),
+        (RENDER_PHASE, 3.0),
+    ):
+        instrumentation.emit(event(phase, start=0.0, duration=duration))
+
+    assert [event.duration for event in instrumentation.slowest(5)] == [3.0, 1.0]
+    assert [event.duration for event in instrumentation.slowest(1)] == [3.0]
+
+
+def test_busy_time_merges_overlapping_events() -> None:
+    instrumentation = Instrumentation()
+    instrumentation.emit(event(HELM_PHASE, start=0.0, duration=2.0))
+    instrumentation.emit(event(HELM_PHASE, start=1.0, duration=2.0))
+    instrumentation.emit(event(HELM_PHASE, start=1.5, duration=0.5))
+    instrumentation.emit(event(HELM_PHASE, start=5.0, duration=1.0))
+
+    assert instrumentation.total_time() == 5.5
+    assert instrumentation.busy_time() == 4.0
+
+
+def test_write_trace_exports_chrome_trace_events(tmp_path: Path) -> None:
+    instrumentation = Instrumentation()
+    instrumentation.count(CACHE_MISSES)
+    with instrumentation.measure(HELM_PHASE, output_size=42):
+        pass
+
+    trace_path = tmp_path.joinpath("trace.json")
+    instrumentation.write_trace(str(trace_path))
+
+    trace_events = json.loads(trace_path.read_text())["traceEvents"]
+    assert trace_events[0]["name"] == HELM_PHASE
+    assert trace_events[0]["ph"] == "X"
+    assert trace_events[0]["tid"] == threading.get_ident()
+    assert trace_events[0]["args"] == {"output_size": 42}
+    assert trace_events[1]["ph"] == "C"
+    assert trace_events[1]["args"] == {CACHE_MISSES: 1}
@@ -0,0 +1,129 @@
+from tempfile import TemporaryFile
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.lazy_manifest_set import LazyManifestSet
+from pytest_helm_templates_test.test_helpers.synthetic_chart import synthetic_crd
+
+
+CRD_YAML = yaml.safe_dump(synthetic_crd("widget", 50))
+OUTPUT = (
+    "---\n# Source: chart/crds/crd.yaml\n"
+    + CRD_YAML
+    + "---\n# Source: chart/templates/service.yaml\n"
+    "apiVersion: v1\nkind: Service\nmetadata:\n  name: web\n"
+    "---\n# Source: chart/templates/pod.yaml\n"
+    "apiVersion: v1\nkind: Pod\nmetadata:\n  name: web\n"
+)
+
+
+def test_manifests_match_safe_load_all() -> None:
+    manifests = LazyManifestSet(OUTPUT.encode("utf-8"))
+
+    assert len(manifests) == 3
+    assert list(manifests) == list(yaml.safe_load_all(OUTPUT))
+    assert manifests[1:] == list(yaml.safe_load_all(OUTPUT))[1:]
+    assert manifests.materialize() == list(yaml.safe_load_all(OUTPUT))
+    assert manifests.sources == [
+        "chart/crds/crd.yaml",
+        "chart/templates/service.yaml",
+        "chart/templates/pod.yaml",
+    ]
+
+
+def test_manifests_are_only_parsed_when_accessed(mocker: MockerFixture) -> None:
+    safe_load_spy = mocker.spy(yaml_backend, "safe_load")
+    manifests = LazyManifestSet(OUTPUT.encode("utf-8"))
+
+    assert [record.kind for record in manifests.records] == [
+        "CustomResourceDefinition",
+        "Service",
+        "Pod",
+    ]
+    assert manifests.get(kind="Service")["metadata"]["name"] == "web"
+    assert all(CRD_YAML not in call.args[0] for call in safe_load_spy.call_args_list)
+
+
+def test_unsniffable_fields_are_resolved_on_first_filter(
+    mocker: MockerFixture,
+) -> None:
+    output = OUTPUT + (
+        "---\n# Source: chart/templates/flow.yaml\n"
+        "apiVersion: v1\nkind: ConfigMap\nmetadata: {name: flow}\n"
+    )
+    safe_load_spy = mocker.spy(yaml_backend, "safe_load")
+
+    def flow_parses() -> int:
+        return sum(
+            "{name: flow}" in call.args[0] for call in safe_load_spy.call_args_list
+        )
+
+    manifests = LazyManifestSet(output.encode("utf-8"))
+    assert flow_parses() == 0
+    # Filtering by source alone doesn't need the name.
+    assert manifests.get(source="templates/flow.yaml")["kind"] == "ConfigMap"
+    assert flow_parses() == 1
+    assert manifests.filter(kind="Service", name="web").sources == [
+        "chart/templates/service.yaml"
+    ]
+    assert flow_parses() == 2
+    # The resolved name is kept, so only the access parses the document.
+    assert manifests.filter(name="flow").sources == ["chart/templates/flow.yaml"]
+    assert manifests.records[3].name == "flow"
+    assert flow_parses() == 3
+
+
+def test_manifests_are_parsed_again_on_every_access() -> None:
+    manifests = LazyManifestSet(OUTPUT.encode("utf-8"))
+
+    manifests[1]["kind"] = "Mutated"
+    assert manifests[1]["kind"] == "Service"
+    assert manifests[1] is not manifests[1]
+
+
+def test_filter_and_get_select_by_indexed_fields() -> None:
+    manifests = LazyManifestSet(OUTPUT.encode("utf-8"))
+
+    named_manifests = manifests.filter(name="web")
+    assert [manifest["kind"] for manifest in named_manifests] == ["Service", "Pod"]
+    assert named_manifests.sources == [
+        "chart/templates/service.yaml",
+        "chart/templates/pod.yaml",
+    ]
+    assert manifests.get(source="templates/pod.yaml")["kind"] == "Pod"
+    assert manifests.get(source="chart/crds/crd.yaml")["spec"]["scope"] == (
+        "Namespaced"
+    )
+    assert manifests.filter(kind="Deployment") == []
+
+    with pytest.raises(KeyError) as ex:
+        manifests.get(name="web")
+
+    assert "Expected exactly one manifest matching {'name': 'web'}, found 2" in str(
+        ex.value
+    )
+
+
+def test_from_file_memory_maps_the_output() -> None:
+    with TemporaryFile() as output_file:
+        output_file.write(OUTPUT.encode("utf-8"))
+        output_file.flush()
+        manifests = LazyManifestSet.from_file(output_file)
+
+    with manifests:
+        assert manifests.get(kind="Pod")["metadata"]["name"] == "web"
+        assert manifests.raw(2).startswith("\n# Source: chart/templates/pod.yaml\n")
+
+    with pytest.raises(ValueError):
+        manifests[2]
+
+
+def test_from_file_handles_empty_output() -> None:
+    with TemporaryFile() as output_file:
+        manifests = LazyManifestSet.from_file(output_file)
+
+    assert len(manifests) == 0
+    assert list(manifests) == []
@@ -0,0 +1,142 @@
+import copy
+import pickle  # noqa: DUO103
+
+import pytest
+
+from pytest_helm_templates.frozen import freeze
+from pytest_helm_templates.manifest_set import ManifestSet
+
+
+def build_manifest_set() -> ManifestSet:
+    return ManifestSet(
+        manifests=[
+            {
+                "apiVersion": "apps/v1",
+                "kind": "Deployment",
+                "metadata": {
+                    "labels": {"app": "web", "tier": "frontend"},
+                    "name": "web",
+                    "namespace": "default",
+                },
+            },
+            {
+                "apiVersion": "v1",
+                "kind": "Service",
+                "metadata": {"labels": {"app": "web"}, "name": "web"},
+            },
+            {
+                "apiVersion": "v1",
+                "kind": "ServiceAccount",
+                "metadata": {"name": "web", "namespace": "other"},
+            },
+        ],
+        sources=[
+            "chart/templates/deployment.yaml",
+            "chart/templates/service.yaml",
+            "chart/charts/dependency/templates/serviceaccount.yaml",
+        ],
+    )
+
+
+def test_manifest_set_is_a_list() -> None:
+    manifest_set = build_manifest_set()
+    assert isinstance(manifest_set, list)
+    assert len(manifest_set) == 3
+    assert manifest_set == list(manifest_set)
+
+
+def test_filter_matches_all_criteria() -> None:
+    manifest_set = build_manifest_set()
+    assert [manifest["kind"] for manifest in manifest_set.filter(name="web")] == [
+        "Deployment",
+        "Service",
+        "ServiceAccount",
+    ]
+    assert [manifest["kind"] for manifest in manifest_set.filter(api_version="v1")] == [
+        "Service",
+        "ServiceAccount",
+    ]
+    assert [
+        manifest["kind"] for manifest in manifest_set.filter(labels={"app": "web"})
+    ] == ["Deployment", "Service"]
+    assert not manifest_set.filter(kind="Service", namespace="default")
+
+
+def test_filter_preserves_sources() -> None:
+    filtered = build_manifest_set().filter(kind="Service")
+    assert filtered.sources == ["chart/templates/service.yaml"]
+
+
+@pytest.mark.parametrize(
+    "source",
+    (
+        "chart/charts/dependency/templates/serviceaccount.yaml",
+        "charts/dependency/templates/serviceaccount.yaml",
+    ),
+)
+def test_get_by_source(source: str) -> None:
+    assert build_manifest_set().get(source=source)["kind"] == "ServiceAccount"
+
+
+def test_get_by_api_version_and_kind() -> None:
+    manifest = build_manifest_set().get(api_version="apps/v1", kind="Deployment")
+    assert manifest["metadata"]["namespace"] == "default"
+
+
+def test_get_raises_error_unless_exactly_one_match() -> None:
+    manifest_set = build_manifest_set()
+    with pytest.raises(KeyError) as ex:
+        manifest_set.get(name="web")
+    assert "found 3" in str(ex)
+
+    with pytest.raises(KeyError) as ex:
+        manifest_set.get(kind="ConfigMap")
+    assert "found 0" in str(ex)
+
+
+def test_indexes_are_rebuilt_after_modification() -> None:
+    manifest_set = build_manifest_set()
+    assert len(manifest_set.filter(name="web")) == 3
+
+    manifest_set.pop(0)
+    manifest_set.append({"kind": "ConfigMap", "metadata": {"name": "web"}})
+    assert [manifest["kind"] for manifest in manifest_set.filter(name="web")] == [
+        "Service",
+        "ServiceAccount",
+        "ConfigMap",
+    ]
+    assert manifest_set.sources == [
+        "chart/templates/service.yaml",
+        "chart/charts/dependency/templates/serviceaccount.yaml",
+        None,
+    ]
+
+    del manifest_set[0:2]
+    assert manifest_set.get(name="web")["kind"] == "ConfigMap"
+
+
+def test_copies_preserve_sources() -> None:
+    manifest_set = build_manifest_set()
+    for copied in [
+        copy.copy(manifest_set),
+        copy.deepcopy(manifest_set),
+        pickle.loads(pickle.dumps(manifest_set)),  # noqa: DUO103
+    ]:
+        assert isinstance(copied, ManifestSet)
+        assert copied == manifest_set
+        assert copied.sources == manifest_set.sources
+        assert copied.get(kind="Service") == manifest_set.get(kind="Service")
+
+
+def test_thaw_returns_mutable_manifests() -> None:
+    manifest_set = ManifestSet(
+        manifests=[freeze(manifest) for manifest in build_manifest_set()],
+        sources=build_manifest_set().sources,
+    )
+
+    thawed = manifest_set.thaw()
+    thawed.get(kind="Service")["metadata"]["name"] = "api"
+
+    assert isinstance(thawed, ManifestSet)
+    assert thawed.sources == manifest_set.sources
+    assert manifest_set.get(kind="Service")["metadata"]["name"] == "web"
@@ -0,0 +1,177 @@
+import subprocess
+import sys
+from typing import Any, Dict
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.matrix import RenderMatrix
+
+
+def test_cases_expand_the_product_of_the_axes() -> None:
+    matrix = RenderMatrix(
+        "chart",
+        kube_versions=["1.29.0", "1.30.0"],
+        values={
+            "replicas": {"one": {"replicas": 1}, "two": {"replicas": 2}},
+            "ingress": [{"ingress": {"enabled": True}}, "values/prod.yaml"],
+        },
+    )
+
+    cases = matrix.cases()
+
+    assert [case.id for case in cases] == [
+        "replicas=one-ingress=0-kube_version=1.29.0",
+        "replicas=one-ingress=0-kube_version=1.30.0",
+        "replicas=one-ingress=prod.yaml-kube_version=1.29.0",
+        "replicas=one-ingress=prod.yaml-kube_version=1.30.0",
+        "replicas=two-ingress=0-kube_version=1.29.0",
+        "replicas=two-ingress=0-kube_version=1.30.0",
+        "replicas=two-ingress=prod.yaml-kube_version=1.29.0",
+        "replicas=two-ingress=prod.yaml-kube_version=1.30.0",
+    ]
+    assert cases[0].parameters == {
+        "ingress": {"ingress": {"enabled": True}},
+        "kube_version": "1.29.0",
+        "replicas": {"replicas": 1},
+    }
+    assert cases[0].request == {
+        "chart": "chart",
+        "kube_version": "1.29.0",
+        "name": "release-name",
+        "values": [{"ingress": {"enabled": True}, "replicas": 1}],
+    }
+    assert cases[2].request["values"] == [{"replicas": 1}, "values/prod.yaml"]
+
+
+def test_cases_normalize_equivalent_invocations_to_the_same_request() -> None:
+    matrix = RenderMatrix(
+        "chart",
+        name="web",
+        api_versions=[None, [], ["batch/v1", "apps/v1", "batch/v1"]],
+        kube_versions=[None, ""],
+        values={
+            "base": [{}, {"image": {"tag": "1"}}],
+            "tag": [None, {"image": {"tag": "1"}}],
+        },
+        namespace="apps",
+    )
+
+    assert len(matrix.cases()) == 24
+    assert matrix.unique_requests() == [
+        {"chart": "chart", "name": "web", "namespace": "apps"},
+        {
+            "api_versions": ["apps/v1", "batch/v1"],
+            "chart": "chart",
+            "name": "web",
+            "namespace": "apps",
+        },
+        {
+            "chart": "chart",
+            "name": "web",
+            "namespace": "apps",
+            "values": [{"image": {"tag": "1"}}],
+        },
+        {
+            "api_versions": ["apps/v1", "batch/v1"],
+            "chart": "chart",
+            "name": "web",
+            "namespace": "apps",
+            "values": [{"image": {"tag": "1"}}],
+        },
+    ]
+
+
+def test_cases_label_api_versions_by_their_content() -> None:
+    matrix = RenderMatrix(
+        "chart",
+        api_versions=[
+            "monitoring.coreos.com/v1",
+            "policy/v1",
+            ["policy/v1", "monitoring.coreos.com/v1"],
+        ],
+    )
+
+    cases = matrix.cases()
+
+    assert [case.id for case in cases] == [
+        "api_versions=monitoring.coreos.com/v1",
+        "api_versions=policy/v1",
+        "api_versions=policy/v1+monitoring.coreos.com/v1",
+    ]
+    assert [case.request["api_versions"] for case in cases] == [
+        ["monitoring.coreos.com/v1"],
+        ["policy/v1"],
+        ["monitoring.coreos.com/v1", "policy/v1"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected_error",
+    (
+        ({"values": {"replicas": []}}, "Matrix axis `replicas` is empty"),
+        (
+            {"kube_versions": "1.30.0"},
+            "Expected a sequence or mapping for matrix axis `kube_version`",
+        ),
+        ({"kube_version": "1.30.0"}, "kube_version varies across the matrix"),
+    ),
+)
+def test_matrix_raises_error_for_invalid_axes(
+    kwargs: Dict[str, Any],
+    expected_error: str,
+) -> None:
+    with pytest.raises(ValueError) as ex:
+        RenderMatrix("chart", **kwargs)
+
+    assert expected_error in str(ex.value)
+
+
+def test_render_renders_each_unique_request_once(mocker: MockerFixture) -> None:
+    helm_runner = HelmRunner(max_workers=2)
+    run_spy = mocker.patch.object(
+        helm_runner,
+        "_run",
+        return_value="---\nkind: Service\n",
+    )
+    matrix = RenderMatrix(
+        "chart",
+        values={
+            "first": [{"a": 1}, {}],
+            "second": [{}, {"a": 1}, {"a": 2}],
+        },
+    )
+
+    results = matrix.render(helm_runner)
+
+    assert len(results) == len(matrix.cases()) == 6
+    assert [result.unwrap() for result in results] == [[{"kind": "Service"}]] * 6
+    assert run_spy.call_count == 3
+    # Cases sharing a render don't share its manifests.
+    assert results[0].value is not results[1].value
+    results[0].unwrap()[0]["kind"] = "ConfigMap"
+    assert results[1].unwrap()[0]["kind"] == "Service"
+
+
+def test_render_shares_frozen_results(mocker: MockerFixture) -> None:
+    helm_runner = HelmRunner(frozen_results=True)
+    mocker.patch.object(helm_runner, "_run", return_value="---\nkind: Service\n")
+    matrix = RenderMatrix("chart", kube_versions=[None, ""])
+
+    first, second = matrix.render(helm_runner)
+
+    assert isinstance(first.value, ManifestSet)
+    assert first.value is second.value
+
+
+def test_package_can_be_imported_without_pytest() -> None:
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; sys.modules['pytest'] = None; import pytest_helm_templates",
+        ],
+        check=True,
+    )
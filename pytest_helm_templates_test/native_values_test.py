@@ -0,0 +1,272 @@
+import io
+import tarfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates import base_helm_runner
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.native_values import compute_values
+from pytest_helm_templates_test.test_helpers import fixture_path
+
+
+def write_chart(
+    chart_path: Path,
+    name: str,
+    values: Dict[str, Any],
+    dependencies: Optional[list] = None,
+) -> Path:
+    chart_path.mkdir(parents=True)
+    metadata: Dict[str, Any] = {"apiVersion": "v2", "name": name, "version": "1.0.0"}
+    if dependencies is not None:
+        metadata["dependencies"] = dependencies
+    chart_path.joinpath("Chart.yaml").write_text(yaml.safe_dump(metadata))
+    chart_path.joinpath("values.yaml").write_text(yaml.safe_dump(values))
+    return chart_path
+
+
+def test_compute_values_matches_chart_values() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    with open(f"{test_chart_path}/values.yaml", encoding="utf-8") as file:
+        expected_values = yaml.safe_load(file)
+    assert compute_values(test_chart_path) == expected_values
+
+
+def test_compute_values_includes_enabled_dependency_values() -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    values = compute_values(
+        test_chart_path,
+        values=[{"dependency": {"enabled": True}}],
+    )
+
+    assert values["dependency"] == {"config": True, "enabled": True, "global": {}}
+
+
+def test_compute_values_merges_user_values_in_order(tmp_path: Path) -> None:
+    chart_path = write_chart(
+        tmp_path.joinpath("chart"),
+        "chart",
+        {"image": {"repository": "nginx", "tag": "1"}, "replicas": 1},
+    )
+    values_path = tmp_path.joinpath("values.yaml")
+    values_path.write_text("image:\n  tag: '2'\nreplicas: 2\n")
+
+    values = compute_values(
+        str(chart_path),
+        values=[str(values_path), {"replicas": 3}],
+    )
+
+    assert values == {"image": {"repository": "nginx", "tag": "2"}, "replicas": 3}
+
+
+def test_compute_values_deletes_keys_set_to_null(tmp_path: Path) -> None:
+    chart_path = write_chart(
+        tmp_path.joinpath("chart"),
+        "chart",
+        {"resources": {"limits": {"cpu": 1}, "requests": {"cpu": 1}}, "replicas": 1},
+    )
+
+    values = compute_values(
+        str(chart_path),
+        values=[{"replicas": None, "resources": {"limits": None}}],
+    )
+
+    assert values == {"resources": {"requests": {"cpu": 1}}}
+
+
+def test_compute_values_scopes_subchart_values_and_propagates_globals(
+    tmp_path: Path,
+) -> None:
+    chart_path = write_chart(
+        tmp_path.joinpath("chart"),
+        "chart",
+        {"global": {"registry": "parent", "labels": {"team": "a"}}, "sub": {"x": 1}},
+        dependencies=[{"name": "sub", "version": "1.x"}],
+    )
+    write_chart(
+        chart_path.joinpath("charts/sub"),
+        "sub",
+        {
+            "global": {"registry": "sub", "labels": {"tier": "b"}, "debug": False},
+            "x": 0,
+            "y": 0,
+        },
+    )
+
+    values = compute_values(str(chart_path))
+
+    assert values["global"] == {"registry": "parent", "labels": {"team": "a"}}
+    assert values["sub"] == {
+        "global": {
+            "debug": False,
+            "labels": {"team": "a", "tier": "b"},
+            "registry": "parent",
+        },
+        "x": 1,
+        "y": 0,
+    }
+
+
+def test_compute_values_applies_conditions_tags_and_aliases(tmp_path: Path) -> None:
+    chart_path = write_chart(
+        tmp_path.joinpath("chart"),
+        "chart",
+        {"tags": {"extras": False}, "first": {"enabled": True}},
+        dependencies=[
+            {
+                "alias": "first",
+                "condition": "first.enabled",
+                "name": "sub",
+                "version": "1.x",
+            },
+            {"alias": "second", "name": "sub", "tags": ["extras"], "version": "1.x"},
+            {
+                "alias": "third",
+                "condition": "third.enabled",
+                "name": "sub",
+                "version": "1.x",
+            },
+        ],
+    )
+    write_chart(chart_path.joinpath("charts/sub"), "sub", {"enabled": False})
+
+    values = compute_values(
+        str(chart_path),
+        values=[{"third": {"enabled": True}}],
+    )
+
+    assert sorted(key for key in values if key != "tags") == ["first", "third"]
+    assert values["first"] == {"enabled": True, "global": {}}
+
+
+def test_compute_values_imports_values_from_subcharts(tmp_path: Path) -> None:
+    chart_path = write_chart(
+        tmp_path.joinpath("chart"),
+        "chart",
+        {"port": 8080},
+        dependencies=[
+            {
+                "import-values": [
+                    "data",
+                    {"child": "service", "parent": "imported.service"},
+                ],
+                "name": "sub",
+                "version": "1.0.0",
+            },
+        ],
+    )
+    write_chart(
+        chart_path.joinpath("charts/sub"),
+        "sub",
+        {
+            "exports": {"data": {"port": 80, "protocol": "TCP"}},
+            "service": {"type": "ClusterIP"},
+        },
+    )
+
+    values = compute_values(str(chart_path))
+
+    assert values["port"] == 8080
+    assert values["protocol"] == "TCP"
+    assert values["imported"] == {"service": {"type": "ClusterIP"}}
+
+
+def test_compute_values_loads_archived_subcharts(tmp_path: Path) -> None:
+    chart_path = write_chart(
+        tmp_path.joinpath("chart"),
+        "chart",
+        {},
+        dependencies=[{"name": "sub", "version": "^1.0.0"}],
+    )
+    sub_chart_path = write_chart(tmp_path.joinpath("sub"), "sub", {"x": 1})
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        tar.add(str(sub_chart_path), arcname="sub")
+    chart_path.joinpath("charts").mkdir()
+    chart_path.joinpath("charts/sub-1.0.0.tgz").write_bytes(archive.getvalue())
+
+    assert compute_values(str(chart_path)) == {"sub": {"global": {}, "x": 1}}
+
+
+def test_native_engine_does_not_run_helm(mocker: MockerFixture) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(computed_values_engine="native")
+    run_spy = mocker.spy(helm_runner, "_run")
+    values = helm_runner.computed_values(chart=test_chart_path)
+
+    assert values == compute_values(test_chart_path)
+    assert run_spy.call_count == 0
+
+
+def test_native_engine_loads_charts_once_until_they_change(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    chart_path = write_chart(
+        tmp_path.joinpath("chart"),
+        "chart",
+        {"first": {"enabled": True}},
+        dependencies=[
+            {"alias": "first", "condition": "first.enabled", "name": "sub"},
+            {"alias": "second", "condition": "second.enabled", "name": "sub"},
+        ],
+    )
+    write_chart(chart_path.joinpath("charts/sub"), "sub", {"enabled": False})
+    load_spy = mocker.spy(base_helm_runner, "load_chart")
+    helm_runner = HelmRunner(computed_values_engine="native")
+
+    values_list: List[List[Union[Dict[str, Any], str]]] = [
+        [],
+        [{"second": {"enabled": True}}],
+        [],
+    ]
+    for values in values_list:
+        assert helm_runner.computed_values(
+            chart=str(chart_path), values=values
+        ) == compute_values(str(chart_path), values=values)
+    assert load_spy.call_count == 1
+
+    chart_path.joinpath("values.yaml").write_text("first:\n  enabled: false\n")
+    assert helm_runner.computed_values(chart=str(chart_path))["first"] == {
+        "enabled": False
+    }
+    assert load_spy.call_count == 2
+
+
+def test_native_engine_memoizes_computed_values(mocker: MockerFixture) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+    helm_runner = HelmRunner(computed_values_engine="native", memoize=True)
+    compute_spy = mocker.spy(helm_runner, "_native_computed_values")
+
+    values = helm_runner.computed_values(chart=test_chart_path)
+    values["mutated"] = True
+
+    assert helm_runner.computed_values(chart=test_chart_path) == compute_values(
+        test_chart_path
+    )
+    assert compute_spy.call_count == 1
+
+
+def test_verify_engine_raises_error_when_values_differ(mocker: MockerFixture) -> None:
+    test_chart_path = fixture_path("charts/test-chart")
+
+    helm_runner = HelmRunner(computed_values_engine="verify")
+    mocker.patch.object(helm_runner, "adhoc_template", return_value={"other": 1})
+
+    with pytest.raises(RuntimeError) as ex:
+        helm_runner.computed_values(chart=test_chart_path)
+
+    assert "differ from the values computed by helm" in str(ex.value)
+    assert "+other: 1" not in str(ex.value)
+    assert "-other: 1" in str(ex.value)
+
+
+def test_unsupported_computed_values_engine_raises_error() -> None:
+    with pytest.raises(ValueError):
+        HelmRunner(computed_values_engine="unknown")
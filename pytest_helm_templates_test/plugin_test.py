@@ -0,0 +1,471 @@
+import json
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from pytest_helm_templates import yaml_backend
+
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture
+def pytester(
+    pytester: pytest.Pytester, monkeypatch: pytest.MonkeyPatch
+) -> pytest.Pytester:
+    # Avoid registering the plugin twice when the package is installed.
+    monkeypatch.setenv("PYTEST_DISABLE_PLUGIN_AUTOLOAD", "1")
+    return pytester
+
+
+def test_helm_runner_is_configured_by_ini_options(pytester: pytest.Pytester) -> None:
+    pytester.makeini(
+        """
+        [pytest]
+        helm_templates_cache_dir = .helm-cache
+        helm_templates_cache_max_age = 86400
+        helm_templates_cache_max_size = 104857600
+        helm_templates_helm_binary = /opt/helm/bin/helm
+        helm_templates_max_workers = 3
+        helm_templates_slice_show_only = true
+        """
+    )
+    pytester.makepyfile(
+        """
+        from pytest_helm_templates import HelmRunner
+
+        def test_helm_runner(helm_runner: HelmRunner, pytestconfig) -> None:
+            assert helm_runner.helm_binary == "/opt/helm/bin/helm"
+            assert helm_runner.max_workers == 3
+            assert helm_runner.memoize is True
+            assert helm_runner.slice_show_only is True
+            assert helm_runner.render_cache is not None
+            expected_cache_dir = pytestconfig.rootpath.joinpath(".helm-cache")
+            assert helm_runner.render_cache.cache_dir == expected_cache_dir
+            assert helm_runner.render_cache.max_age == 86400
+            assert helm_runner.render_cache.max_size == 104857600
+            assert helm_runner.chart_index is not None
+            assert helm_runner.chart_index.index_path == expected_cache_dir.joinpath(
+                "chart-index.json"
+            )
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(passed=1)
+
+
+def test_helm_runner_defaults(pytester: pytest.Pytester) -> None:
+    pytester.makepyfile(
+        """
+        from pytest_helm_templates import HelmRunner
+
+        def test_helm_runner(helm_runner: HelmRunner) -> None:
+            assert helm_runner.helm_binary == "helm"
+            assert helm_runner.chart_index is None
+            assert helm_runner.max_workers is None
+            assert helm_runner.render_cache is None
+            assert helm_runner.slice_show_only is False
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(passed=1)
+
+
+def test_fixtures_are_shared_by_the_whole_session(pytester: pytest.Pytester) -> None:
+    pytester.makepyfile(
+        test_first="""
+        runners = []
+
+        def test_first(helm_runner, helm_template) -> None:
+            runners.append(helm_runner)
+            assert helm_template == helm_runner.template
+        """,
+        test_second="""
+        from test_first import runners
+
+        def test_second(helm_runner) -> None:
+            assert runners == [helm_runner]
+        """,
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(passed=2)
+
+
+def test_yaml_backend_is_configured_and_reported(pytester: pytest.Pytester) -> None:
+    pytester.makeini(
+        """
+        [pytest]
+        helm_templates_yaml_backend = python
+        """
+    )
+    pytester.makepyfile(
+        """
+        from pytest_helm_templates import yaml_backend
+
+        def test_yaml_backend() -> None:
+            assert yaml_backend.get_backend() == "python"
+        """
+    )
+    backend = yaml_backend.get_backend()
+    try:
+        result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    finally:
+        yaml_backend.set_backend(backend)
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["helm-templates: yaml backend python"])
+
+
+def test_xdist_workers_share_a_cache_dir(
+    pytester: pytest.Pytester,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pytest.importorskip("xdist")
+    monkeypatch.setenv("PYTHONPATH", str(Path(__file__).parent.parent))
+    records_path = pytester.mkdir("records")
+    monkeypatch.setenv("CACHE_DIR_RECORDS", str(records_path))
+    pytester.makepyfile(
+        """
+        import os
+        from pathlib import Path
+
+        import pytest
+
+        from pytest_helm_templates import HelmRunner
+
+        @pytest.mark.parametrize("number", range(4))
+        def test_helm_runner(helm_runner: HelmRunner, number: int) -> None:
+            assert helm_runner.render_cache is not None
+            records_path = Path(os.environ["CACHE_DIR_RECORDS"])
+            records_path.joinpath(str(number)).write_text(
+                str(helm_runner.render_cache.cache_dir)
+            )
+        """
+    )
+    result = pytester.runpytest(
+        "-p", "pytest_helm_templates.plugin", "-p", "xdist", "-n", "2"
+    )
+    result.assert_outcomes(passed=4)
+    cache_dirs = {record.read_text() for record in records_path.iterdir()}
+    assert len(cache_dirs) == 1
+    assert not Path(cache_dirs.pop()).exists()
+
+
+@pytest.fixture
+def fake_helm(pytester: pytest.Pytester) -> Path:
+    """
+    A helm stand-in that logs every render, along with the pytest-xdist worker
+    that ran it, and echoes the release name.
+    """
+    chart_path = pytester.mkdir("chart")
+    chart_path.joinpath("Chart.yaml").write_text("name: chart\n")
+    fake_helm_path = pytester.path.joinpath("helm")
+    fake_helm_path.write_text(
+        f"#!{sys.executable}\n"
+        "import os\n"
+        "import sys\n"
+        "if sys.argv[1] == 'version':\n"
+        "    print('v3.0.0')\n"
+        "else:\n"
+        "    worker = os.environ.get('PYTEST_XDIST_WORKER', '')\n"
+        "    with open('renders.log', 'a') as log:\n"
+        "        log.write(' '.join([*sys.argv[1:], worker]).strip() + '\\n')\n"
+        "    print('---\\n# Source: chart/templates/a.yaml')\n"
+        "    print(f'kind: ConfigMap\\nmetadata:\\n  name: {sys.argv[2]}')\n",
+        encoding="utf-8",
+    )
+    fake_helm_path.chmod(fake_helm_path.stat().st_mode | stat.S_IEXEC)
+    pytester.makeini(
+        f"""
+        [pytest]
+        helm_templates_helm_binary = {fake_helm_path}
+        """
+    )
+    return fake_helm_path
+
+
+def test_helm_render_markers_are_prewarmed_once(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytester.makepyfile(
+        """
+        from pathlib import Path
+
+        import pytest
+
+        @pytest.mark.helm_render("chart", name="first")
+        def test_first(helm_render) -> None:
+            assert helm_render.get(kind="ConfigMap")["metadata"]["name"] == "first"
+            # Every declared render was done before the first test ran.
+            assert len(Path("renders.log").read_text().splitlines()) == 3
+
+        @pytest.mark.helm_render(chart="chart", name="first")
+        def test_first_again(helm_render) -> None:
+            assert helm_render[0]["metadata"]["name"] == "first"
+
+        @pytest.mark.parametrize(
+            "name",
+            [
+                pytest.param(name, marks=pytest.mark.helm_render("chart", name=name))
+                for name in ("second", "third")
+            ],
+        )
+        def test_parametrized(helm_render, name) -> None:
+            assert helm_render[0]["metadata"]["name"] == name
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(passed=4)
+    renders = pytester.path.joinpath("renders.log").read_text().splitlines()
+    assert sorted(render.split()[1] for render in renders) == [
+        "first",
+        "second",
+        "third",
+    ]
+
+
+def test_helm_render_markers_are_not_prewarmed_when_only_collecting(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.helm_render("chart")
+        def test_render(helm_render) -> None:
+            pass
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin", "--collect-only")
+    result.assert_outcomes()
+    assert not pytester.path.joinpath("renders.log").exists()
+
+
+def test_malformed_helm_render_markers_are_reported_by_the_fixture(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.helm_render("chart", "other")
+        def test_malformed(helm_render) -> None:
+            pass
+
+        @pytest.mark.helm_render("chart", name="first")
+        def test_first(helm_render) -> None:
+            assert helm_render[0]["metadata"]["name"] == "first"
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(errors=1, passed=1)
+    result.stdout.fnmatch_lines(["*only accepts the chart as a positional argument*"])
+
+
+def test_xdist_workers_prewarm_only_their_own_renders(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytest.importorskip("xdist")
+    pytester.makepyfile(
+        """
+        import os
+        from pathlib import Path
+
+        import pytest
+
+        @pytest.mark.parametrize(
+            "name",
+            [
+                pytest.param(name, marks=pytest.mark.helm_render("chart", name=name))
+                for name in ("a", "b", "c", "d", "e", "f")
+            ],
+        )
+        def test_render(helm_render, name) -> None:
+            assert helm_render[0]["metadata"]["name"] == name
+            Path(f"{name}.worker").write_text(os.environ["PYTEST_XDIST_WORKER"])
+        """
+    )
+    result = pytester.runpytest(
+        "-p", "pytest_helm_templates.plugin", "-p", "xdist", "-n", "2"
+    )
+    result.assert_outcomes(passed=6)
+    renders = pytester.path.joinpath("renders.log").read_text().splitlines()
+    assert sorted((render.split()[1], render.split()[-1]) for render in renders) == [
+        (name, pytester.path.joinpath(f"{name}.worker").read_text())
+        for name in ("a", "b", "c", "d", "e", "f")
+    ]
+
+
+def test_helm_render_fixture_requires_a_marker(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytester.makepyfile(
+        """
+        def test_unmarked(helm_render) -> None:
+            pass
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(["*without a helm_render marker*"])
+
+
+def test_parametrize_hands_each_case_its_render(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytester.makepyfile(
+        """
+        from pytest_helm_templates import RenderMatrix
+
+        matrix = RenderMatrix(
+            "chart",
+            values={"replicas": {"one": {"replicas": 1}, "two": {"replicas": 2}}},
+            kube_versions=[None, ""],
+        )
+
+        @matrix.parametrize()
+        def test_matrix(helm_render, matrix_case) -> None:
+            assert helm_render[0]["kind"] == "ConfigMap"
+            assert matrix_case.request["values"] == [matrix_case.parameters["replicas"]]
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin", "-v")
+    result.assert_outcomes(passed=4)
+    result.stdout.fnmatch_lines(["*test_matrix?replicas=two-kube_version=none?*"])
+    renders = pytester.path.joinpath("renders.log").read_text().splitlines()
+    assert len(renders) == 2
+
+
+def test_helm_snapshot_is_written_then_checked_without_rendering(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytester.makepyfile(
+        test_chart="""
+        import pytest
+
+        @pytest.mark.parametrize("name", ["first", "second"])
+        def test_snapshot(helm_snapshot, name) -> None:
+            helm_snapshot("chart", name=name)
+            helm_snapshot("chart", name="other")
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(failed=2)
+    result.stdout.fnmatch_lines(["*test_snapshot-first.yaml doesn't exist*"])
+
+    result = pytester.runpytest(
+        "-p", "pytest_helm_templates.plugin", "--helm-templates-update-snapshots"
+    )
+    result.assert_outcomes(passed=2)
+    snapshot_dir = pytester.path.joinpath("__snapshots__", "test_chart")
+    assert sorted(path.name for path in snapshot_dir.iterdir()) == [
+        "test_snapshot-first.1.yaml",
+        "test_snapshot-first.yaml",
+        "test_snapshot-second.1.yaml",
+        "test_snapshot-second.yaml",
+    ]
+    renders_path = pytester.path.joinpath("renders.log")
+    renders_path.unlink()
+
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(passed=2)
+    assert not renders_path.exists()
+
+
+def test_slowest_renders_are_reported_and_traced(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytester.makeini(
+        f"""
+        [pytest]
+        helm_templates_helm_binary = {fake_helm}
+        helm_templates_slowest_renders = 2
+        helm_templates_trace_file = trace.json
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("name", ["first", "second", "third", "first"])
+        def test_render(helm_template, name) -> None:
+            assert helm_template(chart="chart", name=name)[0]["kind"] == "ConfigMap"
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(passed=4)
+    result.stdout.fnmatch_lines(
+        [
+            "*slowest 2 helm renders*",
+            "*s template *",
+            "*s template *",
+            "helm ran for *s over *s of wall time; 1 memo hits, 0 cache hits, 3"
+            " cache misses",
+        ]
+    )
+
+    trace = json.loads(pytester.path.joinpath("trace.json").read_text())
+    phases = [event["name"] for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert phases.count("render") == 3
+    assert phases.count("parse") == 3
+    # One helm process per render, plus the one collecting helm's version.
+    assert phases.count("helm") == 4
+
+
+def test_slowest_renders_of_xdist_workers_are_reported(
+    pytester: pytest.Pytester,
+    fake_helm: Path,
+) -> None:
+    pytest.importorskip("xdist")
+    pytester.makeini(
+        f"""
+        [pytest]
+        helm_templates_helm_binary = {fake_helm}
+        helm_templates_slowest_renders = 5
+        """
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("name", ["first", "second", "third", "fourth"])
+        def test_render(helm_template, name) -> None:
+            assert helm_template(chart="chart", name=name)[0]["kind"] == "ConfigMap"
+        """
+    )
+    result = pytester.runpytest(
+        "-p", "pytest_helm_templates.plugin", "-p", "xdist", "-n", "2"
+    )
+    result.assert_outcomes(passed=4)
+    result.stdout.fnmatch_lines(
+        [
+            "*slowest 5 helm renders*",
+            "*s template *",
+            "*s template *",
+            "*s template *",
+            "*s template *",
+            "helm ran for *s over *s of wall time; 0 memo hits, 0 cache hits, 4"
+            " cache misses",
+        ]
+    )
+
+
+def test_helm_calls_are_not_instrumented_by_default(pytester: pytest.Pytester) -> None:
+    pytester.makepyfile(
+        """
+        def test_helm_runner(helm_runner) -> None:
+            assert helm_runner.instrumentation is None
+        """
+    )
+    result = pytester.runpytest("-p", "pytest_helm_templates.plugin")
+    result.assert_outcomes(passed=1)
+    result.stdout.no_fnmatch_line("*helm renders*")
@@ -0,0 +1,204 @@
+from typing import Any, Dict, List
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.lazy_manifest_set import LazyManifestSet
+from pytest_helm_templates.manifest_set import ManifestSet
+from pytest_helm_templates.query import (
+    INDEX_STEP,
+    KEY_STEP,
+    WILDCARD_STEP,
+    Query,
+    parse_path,
+)
+
+
+def deployment(replicas: int, image: str = "web:1") -> Dict[str, Any]:
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {
+            "labels": {"app.kubernetes.io/name": "web"},
+            "name": "web",
+        },
+        "spec": {
+            "replicas": replicas,
+            "template": {
+                "spec": {
+                    "containers": [
+                        {"image": image, "name": "web"},
+                        {"image": "proxy:1", "name": "proxy"},
+                    ]
+                }
+            },
+        },
+    }
+
+
+SERVICE = {
+    "apiVersion": "v1",
+    "kind": "Service",
+    "metadata": {"name": "web"},
+    "spec": {"ports": [{"port": 80}, {"port": 443}]},
+}
+
+
+def renders() -> List[List[Dict[str, Any]]]:
+    return [[deployment(replicas), SERVICE] for replicas in (1, 2, 3)]
+
+
+@pytest.mark.parametrize(
+    "path, expected_steps",
+    (
+        ("spec.replicas", [(KEY_STEP, "spec"), (KEY_STEP, "replicas")]),
+        ("$.spec.replicas", [(KEY_STEP, "spec"), (KEY_STEP, "replicas")]),
+        (
+            "spec.containers[-1].image",
+            [
+                (KEY_STEP, "spec"),
+                (KEY_STEP, "containers"),
+                (INDEX_STEP, -1),
+                (KEY_STEP, "image"),
+            ],
+        ),
+        (
+            'metadata.labels["app.kubernetes.io/name"]',
+            [
+                (KEY_STEP, "metadata"),
+                (KEY_STEP, "labels"),
+                (KEY_STEP, "app.kubernetes.io/name"),
+            ],
+        ),
+        ("['data'][*]", [(KEY_STEP, "data"), (WILDCARD_STEP, None)]),
+        ("data.*", [(KEY_STEP, "data"), (WILDCARD_STEP, None)]),
+    ),
+)
+def test_parse_path(path: str, expected_steps: List[Any]) -> None:
+    assert [(step.kind, step.value) for step in parse_path(path)] == expected_steps
+
+
+@pytest.mark.parametrize("path", ("", ".spec", "spec..replicas", "spec[", "a[b]"))
+def test_parse_path_raises_error_for_invalid_paths(path: str) -> None:
+    with pytest.raises(ValueError) as ex:
+        parse_path(path)
+
+    assert f"Invalid path `{path}`" in str(ex.value)
+
+
+def test_evaluate_returns_the_value_at_the_path() -> None:
+    manifests = [deployment(2), SERVICE]
+
+    assert Query("spec.replicas", kind="Deployment").evaluate(manifests) == 2
+    assert (
+        Query(
+            "spec.template.spec.containers[0].image",
+            kind="Deployment",
+            name="web",
+        ).evaluate(manifests)
+        == "web:1"
+    )
+    label_query = Query('metadata.labels["app.kubernetes.io/name"]', kind="Deployment")
+    assert label_query.evaluate(manifests) == "web"
+    assert Query("spec.ports[*].port", kind="Service").evaluate(manifests) == [
+        80,
+        443,
+    ]
+
+
+def test_evaluate_all_returns_a_column_of_results() -> None:
+    query = Query("spec.replicas", kind="Deployment", name="web")
+
+    assert query.evaluate_all(renders()) == [1, 2, 3]
+    assert query.evaluate_all([ManifestSet(render) for render in renders()]) == [
+        1,
+        2,
+        3,
+    ]
+    assert query.evaluate_all([]) == []
+
+
+def test_evaluate_all_names_the_render_and_the_missing_step() -> None:
+    query = Query("spec.template.spec.containers[2].image", kind="Deployment")
+
+    with pytest.raises(KeyError) as ex:
+        query.evaluate_all(renders())
+
+    assert ex.value.args[0] == (
+        "render 0: Deployment/web: `spec.template.spec.containers[2]` is out of"
+        " range, `spec.template.spec.containers` has 2 items"
+    )
+
+
+@pytest.mark.parametrize(
+    "path, expected_error",
+    (
+        (
+            "spec.replica",
+            "Deployment/web: `spec.replica` is missing, `spec` has keys replicas,"
+            " template",
+        ),
+        (
+            "spec.replicas.count",
+            "Deployment/web: expected a dict at `spec.replicas` for"
+            " `spec.replicas.count`, found int",
+        ),
+        (
+            "spec[0]",
+            "Deployment/web: expected a list at `spec` for `spec[0]`, found dict",
+        ),
+        (
+            "status",
+            "Deployment/web: `status` is missing, the manifest has keys apiVersion,"
+            " kind, metadata, spec",
+        ),
+    ),
+)
+def test_evaluate_describes_missing_paths(path: str, expected_error: str) -> None:
+    with pytest.raises(KeyError) as ex:
+        Query(path, kind="Deployment").evaluate([deployment(1)])
+
+    assert ex.value.args[0] == expected_error
+
+
+def test_evaluate_returns_default_for_missing_manifests_and_paths() -> None:
+    manifests = [deployment(1)]
+
+    assert Query("spec.paused", kind="Deployment").evaluate(manifests, None) is None
+    assert Query("spec", kind="Job").evaluate(manifests, default=0) == 0
+    assert Query("spec.paused", kind="Deployment").evaluate_all(
+        renders(), default=False
+    ) == [False, False, False]
+
+
+def test_evaluate_raises_error_when_criteria_match_several_manifests() -> None:
+    with pytest.raises(ValueError) as ex:
+        Query("kind", name="web").evaluate([deployment(1), SERVICE], default=None)
+
+    assert "Query('kind', name='web') matches 2 manifests, expected exactly one" in str(
+        ex.value
+    )
+
+    with pytest.raises(KeyError) as missing_ex:
+        Query("kind", kind="Job").evaluate([deployment(1)])
+
+    assert missing_ex.value.args[0] == "No manifest matches {'kind': 'Job'}"
+
+
+def test_evaluate_only_parses_the_selected_manifest_of_lazy_renders(
+    mocker: MockerFixture,
+) -> None:
+    output = yaml.safe_dump_all([deployment(2), SERVICE]).encode("utf-8")
+    manifests = LazyManifestSet(b"---\n" + output)
+    safe_load_spy = mocker.spy(yaml_backend, "safe_load")
+
+    assert Query("spec.replicas", kind="Deployment").evaluate(manifests) == 2
+    assert safe_load_spy.call_count == 1
+    assert (
+        Query("spec.replicas", labels={"app.kubernetes.io/name": "web"}).evaluate(
+            manifests
+        )
+        == 2
+    )
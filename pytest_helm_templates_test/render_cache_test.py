@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, List, Optional
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates.render_cache import RenderCache
+
+
+def test_get_returns_none_for_unknown_key(tmp_path: Path) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path))
+    assert render_cache.get("unknown") is None
+
+
+def test_get_returns_stored_value(tmp_path: Path) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path))
+    manifests = [{"kind": "Deployment", "metadata": {"name": "test"}}, None]
+    render_cache.put("key", manifests)
+
+    assert render_cache.get("key") == manifests
+    assert RenderCache(cache_dir=str(tmp_path)).get("key") == manifests
+
+
+def test_get_discards_corrupt_entries(tmp_path: Path) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path))
+    render_cache.put("key", ["value"])
+    entry_path = tmp_path.joinpath(f"key{RenderCache.ENTRY_SUFFIX}")
+    entry_path.write_bytes(b"garbage")
+
+    assert render_cache.get("key") is None
+    assert not entry_path.exists()
+
+
+def test_get_discards_entries_older_than_max_age(tmp_path: Path) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path), max_age=60)
+    render_cache.put("key", ["value"])
+    entry_path = tmp_path.joinpath(f"key{RenderCache.ENTRY_SUFFIX}")
+    an_hour_ago = time.time() - 3600
+    os.utime(entry_path, (an_hour_ago, an_hour_ago))
+
+    assert render_cache.get("key") is None
+    assert not entry_path.exists()
+
+
+@pytest.mark.parametrize("max_age", (None, 60))
+def test_get_misses_entries_evicted_while_being_read(
+    max_age: Optional[float],
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path), max_age=max_age)
+    render_cache.put("key", ["value"])
+
+    def open_and_evict(entry_path: Path, **kwargs: Any) -> IO[Any]:
+        entry_file: IO[Any] = open(entry_path, **kwargs)
+        os.unlink(entry_path)
+        return entry_file
+
+    mocker.patch(
+        "pytest_helm_templates.render_cache.open",
+        create=True,
+        side_effect=open_and_evict,
+    )
+
+    assert render_cache.get("key") is None
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path: Path) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path))
+    for index, key in enumerate(["first", "second", "third"]):
+        render_cache.put(key, [key * 100])
+        used_at = time.time() - 100 + index
+        os.utime(
+            tmp_path.joinpath(f"{key}{RenderCache.ENTRY_SUFFIX}"), (used_at, used_at)
+        )
+
+    # Reading the first entry makes it the most recently used entry.
+    assert render_cache.get("first") == ["first" * 100]
+
+    entry_size = tmp_path.joinpath(f"second{RenderCache.ENTRY_SUFFIX}").stat().st_size
+    render_cache.max_size = entry_size * 2
+    render_cache.evict()
+
+    assert render_cache.get("first") is not None
+    assert render_cache.get("second") is None
+    assert render_cache.get("third") is not None
+
+
+def test_clear_removes_all_entries(tmp_path: Path) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path))
+    render_cache.put("first", [1])
+    render_cache.put("second", [2])
+    render_cache.clear()
+
+    assert render_cache.get("first") is None
+    assert render_cache.get("second") is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_lock_serializes_holders_of_the_same_key(tmp_path: Path) -> None:
+    events: List[str] = []
+
+    def hold_lock(name: str) -> None:
+        with RenderCache(cache_dir=str(tmp_path)).lock("key"):
+            events.append(f"{name} acquired")
+            time.sleep(0.05)
+            events.append(f"{name} released")
+
+    threads = [threading.Thread(target=hold_lock, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [event.split()[1] for event in events] == [
+        "acquired",
+        "released",
+        "acquired",
+        "released",
+    ]
+
+
+def test_clear_removes_lock_files(tmp_path: Path) -> None:
+    render_cache = RenderCache(cache_dir=str(tmp_path))
+    with render_cache.lock("key"):
+        render_cache.put("key", ["value"])
+
+    render_cache.clear()
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,81 @@
+import pytest
+
+from pytest_helm_templates.semver import (
+    Version,
+    is_compatible_range,
+    parse_version,
+    version_matches,
+)
+
+
+def test_parse_version_fills_in_missing_parts() -> None:
+    assert parse_version("v1.2") == Version(major=1, minor=2, patch=0)
+    assert parse_version("1.2.3-rc.1+build") == Version(
+        major=1,
+        minor=2,
+        patch=3,
+        prerelease=("rc", "1"),
+    )
+
+
+def test_parse_version_raises_error_for_invalid_versions() -> None:
+    with pytest.raises(ValueError):
+        parse_version("one.two")
+
+
+def test_versions_sort_prereleases_before_releases() -> None:
+    versions = ["1.0.0", "1.0.0-rc.10", "1.0.0-alpha", "1.0.0-rc.2", "0.9.9"]
+
+    assert sorted(versions, key=lambda version: parse_version(version).sort_key()) == [
+        "0.9.9",
+        "1.0.0-alpha",
+        "1.0.0-rc.2",
+        "1.0.0-rc.10",
+        "1.0.0",
+    ]
+
+
+@pytest.mark.parametrize(
+    "constraint,version,expected",
+    [
+        ("1.2.3", "1.2.3", True),
+        ("=1.2.3", "1.2.4", False),
+        ("1.2", "1.2.9", True),
+        ("1.2.x", "1.3.0", False),
+        ("*", "4.5.6", True),
+        (">1.2", "1.2.9", False),
+        (">1.2", "1.3.0", True),
+        ("<=1.2", "1.2.9", True),
+        ("<1.2", "1.1.9", True),
+        (">= 1.0.0, < 2.0.0", "1.9.9", True),
+        (">=1.0.0 <2.0.0", "2.0.0", False),
+        ("!=1.2.3", "1.2.4", True),
+        ("!=1.2.3", "1.2.3", False),
+        ("~1.2.3", "1.2.9", True),
+        ("~1.2.3", "1.3.0", False),
+        ("~1", "1.9.0", True),
+        ("^1.2.3", "1.9.0", True),
+        ("^1.2.3", "2.0.0", False),
+        ("^0.2.3", "0.3.0", False),
+        ("^0.0.3", "0.0.4", False),
+        ("1.0.0 - 2.0.0", "2.0.0", True),
+        ("1.0.0 - 2.0.0", "2.0.1", False),
+        ("^1.0.0 || ^3.0.0", "3.1.0", True),
+        ("^1.0.0 || ^3.0.0", "2.1.0", False),
+        ("^1.0.0", "1.1.0-rc.1", False),
+        (">=1.1.0-0", "1.1.0-rc.1", True),
+    ],
+)
+def test_version_matches(constraint: str, version: str, expected: bool) -> None:
+    assert version_matches(constraint, version) is expected
+
+
+def test_version_matches_raises_error_for_invalid_constraints() -> None:
+    with pytest.raises(ValueError):
+        version_matches(">>1.0.0", "1.0.0")
+
+
+def test_is_compatible_range_treats_invalid_input_as_incompatible() -> None:
+    assert is_compatible_range("", "1.0.0") is False
+    assert is_compatible_range("^1.0.0", "latest") is False
+    assert is_compatible_range("^1.0.0", "1.0.1") is True
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from pytest_helm_templates.shadow_chart import ADHOC_TEMPLATE_PATH, shadow_chart
+from pytest_helm_templates_test.test_helpers import fixture_path
+
+
+def test_shadow_chart_only_keeps_partials_of_the_chart_templates() -> None:
+    test_chart_path = Path(fixture_path("charts/test-chart"))
+
+    with shadow_chart(test_chart_path, "kind: ConfigMap\n") as shadow_chart_path:
+        shadow_templates = sorted(
+            str(template_path.relative_to(shadow_chart_path))
+            for template_path in shadow_chart_path.joinpath("templates").rglob("*")
+        )
+        assert shadow_templates == [
+            "templates/_helpers.tpl",
+            ADHOC_TEMPLATE_PATH,
+        ]
+        assert shadow_chart_path.joinpath(ADHOC_TEMPLATE_PATH).read_text() == (
+            "kind: ConfigMap\n"
+        )
+        for entry_name in ("Chart.yaml", "charts", "values.yaml"):
+            shadow_entry_path = shadow_chart_path.joinpath(entry_name)
+            assert shadow_entry_path.resolve() == test_chart_path.joinpath(entry_name)
+
+    assert not shadow_chart_path.exists()
+
+
+def test_shadow_chart_keeps_nested_partials(tmp_path: Path) -> None:
+    chart_path = tmp_path.joinpath("chart")
+    chart_path.joinpath("templates/helpers").mkdir(parents=True)
+    chart_path.joinpath("templates/helpers/_names.tpl").write_text("names")
+    chart_path.joinpath("templates/helpers/config.yaml").write_text("config")
+
+    with shadow_chart(chart_path, "") as shadow_chart_path:
+        shadow_partial_path = shadow_chart_path.joinpath("templates/helpers/_names.tpl")
+        assert shadow_partial_path.read_text() == "names"
+        assert not shadow_chart_path.joinpath("templates/helpers/config.yaml").exists()
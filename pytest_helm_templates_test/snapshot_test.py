@@ -0,0 +1,172 @@
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pytest_helm_templates import yaml_backend
+from pytest_helm_templates.helm_runner import HelmRunner
+from pytest_helm_templates.snapshot import (
+    FRESH,
+    MATCHED,
+    WRITTEN,
+    HelmSnapshot,
+    snapshot_file_name,
+)
+
+
+class FakeHelm:
+    """
+    Stands in for HelmRunner._run, rendering a ConfigMap and a Deployment whose
+    replicas are read from `replicas.txt` in the chart.
+    """
+
+    def __init__(self, chart_path: Path) -> None:
+        self.chart_path = chart_path
+        self.commands: List[str] = []
+        self.renders = 0
+
+    def __call__(self, helm_arguments: List[str], stdin: Optional[str] = None) -> str:
+        self.commands.append(helm_arguments[1])
+        if helm_arguments[1] == "version":
+            return "v3.0.0"
+        self.renders += 1
+        replicas = self.chart_path.joinpath("replicas.txt").read_text().strip()
+        return (
+            "---\n# Source: chart/templates/configmap.yaml\n"
+            "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: config\n"
+            "data:\n  key: value\n"
+            "---\n# Source: chart/templates/deployment.yaml\n"
+            "apiVersion: apps/v1\nkind: Deployment\nmetadata:\n  name: web\n"
+            f"spec:\n  replicas: {replicas}\n"
+        )
+
+
+@pytest.fixture
+def fake_helm(mocker: MockerFixture, tmp_path: Path) -> FakeHelm:
+    chart_path = tmp_path.joinpath("chart")
+    chart_path.mkdir()
+    chart_path.joinpath("Chart.yaml").write_text("name: chart\n")
+    chart_path.joinpath("replicas.txt").write_text("1\n")
+    fake_helm = FakeHelm(chart_path)
+    mocker.patch.object(HelmRunner, "_run", side_effect=fake_helm)
+    return fake_helm
+
+
+def snapshot(tmp_path: Path, update: bool = False) -> HelmSnapshot:
+    return HelmSnapshot(
+        helm_runner=HelmRunner(),
+        snapshot_path=tmp_path.joinpath("__snapshots__", "test_chart.yaml"),
+        update=update,
+    )
+
+
+def test_assert_match_skips_renders_while_the_fingerprint_matches(
+    fake_helm: FakeHelm,
+    tmp_path: Path,
+) -> None:
+    chart = str(fake_helm.chart_path)
+
+    assert snapshot(tmp_path, update=True).assert_match(chart) == WRITTEN
+    assert snapshot(tmp_path).assert_match(chart) == FRESH
+    assert snapshot(tmp_path, update=True).assert_match(chart) == FRESH
+    assert fake_helm.renders == 1
+
+    header, *documents = yaml_backend.safe_load_all(
+        tmp_path.joinpath("__snapshots__", "test_chart.yaml").read_text()
+    )
+    assert header["version"] == 1
+    assert [document["source"] for document in documents] == [
+        "chart/templates/configmap.yaml",
+        "chart/templates/deployment.yaml",
+    ]
+    assert documents[1]["manifest"]["spec"] == {"replicas": 1}
+
+
+def test_assert_match_refreshes_the_fingerprint_of_matching_renders_when_updating(
+    fake_helm: FakeHelm,
+    tmp_path: Path,
+) -> None:
+    chart = str(fake_helm.chart_path)
+    snapshot(tmp_path, update=True).assert_match(chart)
+    fake_helm.chart_path.joinpath("NOTES.txt").write_text("notes\n")
+    snapshot_content = tmp_path.joinpath("__snapshots__", "test_chart.yaml").read_text()
+
+    assert snapshot(tmp_path).assert_match(chart) == MATCHED
+    assert snapshot(tmp_path).assert_match(chart) == MATCHED
+    assert (
+        tmp_path.joinpath("__snapshots__", "test_chart.yaml").read_text()
+        == snapshot_content
+    )
+    assert snapshot(tmp_path, update=True).assert_match(chart) == MATCHED
+    assert snapshot(tmp_path).assert_match(chart) == FRESH
+    assert fake_helm.renders == 4
+
+
+def test_fresh_checks_only_run_helm_for_its_version(
+    fake_helm: FakeHelm,
+    tmp_path: Path,
+) -> None:
+    chart = str(fake_helm.chart_path)
+    snapshot(tmp_path, update=True).assert_match(chart)
+    fake_helm.commands.clear()
+    helm_snapshot = snapshot(tmp_path)
+
+    assert helm_snapshot.assert_match(chart) == FRESH
+    assert helm_snapshot.assert_match(chart) == FRESH
+    assert fake_helm.commands == ["version"]
+
+
+def test_assert_match_reports_only_the_changed_documents(
+    fake_helm: FakeHelm,
+    tmp_path: Path,
+) -> None:
+    chart = str(fake_helm.chart_path)
+    snapshot(tmp_path, update=True).assert_match(chart)
+    fake_helm.chart_path.joinpath("replicas.txt").write_text("3\n")
+
+    with pytest.raises(AssertionError) as ex:
+        snapshot(tmp_path).assert_match(chart)
+
+    message = str(ex.value)
+    assert "~ apps/v1/Deployment web: spec.replicas: 1 -> 3" in message
+    assert "ConfigMap" not in message
+    assert "--helm-templates-update-snapshots" in message
+
+    assert snapshot(tmp_path, update=True).assert_match(chart) == WRITTEN
+    assert snapshot(tmp_path).assert_match(chart) == FRESH
+
+
+def test_assert_match_fails_for_missing_snapshots_unless_updating(
+    fake_helm: FakeHelm,
+    tmp_path: Path,
+) -> None:
+    with pytest.raises(AssertionError) as ex:
+        snapshot(tmp_path).assert_match(str(fake_helm.chart_path))
+
+    assert "test_chart.yaml doesn't exist" in str(ex.value)
+    assert fake_helm.renders == 0
+
+
+def test_assert_match_compares_renders_that_cant_be_fingerprinted(
+    fake_helm: FakeHelm,
+    tmp_path: Path,
+) -> None:
+    snapshot(tmp_path, update=True).assert_match("chart", repo="https://charts")
+
+    assert snapshot(tmp_path).assert_match("chart", repo="https://charts") == MATCHED
+    assert fake_helm.renders == 2
+
+
+@pytest.mark.parametrize(
+    "test_name, index, expected_file_name",
+    (
+        ("test_app", 0, "test_app.yaml"),
+        ("test_app[prod]", 1, "test_app-prod.1.yaml"),
+        ("test_app[a/b c]", 0, "test_app-a_b_c.yaml"),
+    ),
+)
+def test_snapshot_file_name(
+    test_name: str, index: int, expected_file_name: str
+) -> None:
+    assert snapshot_file_name(test_name, index) == expected_file_name
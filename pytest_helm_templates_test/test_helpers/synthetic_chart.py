@@ -0,0 +1,164 @@
+from pathlib import Path
+from typing import Any, Dict, TypedDict
+
+import yaml
+
+
+TEMPLATE = """\
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: {{{{ include "synthetic.fullname" . }}}}-{index}
+  labels:
+    {{{{- include "synthetic.labels" . | nindent 4 }}}}
+data:
+  index: "{index}"
+  settings: |
+    {{{{- toYaml .Values.settings | nindent 4 }}}}
+"""
+
+HELPERS = """\
+{{- define "synthetic.fullname" -}}
+{{- printf "%s-%s" .Release.Name .Chart.Name | trunc 63 | trimSuffix "-" }}
+{{- end }}
+
+{{- define "synthetic.labels" -}}
+app.kubernetes.io/name: {{ .Chart.Name }}
+app.kubernetes.io/instance: {{ .Release.Name }}
+{{- end }}
+"""
+
+NOTES = """\
+{{ .Chart.Name }} {{ .Chart.Version }} was rendered as {{ .Release.Name }}.
+{{- range $key, $value := .Values.settings }}
+- {{ $key }}
+{{- end }}
+"""
+
+
+class SyntheticChartShape(TypedDict):
+    crd_properties: int
+    subcharts: int
+    templates: int
+    values_breadth: int
+    values_depth: int
+
+
+def synthetic_values(depth: int, breadth: int) -> Dict[str, Any]:
+    """
+    Build a values tree breadth wide and depth deep whose leaves mix strings,
+    numbers, booleans and lists.
+    """
+    if depth <= 1:
+        return {
+            f"leaf{index}": (
+                f"value-{index}",
+                index,
+                index % 2 == 0,
+                [f"item-{item}" for item in range(3)],
+            )[index % 4]
+            for index in range(breadth)
+        }
+    return {
+        f"level{depth}-{index}": synthetic_values(depth - 1, breadth)
+        for index in range(breadth)
+    }
+
+
+def synthetic_crd(name: str, properties: int) -> Dict[str, Any]:
+    """
+    Build a CustomResourceDefinition whose schema has the given number of
+    properties, each with a nested object schema, like the large CRDs shipped
+    by operators.
+    """
+    return {
+        "apiVersion": "apiextensions.k8s.io/v1",
+        "kind": "CustomResourceDefinition",
+        "metadata": {"name": f"{name}s.synthetic.example.com"},
+        "spec": {
+            "group": "synthetic.example.com",
+            "names": {"kind": name.capitalize(), "plural": f"{name}s"},
+            "scope": "Namespaced",
+            "versions": [
+                {
+                    "name": "v1",
+                    "schema": {
+                        "openAPIV3Schema": {
+                            "properties": {
+                                f"field{index}": {
+                                    "description": f"Synthetic field {index}.",
+                                    "properties": {
+                                        "enabled": {"type": "boolean"},
+                                        "name": {"type": "string"},
+                                        "replicas": {"minimum": 0, "type": "integer"},
+                                    },
+                                    "type": "object",
+                                }
+                                for index in range(properties)
+                            },
+                            "type": "object",
+                        }
+                    },
+                    "served": True,
+                    "storage": True,
+                }
+            ],
+        },
+    }
+
+
+def write_synthetic_chart(
+    chart_path: Path,
+    name: str = "synthetic",
+    crd_properties: int = 0,
+    subcharts: int = 0,
+    templates: int = 1,
+    values_breadth: int = 3,
+    values_depth: int = 3,
+) -> Path:
+    """
+    Write a synthetic chart with the given number of templates, each rendering
+    the whole settings values tree, and the given number of subcharts, each
+    shaped like the chart itself. When crd_properties is set, the chart ships
+    a CRD with that many properties. Returns the path of the chart.
+    """
+    chart_path.joinpath("templates").mkdir(parents=True)
+    dependencies = [
+        {"name": f"{name}-sub{index}", "version": "1.0.0"} for index in range(subcharts)
+    ]
+    chart_yaml: Dict[str, Any] = {"apiVersion": "v2", "name": name, "version": "1.0.0"}
+    if dependencies:
+        chart_yaml["dependencies"] = dependencies
+    chart_path.joinpath("Chart.yaml").write_text(yaml.safe_dump(chart_yaml))
+    chart_path.joinpath("values.yaml").write_text(
+        yaml.safe_dump(
+            {
+                "global": {"labels": {"synthetic": "true"}},
+                "settings": synthetic_values(values_depth, values_breadth),
+            }
+        )
+    )
+
+    templates_path = chart_path.joinpath("templates")
+    templates_path.joinpath("_helpers.tpl").write_text(HELPERS)
+    templates_path.joinpath("NOTES.txt").write_text(NOTES)
+    for index in range(templates):
+        templates_path.joinpath(f"configmap-{index}.yaml").write_text(
+            TEMPLATE.format(index=index)
+        )
+
+    if crd_properties:
+        chart_path.joinpath("crds").mkdir()
+        chart_path.joinpath("crds/crd.yaml").write_text(
+            yaml.safe_dump(synthetic_crd(name.replace("-", ""), crd_properties))
+        )
+
+    for dependency in dependencies:
+        write_synthetic_chart(
+            chart_path.joinpath("charts", dependency["name"]),
+            name=dependency["name"],
+            templates=templates,
+            values_breadth=values_breadth,
+            values_depth=values_depth,
+        )
+    return chart_path
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import yaml
+
+from pytest_helm_templates.values_transport import (
+    STDIN_VALUES,
+    ValuesStage,
+    merge_values,
+    values_transport,
+)
+
+
+def test_merge_values_merges_nested_maps_like_helm() -> None:
+    base = {"image": {"repository": "nginx", "tag": "1"}, "ports": [80], "a": 1}
+    override = {"image": {"tag": "2"}, "ports": [443], "a": None}
+
+    merged = merge_values(base, override)
+
+    assert merged == {
+        "image": {"repository": "nginx", "tag": "2"},
+        "ports": [443],
+        "a": None,
+    }
+    assert base["image"] == {"repository": "nginx", "tag": "1"}
+
+
+def test_values_transport_passes_adjacent_dicts_on_stdin() -> None:
+    values_files, stdin = values_transport(
+        [{"a": {"b": 1}}, {"a": {"c": 2}}, "values.yaml"]
+    )
+
+    assert values_files == [STDIN_VALUES, "values.yaml"]
+    assert stdin is not None
+    assert yaml.safe_load(stdin) == {"a": {"b": 1, "c": 2}}
+
+
+def test_values_transport_stages_later_dicts(tmp_path: Path) -> None:
+    stage = ValuesStage(stage_dir=str(tmp_path))
+
+    values_files, stdin = values_transport(
+        [{"a": 1}, "values.yaml", {"b": 2}, "other.yaml", {"b": 2}],
+        stage=stage,
+    )
+
+    assert values_files[:2] == [STDIN_VALUES, "values.yaml"]
+    assert values_files[3] == "other.yaml"
+    assert values_files[2] == values_files[4]
+    assert yaml.safe_load(Path(values_files[2]).read_text()) == {"b": 2}
+    assert yaml.safe_load(stdin or "") == {"a": 1}
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_values_transport_without_dicts_uses_no_stdin() -> None:
+    assert values_transport(["values.yaml"]) == (["values.yaml"], None)
+
+
+def test_values_stage_cleanup_removes_staged_files(tmp_path: Path) -> None:
+    stage = ValuesStage(stage_dir=str(tmp_path.joinpath("stage")))
+    values_path = Path(stage.stage("a: 1\n"))
+    assert values_path.read_text() == "a: 1\n"
+
+    stage.cleanup()
+
+    assert not values_path.parent.exists()
@@ -0,0 +1,50 @@
+from typing import Iterator
+
+import pytest
+import yaml
+
+from pytest_helm_templates import yaml_backend
+
+
+@pytest.fixture(autouse=True)
+def restore_backend() -> Iterator[None]:
+    backend = yaml_backend.get_backend()
+    yield
+    yaml_backend.set_backend(backend)
+
+
+@pytest.mark.parametrize("backend", yaml_backend.available_backends())
+def test_backends_load_and_dump_equivalent_yaml(backend: str) -> None:
+    yaml_backend.set_backend(backend)
+    assert yaml_backend.get_backend() == backend
+
+    data = {"list": [1, "two", None], "nested": {"flag": True, "text": "a: b"}}
+    dumped = yaml_backend.safe_dump(data)
+    assert yaml.safe_load(dumped) == data
+    assert yaml_backend.safe_load(dumped) == data
+    assert list(yaml_backend.safe_load_all(f"---\n{dumped}---\nsecond: 2\n")) == [
+        data,
+        {"second": 2},
+    ]
+
+
+def test_auto_backend_prefers_libyaml() -> None:
+    yaml_backend.set_backend(yaml_backend.AUTO_BACKEND)
+    expected_backend = (
+        yaml_backend.LIBYAML_BACKEND
+        if yaml_backend.LIBYAML_AVAILABLE
+        else yaml_backend.PYTHON_BACKEND
+    )
+    assert yaml_backend.get_backend() == expected_backend
+
+
+def test_set_backend_raises_error_for_unknown_backend() -> None:
+    with pytest.raises(ValueError) as ex:
+        yaml_backend.set_backend("unknown")
+    assert "Unsupported YAML backend `unknown`" in str(ex)
+
+
+def test_python_backend_rejects_unsafe_yaml() -> None:
+    yaml_backend.set_backend(yaml_backend.PYTHON_BACKEND)
+    with pytest.raises(yaml.constructor.ConstructorError):
+        yaml_backend.safe_load("!!python/object/apply:os.getcwd []")